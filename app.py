@@ -14,7 +14,6 @@ import random
 from datetime import datetime, timedelta
 import threading
 import uuid
-from inference_sdk import InferenceHTTPClient
 
 # Konfigurasi logging dasar
 logging.basicConfig(level=logging.INFO)
@@ -1,6 +1,7 @@
 """Application factory for AgriSensa API."""
 import os
 import logging
+import click
 from logging.handlers import RotatingFileHandler
 from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
@@ -24,6 +25,11 @@ def create_app(config_name=None):
     """Application factory pattern."""
     app = Flask(__name__, template_folder='../templates')
     
+    # Stream image uploads into a reusable per-thread buffer
+    from app.utils.upload_buffer import UploadBuffer, UploadRequest
+    app.request_class = UploadRequest
+    app.teardown_request(lambda exc: UploadBuffer.release())
+    
     # Load configuration
     if config_name is None:
         config_name = os.getenv('FLASK_ENV', 'development')
@@ -31,8 +37,36 @@ def create_app(config_name=None):
     from app.config.config import get_config
     app.config.from_object(get_config(config_name))
     
+    # Fail at startup, not on the first login, if the password hash settings are invalid
+    from app.utils.passwords import hash_method
+    hash_method(app.config.get('PASSWORD_HASH_METHOD', 'scrypt'), app.config.get('PASSWORD_HASH_COST'))
+    
+    # JSON (orjson when available), or MessagePack/CBOR when the Accept header asks for it
+    from app.utils.response_encoding import NegotiatingJSONProvider
+    app.json = NegotiatingJSONProvider(app)
+    
+    # Engine options per dialect (pool sizing for PostgreSQL, pragmas for SQLite)
+    from app.utils.db_engine import engine_options, configure_engine
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app.config),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+    
+    # Optional read replica for history, export and rollup reads
+    from app.utils.replica import REPLICA_BIND, ReplicaRouter
+    replica_uri = app.config.get('REPLICA_DATABASE_URL')
+    if replica_uri:
+        app.config['SQLALCHEMY_BINDS'] = {
+            **app.config.get('SQLALCHEMY_BINDS', {}),
+            REPLICA_BIND: {'url': replica_uri, **engine_options(app.config, replica_uri)}
+        }
+    
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_engine(engine, app.config)
+    ReplicaRouter(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     limiter.init_app(app)
@@ -179,7 +213,9 @@ def register_blueprints(app):
         market_bp,
         ml_bp,
         auth_bp,
-        legacy_bp
+        legacy_bp,
+        jobs_bp,
+        export_bp
     )
     
     # Register blueprints with URL prefixes
@@ -191,6 +227,8 @@ def register_blueprints(app):
     app.register_blueprint(ml_bp, url_prefix='/api/ml')
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(legacy_bp, url_prefix='/api/legacy')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+    app.register_blueprint(export_bp, url_prefix='/api/export')
 
 
 def register_cli_commands(app):
@@ -227,3 +265,28 @@ def register_cli_commands(app):
             db.session.add(admin)
             db.session.commit()
         print("✅ Admin user created: username=admin, password=admin123")
+
+    @app.cli.command("rollup-npk")
+    @click.option('--hours', default=48, show_default=True, help='Refresh readings from the last N hours.')
+    @click.option('--all', 'rebuild_all', is_flag=True, help='Rebuild rollups for all stored readings.')
+    def rollup_npk_command(hours, rebuild_all):
+        """Recompute hourly and daily NPK rollups."""
+        from datetime import datetime, timedelta
+        from app.services.rollup_service import RollupService
+        with app.app_context():
+            if rebuild_all:
+                totals = RollupService.rebuild()
+            else:
+                end = datetime.utcnow()
+                totals = RollupService.rebuild(end - timedelta(hours=hours), end)
+        print(f"✅ NPK rollups refreshed: {totals['readings']} readings, "
+              f"{totals['hourly_buckets']} hourly / {totals['daily_buckets']} daily buckets")
+    
+    @app.cli.command("backfill-geohash")
+    @click.option('--batch-size', default=1000, show_default=True, help='Readings updated per commit.')
+    def backfill_geohash_command(batch_size):
+        """Compute geohash for readings stored before the column existed."""
+        from app.services.geo_service import GeoService
+        with app.app_context():
+            updated = GeoService.backfill_geohash(batch_size=batch_size)
+        print(f"✅ Geohash backfilled for {updated} readings")
@@ -20,6 +20,28 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     
+    # Database Engine (options are built per dialect in app/utils/db_engine.py)
+    # PostgreSQL/MySQL: connection pool and server-side statement timeout
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))  # seconds to wait for a connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # seconds before reconnecting
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))  # PostgreSQL requests only; 0 disables
+    # SQLite: pragmas run on every new connection. WAL lets readers run
+    # alongside a writer; synchronous=NORMAL is durable in WAL mode except
+    # for the last transactions on power loss.
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    }
+    
+    # Read Replica (optional): history, export and rollup reads
+    REPLICA_DATABASE_URL = os.getenv('REPLICA_DATABASE_URL')
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))  # read from primary beyond this
+    REPLICA_LAG_CHECK_SECONDS = float(os.getenv('REPLICA_LAG_CHECK_SECONDS', 5))
+    
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'dev-jwt-secret-key-please-change')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600)))
@@ -45,6 +67,88 @@ class Config:
         'shap_explainer': 'shap_explainer.pkl'
     }
     
+    # Leaf Image Decoding
+    # Reduced-resolution decode for large photos: 'auto' picks 1/2/4/8 from
+    # the image header so the long side stays >= BWD_DECODE_TARGET_SIDE.
+    BWD_FAST_DECODE = os.getenv('BWD_FAST_DECODE', 'true').lower() == 'true'
+    BWD_DECODE_SCALE = os.getenv('BWD_DECODE_SCALE', 'auto')
+    BWD_DECODE_TARGET_SIDE = int(os.getenv('BWD_DECODE_TARGET_SIDE', 640))
+    # Max |avg hue| drift vs full decode (OpenCV hue units) that benchmarks/leaf_*.py accept
+    BWD_DECODE_HUE_TOLERANCE = float(os.getenv('BWD_DECODE_HUE_TOLERANCE', 1.0))
+    
+    # BWD Lookup Model
+    # Serve BWD predictions from a table precomputed over a hue grid instead
+    # of calling the SVC per image (see benchmarks/leaf_analysis.py).
+    BWD_LOOKUP_MODEL = os.getenv('BWD_LOOKUP_MODEL', 'false').lower() == 'true'
+    BWD_LOOKUP_STEP = float(os.getenv('BWD_LOOKUP_STEP', 0.01))  # hue units
+    
+    # Multi-leaf Segmentation (/api/analysis/bwd?mode=multi)
+    BWD_MULTI_MIN_AREA_FRACTION = float(os.getenv('BWD_MULTI_MIN_AREA_FRACTION', 0.005))  # of decoded frame
+    BWD_MULTI_MAX_LEAVES = int(os.getenv('BWD_MULTI_MAX_LEAVES', 50))
+    
+    # Frame Stream Analysis (/api/analysis/bwd/stream)
+    BWD_STREAM_MAX_BYTES = int(os.getenv('BWD_STREAM_MAX_BYTES', 1024 * 1024 * 1024))  # 1GB per stream
+    BWD_STREAM_MAX_FRAME_BYTES = int(os.getenv('BWD_STREAM_MAX_FRAME_BYTES', 8 * 1024 * 1024))
+    BWD_STREAM_CHUNK_SIZE = 64 * 1024
+    BWD_STREAM_BUDGET_MS = float(os.getenv('BWD_STREAM_BUDGET_MS')) if os.getenv('BWD_STREAM_BUDGET_MS') else None
+    BWD_STREAM_AGGREGATE_EVERY = int(os.getenv('BWD_STREAM_AGGREGATE_EVERY', 10))
+    
+    # Analysis Result Cache
+    # In-memory LRU keyed on image content hash + model version, with an
+    # optional on-disk tier (set RESULT_CACHE_DIR to enable it).
+    RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 512))
+    RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR')
+    RESULT_CACHE_DISK_MAX_BYTES = int(os.getenv('RESULT_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024))  # per cache
+    
+    # Password Hashing
+    # Hashes run on a bounded thread pool per worker process; hashes made with
+    # another method or cost are replaced on the user's next successful login.
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')  # scrypt or pbkdf2[:sha256|sha512]
+    PASSWORD_HASH_COST = int(os.getenv('PASSWORD_HASH_COST')) if os.getenv('PASSWORD_HASH_COST') else None  # scrypt N / PBKDF2 iterations
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 32))
+    PASSWORD_HASH_ACQUIRE_TIMEOUT = float(os.getenv('PASSWORD_HASH_ACQUIRE_TIMEOUT', 2))  # seconds, then 503
+    
+    # Fertilizer Recommendation Dedup
+    # Requests with the same normalized input under the same model version
+    # share one stored result instead of re-running the model.
+    RECOMMENDATION_DEDUP_ENABLED = os.getenv('RECOMMENDATION_DEDUP_ENABLED', 'true').lower() == 'true'
+    
+    # Roboflow Disease Detection (Modul 20)
+    # One pooled client per worker process; calls are bounded by a
+    # concurrency limit, timeouts and a circuit breaker.
+    ROBOFLOW_API_URL = os.getenv('ROBOFLOW_API_URL', 'https://serverless.roboflow.com')
+    ROBOFLOW_API_KEY = os.getenv('ROBOFLOW_API_KEY')  # detection answers 503 while unset
+    ROBOFLOW_WORKSPACE = os.getenv('ROBOFLOW_WORKSPACE', 'andriyanto39')
+    ROBOFLOW_WORKFLOW_ID = os.getenv('ROBOFLOW_WORKFLOW_ID', 'detect-and-classify')
+    ROBOFLOW_POOL_SIZE = int(os.getenv('ROBOFLOW_POOL_SIZE', 10))
+    ROBOFLOW_MAX_CONCURRENCY = int(os.getenv('ROBOFLOW_MAX_CONCURRENCY', 8))
+    ROBOFLOW_ACQUIRE_TIMEOUT = float(os.getenv('ROBOFLOW_ACQUIRE_TIMEOUT', 5))
+    ROBOFLOW_CONNECT_TIMEOUT = float(os.getenv('ROBOFLOW_CONNECT_TIMEOUT', 3.05))
+    ROBOFLOW_READ_TIMEOUT = float(os.getenv('ROBOFLOW_READ_TIMEOUT', 30))
+    ROBOFLOW_BREAKER_FAILURES = int(os.getenv('ROBOFLOW_BREAKER_FAILURES', 5))
+    ROBOFLOW_BREAKER_RESET = float(os.getenv('ROBOFLOW_BREAKER_RESET', 30))
+    
+    # Bulk NPK Ingestion (/api/analysis/npk/bulk)
+    NPK_BULK_CHUNK_SIZE = int(os.getenv('NPK_BULK_CHUNK_SIZE', 1000))  # rows per INSERT executemany
+    NPK_BULK_MAX_ROWS = int(os.getenv('NPK_BULK_MAX_ROWS', 50000))
+    
+    # Write-behind Buffer (anonymous NPK readings, fertilizer recommendations)
+    # Rows are inserted in batches by a background thread; pending rows are
+    # spilled to WRITE_BEHIND_SPILL_DIR at exit and replayed on next start.
+    WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 500))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 1.0))  # seconds
+    WRITE_BEHIND_MAX_PENDING = int(os.getenv('WRITE_BEHIND_MAX_PENDING', 10000))  # sync writes when full
+    WRITE_BEHIND_SPILL_DIR = os.getenv('WRITE_BEHIND_SPILL_DIR', 'spill/write_behind')
+    
+    # Background Jobs (local worker pool, no external broker)
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', 32))  # 429 when full
+    JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 3600))  # seconds
+    JOB_MAX_BATCH_IMAGES = int(os.getenv('JOB_MAX_BATCH_IMAGES', 50))
+    
     # Redis Configuration
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     CACHE_TYPE = 'redis'
@@ -74,6 +178,37 @@ class Config:
     # Pagination
     ITEMS_PER_PAGE = 20
     MAX_ITEMS_PER_PAGE = 100
+    COUNT_ESTIMATE_CAP = int(os.getenv('COUNT_ESTIMATE_CAP', 10000))  # ?count=estimate on non-PostgreSQL
+    
+    # NPK Rollups (hourly/daily aggregates for dashboards)
+    # Buckets touched by new readings are refreshed on insert; run
+    # `flask rollup-npk` periodically (or with --all to backfill) as well.
+    ROLLUP_ON_INGEST = os.getenv('ROLLUP_ON_INGEST', 'true').lower() == 'true'
+    ROLLUP_MAX_POINTS = int(os.getenv('ROLLUP_MAX_POINTS', 500))  # per location series
+    ROLLUP_INGEST_MAX_BUCKETS = int(os.getenv('ROLLUP_INGEST_MAX_BUCKETS', 168))  # newest hours per insert
+    
+    # Geospatial Queries (geohash-indexed NPK readings)
+    GEO_MAX_CELLS = int(os.getenv('GEO_MAX_CELLS', 32))  # geohash cells per search box
+    GEO_MAX_RESULTS = int(os.getenv('GEO_MAX_RESULTS', 1000))
+    GEO_MAX_RADIUS_M = float(os.getenv('GEO_MAX_RADIUS_M', 500000))
+    GEO_MAX_NEAREST = int(os.getenv('GEO_MAX_NEAREST', 100))
+    GEO_NEAREST_START_RADIUS_M = float(os.getenv('GEO_NEAREST_START_RADIUS_M', 1000))
+    
+    # Heatmap Tiles (/api/analysis/tiles/<z>/<x>/<y>)
+    # Cached grids are dropped when readings land in the tile (per process)
+    # and expire after TILE_MAX_AGE, so other workers' inserts show up too.
+    TILE_GRID_SIZE = int(os.getenv('TILE_GRID_SIZE', 32))  # cells per tile side
+    TILE_MAX_ZOOM = int(os.getenv('TILE_MAX_ZOOM', 22))
+    TILE_SHARED_MAX_ZOOM = int(os.getenv('TILE_SHARED_MAX_ZOOM', 14))  # all-user tiles, ~75 m cells
+    TILE_MIN_CELL_USERS = int(os.getenv('TILE_MIN_CELL_USERS', 3))  # distinct users per cell on shared tiles
+    TILE_CACHE_MAX_ENTRIES = int(os.getenv('TILE_CACHE_MAX_ENTRIES', 2048))
+    TILE_MAX_AGE = int(os.getenv('TILE_MAX_AGE', 60))  # Cache-Control seconds
+    
+    # Data Export (/api/export/<dataset>)
+    EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 1000))  # rows per fetch / Parquet row group
+    
+    # JSON Responses
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')  # auto (orjson if installed), orjson or stdlib
 
 
 class DevelopmentConfig(Config):
@@ -96,6 +231,9 @@ class ProductionConfig(Config):
     
     # Production database (PostgreSQL recommended)
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 15000))
     
     # Stricter rate limiting in production
     RATELIMIT_DEFAULT = "50 per hour"
@@ -112,10 +250,15 @@ class TestingConfig(Config):
     
     # Use in-memory SQLite for testing
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLITE_PRAGMAS = {}
+    REPLICA_DATABASE_URL = None
     
     # Disable rate limiting in tests
     RATELIMIT_ENABLED = False
     
+    # Cheap password hashes in tests
+    PASSWORD_HASH_COST = 1024
+    
     # Disable CSRF in tests
     WTF_CSRF_ENABLED = False
 
@@ -0,0 +1,37 @@
+"""Lookup-table wrapper for single-feature hue classifiers."""
+import numpy as np
+
+
+class HueLookupModel:
+    """
+    Precomputed predictions of a classifier whose only input is a hue.
+    
+    The wrapped model is evaluated once on a fixed hue grid; ``predict`` and
+    ``predict_proba`` then round each input to the nearest grid point and
+    index into the table, which is much cheaper than an SVC call with
+    probability estimates. Results differ from the model only for hues
+    within ``step / 2`` of a decision boundary.
+    """
+    
+    def __init__(self, model, low=0.0, high=180.0, step=0.01):
+        self.low = low
+        self.high = high
+        self.step = step
+        self.classes_ = getattr(model, 'classes_', None)
+        
+        grid = np.arange(low, high + step / 2, step).reshape(-1, 1)
+        self.labels = np.asarray(model.predict(grid))
+        self.probabilities = np.asarray(model.predict_proba(grid))
+    
+    def _index(self, X):
+        hues = np.asarray(X, dtype=np.float64).reshape(len(X), -1)[:, 0]
+        index = np.rint((hues - self.low) / self.step).astype(np.intp)
+        return np.clip(index, 0, len(self.labels) - 1)
+    
+    def predict(self, X):
+        """Return the class label for each hue in X (shape (n, 1))."""
+        return self.labels[self._index(X)]
+    
+    def predict_proba(self, X):
+        """Return class probabilities for each hue in X (shape (n, 1))."""
+        return self.probabilities[self._index(X)]
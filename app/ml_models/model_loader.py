@@ -3,6 +3,7 @@ import os
 import joblib
 import threading
 from flask import current_app
+from app.ml_models.hue_lookup import HueLookupModel
 
 
 class ModelLoader:
@@ -11,6 +12,8 @@ class ModelLoader:
     _instance = None
     _lock = threading.Lock()
     _model_cache = {}
+    _version_cache = {}
+    _lookup_cache = {}
     
     def __new__(cls):
         if cls._instance is None:
@@ -19,6 +22,56 @@ class ModelLoader:
                     cls._instance = super().__new__(cls)
         return cls._instance
     
+    @staticmethod
+    def _resolve_path(model_name):
+        """Return the full path of a model file, or None if unknown."""
+        # Get model path from config
+        try:
+            model_paths = current_app.config['MODEL_PATHS']
+            ml_models_path = current_app.config['ML_MODELS_PATH']
+        except:
+            # Fallback if not in app context
+            model_paths = {
+                'bwd': 'bwd_model.pkl',
+                'recommendation': 'recommendation_model.pkl',
+                'crop_recommendation': 'crop_recommendation_model.pkl',
+                'yield_prediction': 'yield_prediction_model.pkl',
+                'advanced_yield': 'advanced_yield_model.pkl',
+                'shap_explainer': 'shap_explainer.pkl'
+            }
+            ml_models_path = '.'
+        
+        if model_name not in model_paths:
+            return None
+        
+        # Construct full path
+        return os.path.join(ml_models_path, model_paths[model_name])
+    
+    @classmethod
+    def get_model_version(cls, model_name):
+        """
+        Get a version string for a model based on its file metadata.
+        
+        Changes whenever the model file is replaced, so it can be used in
+        result cache keys. For a model that is already loaded, the version
+        of the file it was loaded from is returned.
+        
+        Args:
+            model_name: Name of the model
+            
+        Returns:
+            str: Version string ('missing' if the file does not exist)
+        """
+        if model_name in cls._version_cache:
+            return cls._version_cache[model_name]
+        
+        full_path = cls._resolve_path(model_name)
+        try:
+            stat = os.stat(full_path)
+        except (OSError, TypeError):
+            return f"{model_name}:missing"
+        return f"{model_name}:{stat.st_size}:{stat.st_mtime_ns}"
+    
     @classmethod
     def get_model(cls, model_name):
         """
@@ -35,35 +88,19 @@ class ModelLoader:
             if model_name in cls._model_cache:
                 return cls._model_cache[model_name]
             
-            # Get model path from config
-            try:
-                model_paths = current_app.config['MODEL_PATHS']
-                ml_models_path = current_app.config['ML_MODELS_PATH']
-            except:
-                # Fallback if not in app context
-                model_paths = {
-                    'bwd': 'bwd_model.pkl',
-                    'recommendation': 'recommendation_model.pkl',
-                    'crop_recommendation': 'crop_recommendation_model.pkl',
-                    'yield_prediction': 'yield_prediction_model.pkl',
-                    'advanced_yield': 'advanced_yield_model.pkl',
-                    'shap_explainer': 'shap_explainer.pkl'
-                }
-                ml_models_path = '.'
-            
-            if model_name not in model_paths:
+            full_path = cls._resolve_path(model_name)
+            if full_path is None:
                 current_app.logger.warning(f"Model '{model_name}' not found in MODEL_PATHS")
                 cls._model_cache[model_name] = None
                 return None
             
-            # Construct full path
-            model_file = model_paths[model_name]
-            full_path = os.path.join(ml_models_path, model_file)
-            
             # Load model
             if os.path.exists(full_path):
                 try:
+                    cls._version_cache.pop(model_name, None)
+                    version = cls.get_model_version(model_name)
                     cls._model_cache[model_name] = joblib.load(full_path)
+                    cls._version_cache[model_name] = version
                     current_app.logger.info(f"Model '{model_name}' loaded successfully")
                 except Exception as e:
                     current_app.logger.error(f"Failed to load model '{model_name}': {e}")
@@ -74,9 +111,38 @@ class ModelLoader:
             
             return cls._model_cache[model_name]
     
+    @classmethod
+    def get_hue_lookup(cls, model_name, step=0.01):
+        """
+        Get a lookup-table version of a hue-only classifier.
+        
+        The table is built on first use from the loaded model and cached
+        until the model is reloaded.
+        
+        Args:
+            model_name: Name of a model taking a single hue feature
+            step: Hue grid resolution
+            
+        Returns:
+            HueLookupModel or None if the model is not available
+        """
+        model = cls.get_model(model_name)
+        if model is None:
+            return None
+        
+        key = (model_name, step)
+        with cls._lock:
+            lookup = cls._lookup_cache.get(key)
+            if lookup is None or lookup[0] is not model:
+                lookup = (model, HueLookupModel(model, step=step))
+                cls._lookup_cache[key] = lookup
+            return lookup[1]
+    
     @classmethod
     def clear_cache(cls):
         """Clear all cached models."""
         with cls._lock:
             cls._model_cache.clear()
+            cls._version_cache.clear()
+            cls._lookup_cache.clear()
             current_app.logger.info("Model cache cleared")
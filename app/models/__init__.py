@@ -1,7 +1,9 @@
 """Database models for AgriSensa API."""
 from app.models.user import User
 from app.models.npk_reading import NpkReading
-from app.models.recommendation import Recommendation
+from app.models.recommendation import Recommendation, RecommendationResult
 from app.models.crop import Crop
+from app.models.job import Job
+from app.models.npk_rollup import NpkRollupHourly, NpkRollupDaily
 
-__all__ = ['User', 'NpkReading', 'Recommendation', 'Crop']
+__all__ = ['User', 'NpkReading', 'Recommendation', 'RecommendationResult', 'Crop', 'Job', 'NpkRollupHourly', 'NpkRollupDaily']
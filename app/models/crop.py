@@ -41,6 +41,14 @@ class Crop(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Keys of to_dict(), in order; read directly by the column-tuple fast path
+    SERIALIZED_FIELDS = (
+        'id', 'user_id', 'crop_name', 'crop_variety', 'crop_type', 'planting_date',
+        'expected_harvest_date', 'actual_harvest_date', 'area_size', 'location',
+        'expected_yield', 'actual_yield', 'yield_unit', 'status', 'notes', 'extra_data',
+        'created_at', 'updated_at'
+    )
+    
     def to_dict(self):
         """Convert crop to dictionary."""
         return {
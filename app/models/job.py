@@ -0,0 +1,58 @@
+"""Job model for asynchronous long-running analyses."""
+import uuid
+from datetime import datetime
+from app import db
+
+
+class Job(db.Model):
+    """Background job record (leaf batches, disease detection, SHAP)."""
+    
+    __tablename__ = 'jobs'
+    
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    FINAL_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED, STATUS_CANCELLED)
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default=STATUS_QUEUED, nullable=False, index=True)
+    cancel_requested = db.Column(db.Boolean, default=False, nullable=False)
+    
+    # Progress for batch jobs
+    progress = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer, default=0)
+    
+    # Outcome
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, index=True)
+    
+    def to_dict(self):
+        """Convert job to dictionary."""
+        return {
+            'job_id': self.id,
+            'user_id': self.user_id,
+            'type': self.job_type,
+            'status': self.status,
+            'cancel_requested': self.cancel_requested,
+            'progress': self.progress,
+            'total': self.total,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.job_type} - {self.status}>'
@@ -1,12 +1,51 @@
 """NPK Reading model for storing soil nutrient data."""
 from datetime import datetime
+from sqlalchemy.types import TypeDecorator
 from app import db
+from app.utils import npk_rules
+from app.utils.geohash import encode as encode_geohash
+
+
+def _geohash_default(context):
+    """Geohash of the row being inserted (ORM and Core executemany inserts)."""
+    if context is None:
+        return None
+    params = context.get_current_parameters()
+    return encode_geohash(params.get('latitude'), params.get('longitude'))
+
+
+class CompactNpkAnalysis(TypeDecorator):
+    """
+    JSON column for analyze_npk_values() results, stored compactly.
+    
+    An analysis produced by a known rule set is written as
+    ``[rules version, band code, value per nutrient]`` (about 25 bytes
+    instead of about 390) and rebuilt on load from the rule set's text table in
+    ``app.utils.npk_rules``. Any other value is stored as given.
+    """
+    
+    impl = db.JSON
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        return npk_rules.compact(value) or value
+    
+    def process_result_value(self, value, dialect):
+        if isinstance(value, list):
+            return npk_rules.expand(value)
+        return value
 
 
 class NpkReading(db.Model):
     """NPK Reading model for soil analysis."""
     
     __tablename__ = 'npk_readings'
+    __table_args__ = (
+        # History queries: WHERE user_id = ? ORDER BY timestamp DESC
+        db.Index('ix_npk_readings_user_id_timestamp', 'user_id', 'timestamp'),
+        # Map queries: WHERE geohash >= ? AND geohash < ? [AND timestamp ...]
+        db.Index('ix_npk_readings_geohash_timestamp', 'geohash', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
@@ -26,9 +65,16 @@ class NpkReading(db.Model):
     location = db.Column(db.String(100))
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12), default=_geohash_default)
+    
+    # Analysis results (band codes in the database, full dict in Python)
+    analysis_result = db.Column(CompactNpkAnalysis)
     
-    # Analysis results
-    analysis_result = db.Column(db.JSON)
+    # Keys of to_dict(), in order; read directly by the column-tuple fast path
+    SERIALIZED_FIELDS = (
+        'id', 'user_id', 'timestamp', 'n_value', 'p_value', 'k_value', 'ph_value',
+        'temperature', 'humidity', 'location', 'latitude', 'longitude', 'analysis_result'
+    )
     
     def to_dict(self):
         """Convert NPK reading to dictionary."""
@@ -0,0 +1,101 @@
+"""Hourly and daily NPK reading rollups for dashboards."""
+from app import db
+
+# Rolled-up metrics: (column prefix, NpkReading attribute)
+ROLLUP_METRICS = (
+    ('n', 'n_value'),
+    ('p', 'p_value'),
+    ('k', 'k_value'),
+    ('ph', 'ph_value'),
+    ('temperature', 'temperature'),
+    ('humidity', 'humidity')
+)
+
+
+class NpkRollupBase(db.Model):
+    """
+    Aggregates of NPK readings per user, location and time bucket.
+    
+    Sums are stored instead of means so buckets can be merged (hourly into
+    daily, daily into wider chart buckets) exactly. Each metric keeps its
+    own count because pH, temperature and humidity are optional.
+    """
+    
+    __abstract__ = True
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    location = db.Column(db.String(100))
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    n_count = db.Column(db.Integer, nullable=False, default=0)
+    n_min = db.Column(db.Float)
+    n_max = db.Column(db.Float)
+    n_sum = db.Column(db.Float)
+    
+    p_count = db.Column(db.Integer, nullable=False, default=0)
+    p_min = db.Column(db.Float)
+    p_max = db.Column(db.Float)
+    p_sum = db.Column(db.Float)
+    
+    k_count = db.Column(db.Integer, nullable=False, default=0)
+    k_min = db.Column(db.Float)
+    k_max = db.Column(db.Float)
+    k_sum = db.Column(db.Float)
+    
+    ph_count = db.Column(db.Integer, nullable=False, default=0)
+    ph_min = db.Column(db.Float)
+    ph_max = db.Column(db.Float)
+    ph_sum = db.Column(db.Float)
+    
+    temperature_count = db.Column(db.Integer, nullable=False, default=0)
+    temperature_min = db.Column(db.Float)
+    temperature_max = db.Column(db.Float)
+    temperature_sum = db.Column(db.Float)
+    
+    humidity_count = db.Column(db.Integer, nullable=False, default=0)
+    humidity_min = db.Column(db.Float)
+    humidity_max = db.Column(db.Float)
+    humidity_sum = db.Column(db.Float)
+    
+    def to_dict(self):
+        """Convert rollup bucket to dictionary with min/max/mean per metric."""
+        data = {
+            'bucket_start': self.bucket_start.isoformat() if self.bucket_start else None,
+            'location': self.location,
+            'count': self.count
+        }
+        for prefix, _ in ROLLUP_METRICS:
+            count = getattr(self, f'{prefix}_count')
+            data[prefix] = {
+                'count': count,
+                'min': getattr(self, f'{prefix}_min'),
+                'max': getattr(self, f'{prefix}_max'),
+                'mean': round(getattr(self, f'{prefix}_sum') / count, 3) if count else None
+            }
+        return data
+
+
+class NpkRollupHourly(NpkRollupBase):
+    """Hourly NPK rollup bucket."""
+    
+    __tablename__ = 'npk_rollups_hourly'
+    __table_args__ = (
+        db.Index('ix_npk_rollups_hourly_user_id_bucket', 'user_id', 'bucket_start'),
+    )
+    
+    def __repr__(self):
+        return f'<NpkRollupHourly {self.location} {self.bucket_start}>'
+
+
+class NpkRollupDaily(NpkRollupBase):
+    """Daily NPK rollup bucket."""
+    
+    __tablename__ = 'npk_rollups_daily'
+    __table_args__ = (
+        db.Index('ix_npk_rollups_daily_user_id_bucket', 'user_id', 'bucket_start'),
+    )
+    
+    def __repr__(self):
+        return f'<NpkRollupDaily {self.location} {self.bucket_start}>'
@@ -1,12 +1,39 @@
 """Recommendation model for storing fertilizer and crop recommendations."""
 from datetime import datetime
+from sqlalchemy import case, select, type_coerce
 from app import db
 
 
+class RecommendationResult(db.Model):
+    """
+    Model output shared by every recommendation with the same input.
+    
+    Keyed by the hash of the normalized model input and the model version
+    (RecommendationService.input_hash), so a retrained model never reuses
+    results of the previous one.
+    """
+    
+    __tablename__ = 'recommendation_results'
+    
+    input_hash = db.Column(db.String(40), primary_key=True)
+    recommendation_type = db.Column(db.String(50))
+    model_version = db.Column(db.String(200))
+    recommendation_data = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RecommendationResult {self.recommendation_type} {self.input_hash}>'
+
+
 class Recommendation(db.Model):
     """Recommendation model for fertilizer and crop advice."""
     
     __tablename__ = 'recommendations'
+    __table_args__ = (
+        # History queries, with and without a type filter
+        db.Index('ix_recommendations_user_id_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_recommendations_user_id_type_timestamp', 'user_id', 'recommendation_type', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
@@ -18,8 +45,22 @@ class Recommendation(db.Model):
     # Input parameters
     input_data = db.Column(db.JSON)
     
-    # Recommendation results
+    # Recommendation results: stored inline, or shared through input_hash
+    # (recommendation_data is then empty)
     recommendation_data = db.Column(db.JSON)
+    input_hash = db.Column(db.String(40), db.ForeignKey('recommendation_results.input_hash'), index=True)
+    resolved_recommendation_data = db.column_property(type_coerce(
+        case(
+            (
+                input_hash.isnot(None),
+                select(RecommendationResult.recommendation_data)
+                .where(RecommendationResult.input_hash == input_hash)
+                .scalar_subquery()
+            ),
+            else_=recommendation_data
+        ),
+        db.JSON
+    ))
     
     # Crop information
     crop_type = db.Column(db.String(50))
@@ -35,6 +76,14 @@ class Recommendation(db.Model):
     rating = db.Column(db.Integer)  # 1-5 stars
     feedback = db.Column(db.Text)
     
+    # Keys of to_dict(), in order; read directly by the column-tuple fast path
+    SERIALIZED_FIELDS = (
+        'id', 'user_id', 'timestamp', 'recommendation_type', 'input_data', 'recommendation_data',
+        'crop_type', 'crop_stage', 'location', 'status', 'rating', 'feedback'
+    )
+    # Fields read from another attribute by column-tuple readers
+    SERIALIZED_EXPRESSIONS = {'recommendation_data': 'resolved_recommendation_data'}
+    
     def to_dict(self):
         """Convert recommendation to dictionary."""
         return {
@@ -43,7 +92,7 @@ class Recommendation(db.Model):
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
             'recommendation_type': self.recommendation_type,
             'input_data': self.input_data,
-            'recommendation_data': self.recommendation_data,
+            'recommendation_data': self.resolved_recommendation_data,
             'crop_type': self.crop_type,
             'crop_stage': self.crop_stage,
             'location': self.location,
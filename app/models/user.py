@@ -1,7 +1,7 @@
 """User model for authentication and authorization."""
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
+from app.utils.passwords import PasswordHasher
 
 
 class User(db.Model):
@@ -29,12 +29,25 @@ class User(db.Model):
     npk_readings = db.relationship('NpkReading', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     
     def set_password(self, password):
-        """Hash and set the user password."""
-        self.password_hash = generate_password_hash(password)
+        """Hash and set the user password (on the password hashing pool)."""
+        self.password_hash = PasswordHasher.get_hasher().hash(password)
     
     def check_password(self, password):
         """Check if the provided password matches the hash."""
-        return check_password_hash(self.password_hash, password)
+        return PasswordHasher.get_hasher().verify(self.password_hash, password)
+    
+    def rehash_password(self, password):
+        """
+        Re-hash a just-verified password if its hash uses outdated parameters.
+        
+        Returns:
+            bool: True if password_hash changed (the caller commits)
+        """
+        hasher = PasswordHasher.get_hasher()
+        if not hasher.needs_rehash(self.password_hash):
+            return False
+        self.password_hash = hasher.hash(password, rehash=True)
+        return True
     
     def to_dict(self):
         """Convert user object to dictionary."""
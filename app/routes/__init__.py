@@ -7,6 +7,8 @@ from app.routes.market import market_bp
 from app.routes.ml import ml_bp
 from app.routes.auth import auth_bp
 from app.routes.legacy import legacy_bp
+from app.routes.jobs import jobs_bp
+from app.routes.export import export_bp
 
 __all__ = [
     'main_bp',
@@ -16,5 +18,7 @@ __all__ = [
     'market_bp',
     'ml_bp',
     'auth_bp',
-    'legacy_bp'
+    'legacy_bp',
+    'jobs_bp',
+    'export_bp'
 ]
@@ -1,10 +1,27 @@
 """Analysis routes for leaf and soil analysis."""
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import json
+import math
+from datetime import datetime, timedelta
+import numpy as np
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from werkzeug.wsgi import get_input_stream
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from app import db, limiter
 from app.models.npk_reading import NpkReading
 from app.services.analysis_service import AnalysisService
-import base64
+from app.services.npk_ingest_service import NpkIngestService
+from app.services.write_behind_service import WriteBehindBuffer
+from app.services.rollup_service import RollupService
+from app.services.geo_service import GeoService
+from app.services.tile_service import TileService, TILE_METRICS
+from app.utils.upload_buffer import UploadBuffer
+from app.utils.result_cache import ResultCache
+from app.utils.frame_stream import FrameReader
+from app.utils.pagination import paginate
+from app.utils.row_encoder import RowEncoder
+from app.utils.replica import read_session
+from app.utils.columnar import response_format
+from app.utils.time_params import parse_utc
 
 analysis_bp = Blueprint('analysis', __name__)
 
@@ -21,20 +38,37 @@ def analyze_bwd():
             file = request.files['file']
             if file.filename == '':
                 return jsonify({'success': False, 'error': 'No file selected'}), 400
-            image_bytes = file.read()
+            image_bytes = UploadBuffer.file_view(file)
         else:
             # Fallback: JSON with base64 image
             data = request.get_json(silent=True) or {}
             b64 = data.get('image_base64')
             if b64:
                 try:
-                    image_bytes = base64.b64decode(b64.split(',')[-1])
+                    image_bytes = UploadBuffer.decode_base64(b64)
                 except Exception:
                     return jsonify({'success': False, 'error': 'Invalid base64 image'}), 400
         
         if not image_bytes:
             return jsonify({'success': False, 'error': 'No image provided (file or image_base64)'}), 400
         
+        mode = request.args.get('mode') or request.form.get('mode') \
+            or (request.get_json(silent=True) or {}).get('mode') or 'single'
+        if mode == 'multi':
+            result = AnalysisService.analyze_leaf_image_multi(image_bytes)
+            
+            if result is None:
+                return jsonify({'success': False, 'message': 'No leaf-like area detected (green mask empty)'}), 400
+            
+            return jsonify({
+                'success': True,
+                'mode': 'multi',
+                **result
+            }), 200
+        
+        if mode != 'single':
+            return jsonify({'success': False, 'error': "Invalid mode (use 'single' or 'multi')"}), 400
+        
         result = AnalysisService.analyze_leaf_image(image_bytes)
         
         if result is None:
@@ -55,10 +89,85 @@ def analyze_bwd():
         }), 500
 
 
+@analysis_bp.route('/bwd/stream', methods=['POST'])
+@limiter.limit("20 per hour")
+def analyze_bwd_stream():
+    """
+    Analyze an MJPEG or multipart frame stream for BWD scores.
+    
+    The body is read incrementally (chunked uploads are supported) and
+    results are streamed back as newline-delimited JSON: one ``frame``
+    record per analysed frame, a running ``aggregate`` every
+    ``aggregate_every`` frames and a final ``summary``.
+    
+    Query parameters:
+        budget_ms: Average processing time per incoming frame; frames are
+            skipped when analysis falls behind
+        every: Only consider every Nth frame
+        aggregate_every: Analysed frames between aggregate records
+    """
+    config = current_app.config
+    budget_ms = request.args.get('budget_ms', config.get('BWD_STREAM_BUDGET_MS'), type=float)
+    every = request.args.get('every', 1, type=int)
+    aggregate_every = request.args.get('aggregate_every', config.get('BWD_STREAM_AGGREGATE_EVERY', 10), type=int)
+    
+    if every < 1 or aggregate_every < 0 or (budget_ms is not None and budget_ms <= 0):
+        return jsonify({
+            'success': False,
+            'error': 'every must be >= 1, aggregate_every >= 0 and budget_ms > 0'
+        }), 400
+    
+    # Read the raw body ourselves: the stream may be far larger than
+    # MAX_CONTENT_LENGTH, but only one frame is buffered at a time.
+    stream = get_input_stream(request.environ, max_content_length=config.get('BWD_STREAM_MAX_BYTES'))
+    frames = FrameReader(
+        stream,
+        chunk_size=config.get('BWD_STREAM_CHUNK_SIZE', 64 * 1024),
+        max_frame_bytes=config.get('BWD_STREAM_MAX_FRAME_BYTES', 8 * 1024 * 1024)
+    )
+    
+    def generate():
+        try:
+            for record in AnalysisService.analyze_frame_stream(
+                frames, budget_ms=budget_ms, every=every, aggregate_every=aggregate_every
+            ):
+                if record['type'] == 'summary':
+                    record['bytes_read'] = frames.bytes_read
+                    record['frames_oversized'] = frames.oversized
+                yield json.dumps(record) + '\n'
+        except Exception as e:
+            current_app.logger.error(f"BWD stream failed: {e}", exc_info=True)
+            yield json.dumps({'type': 'error', 'error': 'Stream analysis failed', 'message': str(e)}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@analysis_bp.route('/write-behind/stats', methods=['GET'])
+def get_write_behind_stats():
+    """Get write-behind queue depth and flush latency metrics."""
+    return jsonify({
+        'success': True,
+        'write_behind': WriteBehindBuffer.stats()
+    }), 200
+
+
+@analysis_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get hit/miss counters for the result caches and the map tile cache."""
+    return jsonify({
+        'success': True,
+        'caches': ResultCache.all_stats(),
+        'tiles': TileService.stats()
+    }), 200
+
+
 @analysis_bp.route('/npk', methods=['POST'])
 @limiter.limit("30 per hour")
 def analyze_npk():
     """Analyze NPK values and store reading."""
+    # Outside the try: a malformed or expired token gets flask-jwt-extended's 401/422
+    # instead of turning the reading into an anonymous one
+    verify_jwt_in_request(optional=True)
     try:
         data = request.get_json()
         
@@ -70,12 +179,21 @@ def analyze_npk():
                 'error': 'Missing required NPK values'
             }), 400
         
-        # Get user ID if authenticated
-        user_id = None
-        try:
-            user_id = get_jwt_identity()
-        except:
-            pass  # Allow anonymous analysis
+        # Optional pH: stored and analysed as a number within [0, 14]
+        ph_value = data.get('ph_value')
+        if ph_value is not None:
+            try:
+                ph_value = math.nan if isinstance(ph_value, bool) else float(ph_value)
+            except (TypeError, ValueError):
+                ph_value = math.nan
+            if not 0 <= ph_value <= 14:  # also rejects NaN
+                return jsonify({
+                    'success': False,
+                    'error': 'ph_value must be a number within [0, 14]'
+                }), 400
+        
+        # Get user ID if authenticated (None for anonymous analysis)
+        user_id = get_jwt_identity()
         
         # Create NPK reading
         reading = NpkReading(
@@ -83,23 +201,46 @@ def analyze_npk():
             n_value=int(data['n_value']),
             p_value=int(data['p_value']),
             k_value=int(data['k_value']),
-            ph_value=data.get('ph_value'),
+            ph_value=ph_value,
             temperature=data.get('temperature'),
             humidity=data.get('humidity'),
-            location=data.get('location')
+            location=data.get('location'),
+            latitude=data.get('latitude'),
+            longitude=data.get('longitude')
         )
         
-        # Analyze NPK values
+        # Analyze NPK (and pH) values with the crop's rule set, if one is given
         analysis = AnalysisService.analyze_npk_values(
             reading.n_value,
             reading.p_value,
-            reading.k_value
+            reading.k_value,
+            ph_value=reading.ph_value,
+            crop=data.get('crop')
         )
         
         reading.analysis_result = analysis
         
+        # Defer anonymous INSERTs unless the caller needs the reading id (?sync=true);
+        # a signed-in user's reading must show up in their history right away
+        sync = request.args.get('sync', 'false').lower() == 'true'
+        if not sync and user_id is None and WriteBehindBuffer.add(reading):
+            return jsonify({
+                'success': True,
+                'reading_id': None,
+                'queued': True,
+                'analysis': analysis
+            }), 202
+        
         db.session.add(reading)
         db.session.commit()
+        inserted = [{
+            'user_id': reading.user_id,
+            'timestamp': reading.timestamp,
+            'latitude': reading.latitude,
+            'longitude': reading.longitude
+        }]
+        RollupService.on_readings_inserted(inserted)
+        TileService.invalidate_readings(inserted)
         
         return jsonify({
             'success': True,
@@ -116,6 +257,72 @@ def analyze_npk():
         }), 500
 
 
+def _read_bulk_readings():
+    """
+    Parse readings from a JSON array, ``{"readings": [...]}`` or NDJSON body.
+    
+    NDJSON is read line by line from the request stream; a line that is not
+    valid JSON becomes a None entry, which validation rejects.
+    
+    Returns:
+        list or None if the body is not in a supported format
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        readings = []
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                readings.append(json.loads(line))
+            except ValueError:
+                readings.append(None)
+        return readings
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('readings')
+    return data if isinstance(data, list) else None
+
+
+@analysis_bp.route('/npk/bulk', methods=['POST'])
+@limiter.limit("120 per hour")
+def ingest_npk_bulk():
+    """Ingest a batch of NPK sensor readings (JSON array or NDJSON); ?crop= selects the rule set."""
+    # Outside the try: a malformed or expired token gets flask-jwt-extended's 401/422
+    verify_jwt_in_request(optional=True)
+    try:
+        readings = _read_bulk_readings()
+        
+        if readings is None:
+            return jsonify({
+                'success': False,
+                'error': 'Body must be a JSON array, {"readings": [...]} or NDJSON'
+            }), 400
+        
+        max_rows = current_app.config.get('NPK_BULK_MAX_ROWS', 50000)
+        if not readings or len(readings) > max_rows:
+            return jsonify({
+                'success': False,
+                'error': f'Between 1 and {max_rows} readings are required'
+            }), 400
+        
+        summary = NpkIngestService.ingest(readings, user_id=get_jwt_identity(), crop=request.args.get('crop'))
+        
+        return jsonify({
+            'success': summary['accepted'] > 0,
+            **summary
+        }), 201 if summary['accepted'] else 400
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'NPK bulk ingestion failed',
+            'message': str(e)
+        }), 500
+
+
 @analysis_bp.route('/npk/history', methods=['GET'])
 @jwt_required()
 def get_npk_history():
@@ -123,21 +330,21 @@ def get_npk_history():
     try:
         user_id = get_jwt_identity()
         
-        # Get pagination parameters
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        # Query readings
-        readings = NpkReading.query.filter_by(user_id=user_id)\
-            .order_by(NpkReading.timestamp.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
+        # Query readings as column tuples (?page=N or ?after=<cursor>)
+        encoder = RowEncoder.for_model(NpkReading)
+        try:
+            output_format = response_format()
+            query = encoder.query(read_session(user_id)).filter(NpkReading.user_id == user_id)
+            readings = paginate(query, NpkReading)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
+        items = readings.pop('items')
         return jsonify({
             'success': True,
-            'readings': [r.to_dict() for r in readings.items],
-            'total': readings.total,
-            'page': readings.page,
-            'pages': readings.pages
+            'format': output_format,
+            'readings': encoder.encode_columns(items) if output_format == 'columnar' else encoder.encode_many(items),
+            **readings
         }), 200
         
     except Exception as e:
@@ -146,3 +353,251 @@ def get_npk_history():
             'error': 'Failed to get NPK history',
             'message': str(e)
         }), 500
+
+
+@analysis_bp.route('/npk/rollups', methods=['GET'])
+@jwt_required()
+def get_npk_rollups():
+    """Get NPK min/max/mean series for charts at a resolution fitting max_points."""
+    try:
+        user_id = get_jwt_identity()
+        
+        now = datetime.utcnow()
+        max_allowed = current_app.config.get('ROLLUP_MAX_POINTS', 500)
+        try:
+            end = parse_utc(request.args.get('end'), now)
+            start = parse_utc(request.args.get('start'), end - timedelta(days=30))
+            max_points = int(request.args.get('max_points', max_allowed))
+            output_format = response_format()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if start >= end:
+            return jsonify({'success': False, 'error': 'start must be before end'}), 400
+        if not 1 <= max_points <= max_allowed:
+            return jsonify({
+                'success': False,
+                'error': f'max_points must be between 1 and {max_allowed}'
+            }), 400
+        
+        rollups = RollupService.query_series(
+            user_id, start, end, max_points,
+            location=request.args.get('location'),
+            session=read_session(user_id),
+            crop=request.args.get('crop')
+        )
+        if output_format == 'columnar':
+            rollups = RollupService.columnar_series(rollups)
+        
+        return jsonify({
+            'success': True,
+            'format': output_format,
+            **rollups
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Failed to get NPK rollups',
+            'message': str(e)
+        }), 500
+
+
+def _geo_float(name, low, high, default=None):
+    """Read a required (or defaulted) float query parameter within [low, high]."""
+    value = request.args.get(name, default)
+    if value is None:
+        raise ValueError(f'{name} is required')
+    try:
+        value = float(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'{name} must be a number') from e
+    if not low <= value <= high:
+        raise ValueError(f'{name} must be within [{low}, {high}]')
+    return value
+
+
+def _geo_window():
+    """Optional start/end (ISO 8601) and limit query parameters."""
+    max_results = current_app.config.get('GEO_MAX_RESULTS', 1000)
+    start = parse_utc(request.args.get('start'))
+    end = parse_utc(request.args.get('end'))
+    limit = int(_geo_float('limit', 1, max_results, default=max_results))
+    return start, end, limit
+
+
+@analysis_bp.route('/npk/geo/bbox', methods=['GET'])
+@jwt_required()
+def get_npk_in_bbox():
+    """Get readings inside a bounding box (min_lon > max_lon crosses the antimeridian)."""
+    try:
+        try:
+            min_lat = _geo_float('min_lat', -90, 90)
+            max_lat = _geo_float('max_lat', -90, 90)
+            min_lon = _geo_float('min_lon', -180, 180)
+            max_lon = _geo_float('max_lon', -180, 180)
+            start, end, limit = _geo_window()
+            if min_lat > max_lat:
+                raise ValueError('min_lat must not exceed max_lat')
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        readings, truncated = GeoService.within_bbox(
+            min_lat, min_lon, max_lat, max_lon, get_jwt_identity(),
+            start=start, end=end, limit=limit
+        )
+        
+        return jsonify({
+            'success': True,
+            'readings': [r.to_dict() for r in readings],
+            'count': len(readings),
+            'truncated': truncated
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Bounding box query failed',
+            'message': str(e)
+        }), 500
+
+
+@analysis_bp.route('/npk/geo/radius', methods=['GET'])
+@jwt_required()
+def get_npk_in_radius():
+    """Get readings within radius_m metres of (lat, lon), nearest first."""
+    try:
+        try:
+            lat = _geo_float('lat', -90, 90)
+            lon = _geo_float('lon', -180, 180)
+            radius_m = _geo_float('radius_m', 0, current_app.config.get('GEO_MAX_RADIUS_M', 500000))
+            start, end, limit = _geo_window()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        hits, truncated = GeoService.within_radius(
+            lat, lon, radius_m, get_jwt_identity(),
+            start=start, end=end, limit=limit
+        )
+        
+        return jsonify({
+            'success': True,
+            'readings': [{**r.to_dict(), 'distance_m': distance} for r, distance in hits],
+            'count': len(hits),
+            'truncated': truncated
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Radius query failed',
+            'message': str(e)
+        }), 500
+
+
+@analysis_bp.route('/npk/geo/nearest', methods=['GET'])
+@jwt_required()
+def get_npk_nearest():
+    """Get the n readings nearest to (lat, lon)."""
+    try:
+        try:
+            lat = _geo_float('lat', -90, 90)
+            lon = _geo_float('lon', -180, 180)
+            n = int(_geo_float('n', 1, current_app.config.get('GEO_MAX_NEAREST', 100), default=10))
+            start, end, _ = _geo_window()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        hits, radius_m = GeoService.nearest(lat, lon, n, get_jwt_identity(), start=start, end=end)
+        
+        return jsonify({
+            'success': True,
+            'readings': [{**r.to_dict(), 'distance_m': distance} for r, distance in hits],
+            'count': len(hits),
+            'search_radius_m': round(radius_m, 2)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Nearest query failed',
+            'message': str(e)
+        }), 500
+
+
+@analysis_bp.route('/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+@analysis_bp.route('/tiles/<int:z>/<int:x>/<int:y>.<fmt>', methods=['GET'])
+@limiter.limit("3000 per hour")
+def get_npk_tile(z, x, y, fmt=None):
+    """
+    Get a heatmap tile of NPK readings (Web Mercator z/x/y, auth required).
+    
+    ``?mine=true`` limits the tile to the caller's readings. Otherwise all
+    readings are aggregated, only up to TILE_SHARED_MAX_ZOOM, and cells
+    with readings of fewer than TILE_MIN_CELL_USERS users are left out, so
+    no single farmer's plot can be located.
+    """
+    verify_jwt_in_request()
+    mine = request.args.get('mine', 'false').lower() == 'true'
+    user_id = get_jwt_identity() if mine else None
+    
+    try:
+        fmt = (fmt or request.args.get('format', 'json')).lower()
+        metric = request.args.get('metric', 'n')
+        max_zoom = current_app.config.get('TILE_MAX_ZOOM', 22)
+        if not mine:
+            max_zoom = min(max_zoom, current_app.config.get('TILE_SHARED_MAX_ZOOM', 14))
+        
+        if fmt not in ('json', 'png'):
+            return jsonify({'success': False, 'error': 'format must be json or png'}), 400
+        if metric not in TILE_METRICS:
+            return jsonify({'success': False, 'error': f'metric must be one of {list(TILE_METRICS)}'}), 400
+        if z > max_zoom or x >= 1 << z or y >= 1 << z:
+            return jsonify({'success': False, 'error': f'Invalid tile (max zoom {max_zoom})'}), 400
+        
+        try:
+            start = parse_utc(request.args.get('start'))
+            end = parse_utc(request.args.get('end'))
+            value_range = None
+            if 'vmin' in request.args or 'vmax' in request.args:
+                low, high = TILE_METRICS[metric][1]
+                value_range = (float(request.args.get('vmin', low)), float(request.args.get('vmax', high)))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        min_users = 1 if mine else current_app.config.get('TILE_MIN_CELL_USERS', 3)
+        grid = TileService.get_grid(z, x, y, user_id=user_id, start=start, end=end)
+        cache_control = f"private, max-age={current_app.config.get('TILE_MAX_AGE', 60)}"
+        
+        if fmt == 'png':
+            response = Response(
+                TileService.render_png(grid, metric, min_users=min_users, value_range=value_range),
+                mimetype='image/png'
+            )
+            response.headers['Cache-Control'] = cache_control
+            return response
+        
+        index, counts, means = TileService.cell_means(grid, metric, min_users=min_users)
+        response = jsonify({
+            'success': True,
+            'z': z,
+            'x': x,
+            'y': y,
+            'metric': metric,
+            'grid': grid['grid'],
+            # Parallel arrays; cell = row * grid + col
+            'cells': {
+                'index': index,
+                'count': counts,
+                'mean': np.round(means, 3)
+            }
+        })
+        response.headers['Cache-Control'] = cache_control
+        return response
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Tile rendering failed',
+            'message': str(e)
+        }), 500
@@ -1,5 +1,5 @@
 """Authentication routes for user management."""
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
@@ -9,10 +9,22 @@ from flask_jwt_extended import (
 )
 from app import db, limiter
 from app.models.user import User
+from app.utils.passwords import PasswordHasher, PasswordHasherBusy
 
 auth_bp = Blueprint('auth', __name__)
 
 
+def _hasher_busy_response():
+    """503 for requests that found the password hashing pool full."""
+    response = jsonify({
+        'success': False,
+        'error': 'Server busy',
+        'message': 'Too many sign-ins in progress. Please retry shortly.'
+    })
+    response.headers['Retry-After'] = '2'
+    return response, 503
+
+
 @auth_bp.route('/register', methods=['POST'])
 @limiter.limit("5 per hour")
 def register():
@@ -68,6 +80,9 @@ def register():
             'refresh_token': refresh_token
         }), 201
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return _hasher_busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -106,6 +121,14 @@ def login():
                 'error': 'Account is deactivated'
             }), 403
         
+        # Move the stored hash to the current method and cost; login works either way
+        try:
+            if user.rehash_password(data['password']):
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Password rehash skipped for user {user.id}: {e}")
+        
         # Create tokens
         access_token = create_access_token(identity=user.id)
         refresh_token = create_refresh_token(identity=user.id)
@@ -118,6 +141,8 @@ def login():
             'refresh_token': refresh_token
         }), 200
         
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
     except Exception as e:
         return jsonify({
             'success': False,
@@ -251,6 +276,9 @@ def change_password():
             'message': 'Password changed successfully'
         }), 200
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return _hasher_busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -258,3 +286,20 @@ def change_password():
             'error': 'Failed to change password',
             'message': str(e)
         }), 500
+
+
+@auth_bp.route('/password-hash/stats', methods=['GET'])
+@jwt_required()
+def get_password_hash_stats():
+    """Get password hashing pool settings, counters and wait times (admin only)."""
+    user = User.query.get(get_jwt_identity())
+    if not user or user.role != 'admin':
+        return jsonify({
+            'success': False,
+            'error': 'Admin access required'
+        }), 403
+    
+    return jsonify({
+        'success': True,
+        'password_hash': PasswordHasher.get_hasher().stats()
+    }), 200
@@ -0,0 +1,71 @@
+"""Data export routes (CSV, NDJSON, Parquet)."""
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app import limiter
+from app.services.export_service import ExportService, ExportUnavailable, EXPORTS, EXPORT_FORMATS
+from app.utils.replica import read_session
+from app.utils.time_params import parse_utc
+
+export_bp = Blueprint('export', __name__)
+
+
+@export_bp.route('/<dataset>', methods=['GET'])
+@jwt_required()
+@limiter.limit("20 per hour")
+def export_dataset(dataset):
+    """
+    Stream the current user's rows of a dataset as a file download.
+    
+    Datasets: npk-readings, recommendations, crops.
+    
+    Query parameters:
+        format: csv (default), ndjson or parquet
+        gzip: 'true' to gzip the file on the fly
+        start, end: ISO 8601 window on the row timestamp
+    """
+    try:
+        export_format = request.args.get('format', 'csv').lower()
+        gzip = request.args.get('gzip', 'false').lower() == 'true'
+        
+        if dataset not in EXPORTS:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown dataset. Supported: {list(EXPORTS)}'
+            }), 404
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f'format must be one of {list(EXPORT_FORMATS)}'
+            }), 400
+        
+        try:
+            start = parse_utc(request.args.get('start'))
+            end = parse_utc(request.args.get('end'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        try:
+            user_id = get_jwt_identity()
+            chunks = ExportService.stream(
+                dataset, export_format, user_id,
+                start=start, end=end, gzip=gzip, session=read_session(user_id)
+            )
+        except ExportUnavailable as e:
+            return jsonify({'success': False, 'error': str(e)}), 501
+        
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        filename = f"{dataset}.{extension}{'.gz' if gzip else ''}"
+        response = Response(
+            stream_with_context(chunks),
+            mimetype='application/gzip' if gzip else mimetype
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Export failed',
+            'message': str(e)
+        }), 500
@@ -0,0 +1,169 @@
+"""Asynchronous job routes for long-running analyses."""
+import base64
+import binascii
+from flask import Blueprint, request, jsonify, current_app, url_for
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from app import limiter
+from app.services.job_service import JobService, JobQueueFull
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def _current_user_id():
+    """Return the JWT identity if a valid token was sent, else None."""
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+
+def _decode_images(values):
+    """Decode a list of base64 strings (data URLs allowed) into bytes."""
+    return [base64.b64decode(value.split(',')[-1]) for value in values]
+
+
+def _build_payload(job_type):
+    """
+    Build the in-memory job payload from the request.
+    
+    Accepts JSON (``images_base64`` / ``image_base64`` / ``data``) or
+    multipart form data (``type`` field plus ``file``/``files`` parts).
+    Uploaded bytes are copied because the job outlives the request.
+    
+    Returns:
+        tuple: (payload, error message)
+    """
+    data = request.get_json(silent=True) or {}
+    max_images = current_app.config.get('JOB_MAX_BATCH_IMAGES', 50)
+    
+    if job_type == 'leaf_batch':
+        if request.files:
+            images = [f.read() for f in request.files.getlist('files') + request.files.getlist('file')]
+        else:
+            images = _decode_images(data.get('images_base64') or [])
+        if not images:
+            return None, 'No images provided (files or images_base64)'
+        if len(images) > max_images:
+            return None, f'Too many images (max {max_images})'
+        return {'images': images}, None
+    
+    if job_type == 'disease_detection':
+        if 'file' in request.files:
+            image = request.files['file'].read()
+        elif data.get('image_base64'):
+            image = _decode_images([data['image_base64']])[0]
+        else:
+            image = None
+        if not image:
+            return None, 'No image provided (file or image_base64)'
+        return {'image': image}, None
+    
+    if job_type == 'yield_explanation':
+        params = data.get('data')
+        required_fields = ['nitrogen', 'phosphorus', 'potassium', 'temperature', 'rainfall', 'ph']
+        if not isinstance(params, dict) or not all(field in params for field in required_fields):
+            return None, f'Missing required fields in data: {required_fields}'
+        return {'data': params}, None
+    
+    return None, f'Unknown job type. Supported: {JobService.job_types()}'
+
+
+@jobs_bp.route('', methods=['POST'])
+@limiter.limit("30 per hour")
+def create_job():
+    """Submit a long-running analysis job."""
+    try:
+        data = request.get_json(silent=True) or {}
+        job_type = data.get('type') or request.form.get('type')
+        
+        if not job_type:
+            return jsonify({
+                'success': False,
+                'error': 'Job type is required',
+                'types': JobService.job_types()
+            }), 400
+        
+        try:
+            payload, error = _build_payload(job_type)
+        except (binascii.Error, ValueError):
+            return jsonify({'success': False, 'error': 'Invalid base64 image'}), 400
+        
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        try:
+            job = JobService.submit(job_type, payload, user_id=_current_user_id())
+        except JobQueueFull:
+            response = jsonify({
+                'success': False,
+                'error': 'Job queue is full',
+                'message': 'Too many pending jobs. Please retry later.'
+            })
+            response.headers['Retry-After'] = '5'
+            return response, 429
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict(),
+            'status_url': url_for('jobs.get_job', job_id=job.id)
+        }), 202
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Failed to submit job',
+            'message': str(e)
+        }), 500
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get job status and result."""
+    try:
+        job = JobService.get(job_id)
+        
+        if job is None or (job.user_id is not None and str(job.user_id) != str(_current_user_id())):
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Failed to get job',
+            'message': str(e)
+        }), 500
+
+
+@jobs_bp.route('/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job."""
+    try:
+        job = JobService.get(job_id)
+        
+        if job is None or (job.user_id is not None and str(job.user_id) != str(_current_user_id())):
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
+        
+        job = JobService.cancel(job_id)
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Failed to cancel job',
+            'message': str(e)
+        }), 500
@@ -2,14 +2,15 @@
 from flask import Blueprint, request, jsonify, send_from_directory, current_app
 from werkzeug.utils import secure_filename
 import os
-import uuid
-from inference_sdk import InferenceHTTPClient
 from app.services.analysis_service import AnalysisService
 from app.services.recommendation_service import RecommendationService
 from app.services.knowledge_service import KnowledgeService
 from app.services.market_service import MarketService
 from app.services.ml_service import MLService
+from app.services.disease_service import DiseaseService, RoboflowUnavailable
 from app.models.npk_reading import NpkReading
+from app.utils.upload_buffer import UploadBuffer
+from app.utils.columnar import encode_columns, response_format
 from app import db
 
 legacy_bp = Blueprint('legacy', __name__)
@@ -20,9 +21,9 @@ recommendation_service = RecommendationService()
 knowledge_service = KnowledgeService()
 market_service = MarketService()
 ml_service = MLService()
+disease_service = DiseaseService()
 
 UPLOAD_FOLDER = 'uploads/pdfs'
-TEMP_IMAGE_FOLDER = 'uploads/temp_images'
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
 
 
@@ -42,7 +43,7 @@ def analyze_bwd_endpoint():
         if file.filename == '':
             return jsonify({'success': False, 'error': 'File tidak dipilih'}), 400
         
-        result = analysis_service.analyze_leaf_image(file.read())
+        result = analysis_service.analyze_leaf_image(UploadBuffer.file_view(file))
         
         if result is None:
             return jsonify({'success': False, 'message': 'Tidak ada objek daun yang terdeteksi'}), 400
@@ -83,7 +84,7 @@ def analyze_npk_endpoint():
         
         reading = NpkReading(n_value=n, p_value=p, k_value=k, user_id=user_id)
         
-        analysis = analysis_service.get_npk_analysis(n, p, k)
+        analysis = analysis_service.analyze_npk_values(n, p, k)
         reading.analysis_result = analysis
         
         db.session.add(reading)
@@ -246,11 +247,18 @@ def get_historical_prices_endpoint():
         time_range = int(data.get('range', 30))
         if not commodity_id:
             return jsonify({'success': False, 'error': 'Komoditas tidak dipilih'}), 400
+        try:
+            output_format = response_format()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         historical_data = market_service.get_historical_prices(commodity_id, time_range)
         if historical_data is None:
             return jsonify({'success': False, 'error': 'Data historis tidak ditemukan'}), 404
             
+        if output_format == 'columnar':
+            history = encode_columns(('label', 'price'), (historical_data['labels'], historical_data['prices']))
+            return jsonify({'success': True, 'format': output_format, 'history': history})
         return jsonify({'success': True, 'labels': historical_data['labels'], 'prices': historical_data['prices']})
     except Exception as e:
         current_app.logger.error(f"Error in /get-historical-prices: {e}", exc_info=True)
@@ -386,33 +394,13 @@ def analyze_disease_advanced_endpoint():
     if file.filename == '' or not allowed_file(file.filename):
         return jsonify({'success': False, 'error': 'Tipe file tidak valid.'}), 400
 
-    temp_path = None
     try:
-        filename = secure_filename(f"{uuid.uuid4()}.jpg")
-        temp_path = os.path.join(TEMP_IMAGE_FOLDER, filename)
-        file.save(temp_path)
-        current_app.logger.info(f"File sementara disimpan di: {temp_path}")
-
-        client = InferenceHTTPClient(
-            api_url="https://serverless.roboflow.com",
-            api_key=os.environ.get('ROBOFLOW_API_KEY', 'jPdPobkMUhG9yEKohrrP')
-        )
-
-        current_app.logger.info("Menjalankan workflow Roboflow...")
-        result = client.run_workflow(
-            workspace_name="andriyanto39",
-            workflow_id="detect-and-classify",
-            images={"image": temp_path},
-            use_cache=True
-        )
-        current_app.logger.info("Workflow Roboflow berhasil dijalankan.")
-        
+        result = disease_service.detect_disease(UploadBuffer.file_view(file))
         return jsonify({'success': True, 'data': result})
 
+    except RoboflowUnavailable as e:
+        current_app.logger.warning(f"Layanan AI tidak tersedia di /analyze-disease-advanced: {e}")
+        return jsonify({'success': False, 'error': 'Layanan AI sedang sibuk atau tidak tersedia. Coba lagi nanti.'}), 503
     except Exception as e:
         current_app.logger.error(f"Error di /analyze-disease-advanced: {e}", exc_info=True)
         return jsonify({'success': False, 'error': 'Kesalahan internal saat berkomunikasi dengan layanan AI.'}), 500
-    finally:
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
-            current_app.logger.info(f"File sementara dihapus: {temp_path}")
@@ -34,7 +34,8 @@ def api_info():
             'recommendation': '/api/recommendation',
             'knowledge': '/api/knowledge',
             'market': '/api/market',
-            'ml': '/api/ml'
+            'ml': '/api/ml',
+            'jobs': '/api/jobs'
         }
     }), 200
 
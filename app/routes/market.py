@@ -2,6 +2,7 @@
 from flask import Blueprint, request, jsonify
 from app import limiter
 from app.services.market_service import MarketService
+from app.utils.columnar import encode_columns, response_format
 
 market_bp = Blueprint('market', __name__)
 
@@ -75,6 +76,11 @@ def get_historical_prices():
         
         time_range = int(data.get('range', 30))
         
+        try:
+            output_format = response_format()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
         historical_data = MarketService.get_historical_prices(
             data['commodity'],
             time_range
@@ -86,6 +92,15 @@ def get_historical_prices():
                 'error': 'Historical data not found'
             }), 404
         
+        if output_format == 'columnar':
+            return jsonify({
+                'success': True,
+                'format': output_format,
+                'history': encode_columns(
+                    ('label', 'price'), (historical_data['labels'], historical_data['prices'])
+                )
+            }), 200
+        
         return jsonify({
             'success': True,
             'labels': historical_data['labels'],
@@ -1,9 +1,14 @@
 """Recommendation routes for fertilizer and crop recommendations."""
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from app import db, limiter
 from app.models.recommendation import Recommendation
 from app.services.recommendation_service import RecommendationService
+from app.services.write_behind_service import WriteBehindBuffer
+from app.utils.pagination import paginate
+from app.utils.row_encoder import RowEncoder
+from app.utils.replica import read_session
+from app.utils.columnar import response_format
 
 recommendation_bp = Blueprint('recommendation', __name__)
 
@@ -24,23 +29,27 @@ def get_fertilizer_recommendation():
                 'required': required_fields
             }), 400
         
-        # Get recommendation
-        recommendation = RecommendationService.get_fertilizer_recommendation(data)
+        # Get recommendation (shared with earlier requests with the same input)
+        recommendation, input_hash = RecommendationService.get_shared_fertilizer_recommendation(data)
         
-        # Save recommendation if user is authenticated
+        # Save recommendation (owner is None for anonymous requests)
         try:
+            verify_jwt_in_request(optional=True)
             user_id = get_jwt_identity()
             rec = Recommendation(
                 user_id=user_id,
                 recommendation_type='fertilizer',
                 input_data=data,
-                recommendation_data=recommendation,
+                recommendation_data=None if input_hash else recommendation,
+                input_hash=input_hash,
                 crop_type=data.get('crop_type')
             )
-            db.session.add(rec)
-            db.session.commit()
+            # Only anonymous rows are deferred; a user's history must include it
+            if user_id is not None or not WriteBehindBuffer.add(rec):
+                db.session.add(rec)
+                db.session.commit()
         except:
-            pass  # Allow anonymous recommendations
+            db.session.rollback()  # Allow anonymous recommendations
         
         return jsonify({
             'success': True,
@@ -55,6 +64,24 @@ def get_fertilizer_recommendation():
         }), 500
 
 
+@recommendation_bp.route('/fertilizer/dedup-stats', methods=['GET'])
+@jwt_required()
+@limiter.limit("60 per hour")
+def get_fertilizer_dedup_stats():
+    """Get how often fertilizer recommendations reused a stored result."""
+    try:
+        return jsonify({
+            'success': True,
+            'dedup': RecommendationService.dedup_stats()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Failed to get dedup stats',
+            'message': str(e)
+        }), 500
+
+
 @recommendation_bp.route('/calculate-fertilizer', methods=['POST'])
 @limiter.limit("30 per hour")
 def calculate_fertilizer():
@@ -174,24 +201,27 @@ def get_recommendation_history():
     try:
         user_id = get_jwt_identity()
         
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         rec_type = request.args.get('type')
         
-        query = Recommendation.query.filter_by(user_id=user_id)
+        encoder = RowEncoder.for_model(Recommendation)
+        query = encoder.query(read_session(user_id)).filter(Recommendation.user_id == user_id)
         
         if rec_type:
-            query = query.filter_by(recommendation_type=rec_type)
+            query = query.filter(Recommendation.recommendation_type == rec_type)
         
-        recommendations = query.order_by(Recommendation.timestamp.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
+        # ?page=N or ?after=<cursor>
+        try:
+            output_format = response_format()
+            recommendations = paginate(query, Recommendation)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
+        items = recommendations.pop('items')
         return jsonify({
             'success': True,
-            'recommendations': [r.to_dict() for r in recommendations.items],
-            'total': recommendations.total,
-            'page': recommendations.page,
-            'pages': recommendations.pages
+            'format': output_format,
+            'recommendations': encoder.encode_columns(items) if output_format == 'columnar' else encoder.encode_many(items),
+            **recommendations
         }), 200
         
     except Exception as e:
@@ -4,11 +4,23 @@ from app.services.recommendation_service import RecommendationService
 from app.services.knowledge_service import KnowledgeService
 from app.services.market_service import MarketService
 from app.services.ml_service import MLService
+from app.services.disease_service import DiseaseService
+from app.services.npk_ingest_service import NpkIngestService
+from app.services.write_behind_service import WriteBehindBuffer
+from app.services.rollup_service import RollupService
+from app.services.geo_service import GeoService
+from app.services.tile_service import TileService
 
 __all__ = [
     'AnalysisService',
     'RecommendationService',
     'KnowledgeService',
     'MarketService',
-    'MLService'
+    'MLService',
+    'DiseaseService',
+    'NpkIngestService',
+    'WriteBehindBuffer',
+    'RollupService',
+    'GeoService',
+    'TileService'
 ]
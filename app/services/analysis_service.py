@@ -1,66 +1,392 @@
 """Analysis service for leaf and soil analysis."""
+import time
+from contextlib import contextmanager
 import cv2
 import numpy as np
+from flask import current_app
 from app.ml_models.model_loader import ModelLoader
+from app.utils.image_decoder import ImageDecoder
+from app.utils.npk_rules import rule_set_for
+from app.utils.result_cache import ResultCache
+
+
+def _config_value(key, default):
+    """Read a config value, falling back to default outside app context."""
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:
+        return default
+
+
+@contextmanager
+def _stage(timings, name):
+    """Add the elapsed time of the block to ``timings[name]`` if timings is a dict."""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
 
 
 class AnalysisService:
     """Service for analyzing leaf images and NPK values."""
     
     @staticmethod
-    def analyze_leaf_image(image_data):
+    def decode_leaf_image(image_data, scale=None):
+        """
+        Decode leaf image, using reduced-resolution decode when enabled.
+        
+        The mean hue of a downscaled frame stays within
+        ``BWD_DECODE_HUE_TOLERANCE`` of the full-resolution value on the
+        benchmark corpus (see ``benchmarks/leaf_decode.py``).
+        
+        Args:
+            image_data: Binary image data
+            scale: Decode scale override ('auto', 1, 2, 4 or 8)
+            
+        Returns:
+            numpy.ndarray: BGR image or None if decoding failed
+        """
+        scale, target_side = AnalysisService._decode_settings(scale)
+        image, _ = ImageDecoder.decode(image_data, scale=scale, target_side=target_side)
+        return image
+    
+    @staticmethod
+    def _decode_settings(scale=None):
+        """Resolve the effective decode scale and target side."""
+        if scale is None:
+            if _config_value('BWD_FAST_DECODE', True):
+                scale = _config_value('BWD_DECODE_SCALE', 'auto')
+            else:
+                scale = 1
+        return scale, _config_value('BWD_DECODE_TARGET_SIDE', 640)
+    
+    @staticmethod
+    def _green_mask(image, timings=None):
+        """Convert a BGR image to HSV and build the green (leaf) mask."""
+        # Convert to HSV color space
+        with _stage(timings, 'hsv'):
+            hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        
+        # Create mask for green color (leaves)
+        with _stage(timings, 'mask'):
+            lower_green = np.array([30, 40, 40])
+            upper_green = np.array([90, 255, 255])
+            mask = cv2.inRange(hsv_image, lower_green, upper_green)
+        return hsv_image, mask
+    
+    @staticmethod
+    def compute_leaf_hue(image, timings=None):
+        """
+        Compute the average hue of the green (leaf) area of a BGR image.
+        
+        Args:
+            image: Decoded BGR image
+            timings: Optional dict collecting per-stage seconds
+            
+        Returns:
+            float: Average hue or None if no green pixels were found
+        """
+        hsv_image, mask = AnalysisService._green_mask(image, timings)
+        
+        with _stage(timings, 'mean'):
+            # Check if any green pixels found
+            if cv2.countNonZero(mask) == 0:
+                return None
+            
+            # Calculate average hue value
+            return cv2.mean(hsv_image, mask=mask)[0]
+    
+    @staticmethod
+    def _bwd_model():
+        """
+        Return the BWD model, or its lookup-table version when
+        ``BWD_LOOKUP_MODEL`` is enabled.
+        """
+        if _config_value('BWD_LOOKUP_MODEL', False):
+            return ModelLoader.get_hue_lookup('bwd', step=_config_value('BWD_LOOKUP_STEP', 0.01))
+        return ModelLoader.get_model('bwd')
+    
+    @staticmethod
+    def _leaf_cache_key(image_data, scale=None, variant=''):
+        """Build the leaf result cache key for the effective decode settings."""
+        decode_scale, target_side = AnalysisService._decode_settings(scale)
+        if _config_value('BWD_LOOKUP_MODEL', False):
+            variant += f"|lut={_config_value('BWD_LOOKUP_STEP', 0.01)}"
+        model_version = f"{ModelLoader.get_model_version('bwd')}|decode={decode_scale}:{target_side}{variant}"
+        return ResultCache.make_key(image_data, model_version)
+    
+    @staticmethod
+    def analyze_leaf_image(image_data, scale=None, use_cache=True, timings=None):
         """
         Analyze leaf image for BWD score.
         
+        Results are cached by image content and model version, so a
+        resubmitted photo skips decoding and prediction.
+        
         Args:
             image_data: Binary image data
+            scale: Decode scale override ('auto', 1, 2, 4 or 8)
+            use_cache: Set False for one-off inputs such as video frames
+            timings: Optional dict collecting per-stage seconds (decode,
+                hsv, mask, mean, predict)
             
         Returns:
             dict: Analysis results with score, hue, and confidence
         """
         try:
-            bwd_model = ModelLoader.get_model('bwd')
+            bwd_model = AnalysisService._bwd_model()
             if bwd_model is None:
                 raise RuntimeError("BWD model not loaded")
             
+            cache = ResultCache.get_cache('leaf') if use_cache else None
+            if cache is not None:
+                cache_key = AnalysisService._leaf_cache_key(image_data, scale)
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
             # Decode image
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            with _stage(timings, 'decode'):
+                image = AnalysisService.decode_leaf_image(image_data, scale=scale)
             
             if image is None:
                 return None
             
-            # Convert to HSV color space
-            hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            
-            # Create mask for green color (leaves)
-            lower_green = np.array([30, 40, 40])
-            upper_green = np.array([90, 255, 255])
-            mask = cv2.inRange(hsv_image, lower_green, upper_green)
+            avg_hue = AnalysisService.compute_leaf_hue(image, timings)
             
-            # Check if any green pixels found
-            if cv2.countNonZero(mask) == 0:
+            if avg_hue is None:
                 return None
             
-            # Calculate average hue value
-            avg_hue = cv2.mean(hsv_image, mask=mask)[0]
-            
             # Predict BWD score
-            input_data = np.array([[avg_hue]])
-            predicted_score = bwd_model.predict(input_data)[0]
-            confidence = np.max(bwd_model.predict_proba(input_data)) * 100
+            with _stage(timings, 'predict'):
+                input_data = np.array([[avg_hue]])
+                predicted_score = bwd_model.predict(input_data)[0]
+                confidence = np.max(bwd_model.predict_proba(input_data)) * 100
             
-            return {
+            result = {
                 'bwd_score': int(predicted_score),
                 'avg_hue': round(avg_hue, 2),
                 'confidence': round(confidence, 2)
             }
             
+            if cache is not None:
+                cache.set(cache_key, result)
+            
+            return result
+            
         except Exception as e:
             raise RuntimeError(f"Leaf analysis failed: {str(e)}")
     
     @staticmethod
-    def analyze_npk_values(n_value, p_value, k_value):
+    def segment_leaves(image, min_area=1):
+        """
+        Split the green mask into leaves and compute each leaf's mean hue.
+        
+        Connected components of the mask are labelled once, and per-leaf
+        hue sums are accumulated over the whole label image with a single
+        ``np.bincount`` instead of masking each leaf separately.
+        
+        Args:
+            image: Decoded BGR image
+            min_area: Minimum component area in pixels (smaller blobs are noise)
+            
+        Returns:
+            tuple: (hues, stats) arrays for the kept components, where stats
+            rows are OpenCV's [left, top, width, height, area]
+        """
+        hsv_image, mask = AnalysisService._green_mask(image)
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        
+        # Label 0 is the background; its sum is discarded below
+        hue_sums = np.bincount(labels.ravel(), weights=hsv_image[:, :, 0].ravel(), minlength=count)
+        areas = stats[:, cv2.CC_STAT_AREA]
+        
+        keep = np.flatnonzero(areas[1:] >= min_area) + 1
+        return hue_sums[keep] / areas[keep], stats[keep]
+    
+    @staticmethod
+    def analyze_leaf_image_multi(image_data, scale=None):
+        """
+        Analyze every leaf in an image and score them with one model call.
+        
+        Args:
+            image_data: Binary image data
+            scale: Decode scale override ('auto', 1, 2, 4 or 8)
+            
+        Returns:
+            dict: Per-leaf results (score, hue, confidence, area, bbox in
+            original image pixels) and an area-weighted summary, or None if
+            no leaf was found
+        """
+        try:
+            bwd_model = AnalysisService._bwd_model()
+            if bwd_model is None:
+                raise RuntimeError("BWD model not loaded")
+            
+            min_area_fraction = _config_value('BWD_MULTI_MIN_AREA_FRACTION', 0.005)
+            max_leaves = _config_value('BWD_MULTI_MAX_LEAVES', 50)
+            
+            cache = ResultCache.get_cache('leaf')
+            if cache is not None:
+                variant = f"|multi={min_area_fraction}:{max_leaves}"
+                cache_key = AnalysisService._leaf_cache_key(image_data, scale, variant)
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
+            decode_scale, target_side = AnalysisService._decode_settings(scale)
+            image, decode_scale = ImageDecoder.decode(image_data, scale=decode_scale, target_side=target_side)
+            
+            if image is None:
+                return None
+            
+            min_area = max(1, int(image.shape[0] * image.shape[1] * min_area_fraction))
+            hues, stats = AnalysisService.segment_leaves(image, min_area=min_area)
+            
+            if len(hues) == 0:
+                return None
+            
+            # Largest leaves first
+            order = np.argsort(stats[:, cv2.CC_STAT_AREA])[::-1][:max_leaves]
+            hues, stats = hues[order], stats[order]
+            
+            # Predict all leaves in one batch
+            input_data = hues.reshape(-1, 1)
+            scores = bwd_model.predict(input_data)
+            confidences = np.max(bwd_model.predict_proba(input_data), axis=1) * 100
+            
+            # Report geometry in original image pixels
+            stats = stats.astype(np.int64) * decode_scale
+            stats[:, cv2.CC_STAT_AREA] *= decode_scale
+            
+            leaves = []
+            for i in range(len(hues)):
+                left, top, width, height, area = stats[i].tolist()
+                leaves.append({
+                    'bwd_score': int(scores[i]),
+                    'avg_hue': round(float(hues[i]), 2),
+                    'confidence': round(float(confidences[i]), 2),
+                    'area_px': area,
+                    'bbox': [left, top, width, height]
+                })
+            
+            areas = stats[:, cv2.CC_STAT_AREA]
+            result = {
+                'leaf_count': len(leaves),
+                'leaves': leaves,
+                'summary': {
+                    'avg_hue': round(float(np.average(hues, weights=areas)), 2),
+                    'avg_bwd_score': round(float(np.average(scores.astype(float), weights=areas)), 2),
+                    'min_bwd_score': int(np.min(scores)),
+                    'max_bwd_score': int(np.max(scores))
+                }
+            }
+            
+            if cache is not None:
+                cache.set(cache_key, result)
+            
+            return result
+            
+        except Exception as e:
+            raise RuntimeError(f"Multi-leaf analysis failed: {str(e)}")
+    
+    @staticmethod
+    def analyze_frame_stream(frames, budget_ms=None, every=1, aggregate_every=10):
+        """
+        Analyze a sequence of frames incrementally.
+        
+        Frames are skipped when processing falls behind: each analysed frame
+        that takes longer than ``budget_ms`` builds up a time debt, and
+        following frames are skipped (each paying back one budget) until the
+        debt is cleared.
+        
+        Args:
+            frames: Iterable of encoded frames (e.g. a FrameReader)
+            budget_ms: Average processing time allowed per incoming frame
+            every: Only consider every Nth frame
+            aggregate_every: Emit a running aggregate after this many analysed frames
+        
+        Yields:
+            dict: 'frame' results, periodic 'aggregate' records and a final 'summary'
+        """
+        stats = {
+            'frames_received': 0,
+            'frames_analyzed': 0,
+            'frames_skipped': 0,
+            'frames_without_leaf': 0,
+            'frames_failed': 0
+        }
+        score_counts = {}
+        hue_sum = 0.0
+        score_sum = 0
+        debt_ms = 0.0
+        started = time.perf_counter()
+        
+        def aggregate(record_type):
+            scored = sum(score_counts.values())
+            elapsed = time.perf_counter() - started
+            return {
+                'type': record_type,
+                **stats,
+                'avg_bwd_score': round(score_sum / scored, 2) if scored else None,
+                'avg_hue': round(hue_sum / scored, 2) if scored else None,
+                'score_distribution': {str(k): v for k, v in sorted(score_counts.items())},
+                'elapsed_ms': round(elapsed * 1000, 1),
+                'analyzed_fps': round(stats['frames_analyzed'] / elapsed, 2) if elapsed else None
+            }
+        
+        for index, frame in enumerate(frames):
+            stats['frames_received'] += 1
+            
+            if index % every:
+                stats['frames_skipped'] += 1
+                continue
+            
+            if budget_ms and debt_ms > 0:
+                debt_ms = max(debt_ms - budget_ms, 0.0)
+                stats['frames_skipped'] += 1
+                continue
+            
+            frame_started = time.perf_counter()
+            try:
+                result = AnalysisService.analyze_leaf_image(frame, use_cache=False)
+            except RuntimeError as e:
+                result = e
+            took_ms = (time.perf_counter() - frame_started) * 1000
+            if budget_ms:
+                debt_ms = max(debt_ms + took_ms - budget_ms, 0.0)
+            
+            stats['frames_analyzed'] += 1
+            record = {'type': 'frame', 'index': index, 'ms': round(took_ms, 1)}
+            if isinstance(result, Exception):
+                stats['frames_failed'] += 1
+                record.update({'success': False, 'message': str(result)})
+            elif result is None:
+                stats['frames_without_leaf'] += 1
+                record.update({'success': False, 'message': 'No leaf-like area detected'})
+            else:
+                score_counts[result['bwd_score']] = score_counts.get(result['bwd_score'], 0) + 1
+                score_sum += result['bwd_score']
+                hue_sum += result['avg_hue']
+                record.update({
+                    'success': True,
+                    'bwd_score': result['bwd_score'],
+                    'avg_hue_value': result['avg_hue'],
+                    'confidence_percent': result['confidence']
+                })
+            yield record
+            
+            if aggregate_every and stats['frames_analyzed'] % aggregate_every == 0:
+                yield aggregate('aggregate')
+        
+        yield aggregate('summary')
+    
+    @staticmethod
+    def analyze_npk_values(n_value, p_value, k_value, ph_value=None, crop=None):
         """
         Analyze NPK values and provide recommendations.
         
@@ -68,61 +394,40 @@ class AnalysisService:
             n_value: Nitrogen value
             p_value: Phosphorus value
             k_value: Potassium value
+            ph_value: Optional soil pH (adds a 'pH' entry when given)
+            crop: Optional crop whose rule set applies (see app.utils.npk_rules)
             
         Returns:
             dict: Analysis results with recommendations
         """
-        analysis = {}
-        
-        # Nitrogen analysis
-        if 100 <= n_value <= 200:
-            n_label = "Optimal"
-            n_rec = "Nitrogen level is optimal. Maintain current fertilization."
-        elif n_value < 100:
-            n_label = "Rendah"
-            n_rec = "Nitrogen is low. Increase Urea or organic nitrogen sources."
-        else:
-            n_label = "Berlebih"
-            n_rec = "Nitrogen is excessive. Reduce nitrogen fertilizers to prevent lodging."
-        
-        analysis['Nitrogen (N)'] = {
-            'value': n_value,
-            'label': n_label,
-            'rekomendasi': n_rec
-        }
+        return rule_set_for(crop).analyze({
+            'n_value': [n_value],
+            'p_value': [p_value],
+            'k_value': [k_value],
+            'ph_value': [ph_value]
+        })[0]
         
-        # Phosphorus analysis
-        if 20 <= p_value <= 40:
-            p_label = "Optimal"
-            p_rec = "Phosphorus level is optimal. Important for root and flower development."
-        elif p_value < 20:
-            p_label = "Rendah"
-            p_rec = "Phosphorus is low. Apply SP-36 or rock phosphate."
-        else:
-            p_label = "Berlebih"
-            p_rec = "Phosphorus is excessive. May interfere with micronutrient uptake."
-        
-        analysis['Fosfor (P)'] = {
-            'value': p_value,
-            'label': p_label,
-            'rekomendasi': p_rec
-        }
+    @staticmethod
+    def analyze_npk_bulk(n_values, p_values, k_values, ph_values=None, crop=None):
+        """
+        Analyze many NPK readings at once.
         
-        # Potassium analysis
-        if 150 <= k_value <= 250:
-            k_label = "Optimal"
-            k_rec = "Potassium level is optimal. Important for fruit quality."
-        elif k_value < 150:
-            k_label = "Rendah"
-            k_rec = "Potassium is low. Apply KCL or organic potassium sources."
-        else:
-            k_label = "Berlebih"
-            k_rec = "Potassium is excessive. May cause salt stress."
-        
-        analysis['Kalium (K)'] = {
-            'value': k_value,
-            'label': k_label,
-            'rekomendasi': k_rec
-        }
+        Bands are looked up for all readings at once, by counting the
+        band edges each nutrient value reaches (``NpkRuleSet.bands``);
+        only the final JSON documents are assembled per row.
         
-        return analysis
+        Args:
+            n_values, p_values, k_values: Equal-length sequences of values
+            ph_values: Optional sequence of pH values (NaN/None when not measured)
+            crop: Optional crop whose rule set applies
+        
+        Returns:
+            list: One analysis dict per reading, as from analyze_npk_values
+        """
+        return rule_set_for(crop).analyze({
+            'n_value': n_values,
+            'p_value': p_values,
+            'k_value': k_values,
+            'ph_value': ph_values
+        })
+        
\ No newline at end of file
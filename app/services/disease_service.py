@@ -0,0 +1,234 @@
+"""Disease detection service backed by the Roboflow workflow API."""
+import base64
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+from app.utils.result_cache import ResultCache
+
+
+class RoboflowUnavailable(Exception):
+    """Raised when no API key is configured, the circuit is open or the concurrency limit is reached."""
+
+
+class CircuitBreaker:
+    """
+    Minimal closed/open/half-open circuit breaker.
+    
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast for ``reset_timeout`` seconds; then a single trial call
+    is let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+    
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+    
+    def allow(self):
+        """Return True if a call may proceed."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class RoboflowClient:
+    """
+    Long-lived Roboflow workflow client for one worker process.
+    
+    Keeps a pooled ``requests.Session`` (so TLS/TCP connections are reused),
+    sends images inline as base64 instead of via temp files, and guards the
+    remote call with a concurrency limit, timeouts and a circuit breaker.
+    """
+    
+    _instance = None
+    _instance_pid = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, api_url, api_key, workspace, workflow_id, pool_size=10,
+                 max_concurrency=8, connect_timeout=3.05, read_timeout=30,
+                 acquire_timeout=5, breaker_failures=5, breaker_reset=30):
+        self.api_url = api_url.rstrip('/')
+        self.api_key = api_key
+        self.workspace = workspace
+        self.workflow_id = workflow_id
+        self.timeout = (connect_timeout, read_timeout)
+        self.acquire_timeout = acquire_timeout
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    @classmethod
+    def from_config(cls, config):
+        """Build a client from Flask config values."""
+        return cls(
+            api_url=config['ROBOFLOW_API_URL'],
+            api_key=config.get('ROBOFLOW_API_KEY'),
+            workspace=config['ROBOFLOW_WORKSPACE'],
+            workflow_id=config['ROBOFLOW_WORKFLOW_ID'],
+            pool_size=config.get('ROBOFLOW_POOL_SIZE', 10),
+            max_concurrency=config.get('ROBOFLOW_MAX_CONCURRENCY', 8),
+            connect_timeout=config.get('ROBOFLOW_CONNECT_TIMEOUT', 3.05),
+            read_timeout=config.get('ROBOFLOW_READ_TIMEOUT', 30),
+            acquire_timeout=config.get('ROBOFLOW_ACQUIRE_TIMEOUT', 5),
+            breaker_failures=config.get('ROBOFLOW_BREAKER_FAILURES', 5),
+            breaker_reset=config.get('ROBOFLOW_BREAKER_RESET', 30)
+        )
+    
+    @classmethod
+    def get_client(cls):
+        """Return this process's client, creating it on first use (and after fork)."""
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance_pid != os.getpid():
+                cls._instance = cls.from_config(current_app.config)
+                cls._instance_pid = os.getpid()
+            return cls._instance
+    
+    @classmethod
+    def reset(cls):
+        """Drop the process client (e.g. after config changes)."""
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance.session.close()
+            cls._instance = None
+    
+    @property
+    def version(self):
+        """Identifier of the remote workflow, used in cache keys."""
+        return f"roboflow:{self.workspace}/{self.workflow_id}"
+    
+    def run_workflow(self, image_data):
+        """
+        Run the configured workflow on in-memory image bytes.
+        
+        Args:
+            image_data: Binary image data
+            
+        Returns:
+            list: Workflow ``outputs``
+        
+        Raises:
+            RoboflowUnavailable: No API key, circuit open or no free
+                concurrency slot
+            requests.RequestException: HTTP or timeout errors
+        """
+        if not self.api_key:
+            raise RoboflowUnavailable("ROBOFLOW_API_KEY is not configured")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise RoboflowUnavailable("Too many concurrent Roboflow requests")
+        
+        try:
+            if not self.breaker.allow():
+                raise RoboflowUnavailable("Roboflow circuit is open")
+            
+            payload = {
+                'api_key': self.api_key,
+                'use_cache': True,
+                'enable_profiling': False,
+                'inputs': {
+                    'image': {
+                        'type': 'base64',
+                        'value': base64.b64encode(image_data).decode('ascii')
+                    }
+                }
+            }
+            url = f"{self.api_url}/{self.workspace}/workflows/{self.workflow_id}"
+            
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+            except requests.RequestException:
+                self.breaker.record_failure()
+                raise
+            
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                # 4xx means a bad request, not an unhealthy upstream
+                self.breaker.record_success()
+            
+            response.raise_for_status()
+            return response.json()['outputs']
+        finally:
+            self._slots.release()
+    
+    def stats(self):
+        """Return breaker state for health reporting."""
+        return {'circuit': self.breaker.state, 'workflow': self.version, 'configured': bool(self.api_key)}
+
+
+class DiseaseService:
+    """Service for plant disease detection (Modul 20)."""
+    
+    @staticmethod
+    def detect_disease(image_data):
+        """
+        Run the Roboflow detect-and-classify workflow on an image.
+        
+        Results are cached by image content and workflow id.
+        
+        Args:
+            image_data: Binary image data
+            
+        Returns:
+            list: Workflow outputs
+        """
+        client = RoboflowClient.get_client()
+        
+        cache = ResultCache.get_cache('disease')
+        if cache is not None:
+            cache_key = ResultCache.make_key(image_data, client.version)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        current_app.logger.info("Menjalankan workflow Roboflow...")
+        result = client.run_workflow(image_data)
+        current_app.logger.info("Workflow Roboflow berhasil dijalankan.")
+        
+        if cache is not None:
+            cache.set(cache_key, result)
+        
+        return result
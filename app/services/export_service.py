@@ -0,0 +1,240 @@
+"""Streaming export of readings, recommendations and crops."""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import cast, select
+from sqlalchemy.types import TypeDecorator
+from app import db
+from app.models.npk_reading import NpkReading
+from app.models.recommendation import Recommendation
+from app.models.crop import Crop
+from app.utils.row_encoder import serialized_column
+
+# dataset: (model, timestamp column for start/end filters, exported columns)
+EXPORTS = {
+    'npk-readings': (NpkReading, 'timestamp', NpkReading.SERIALIZED_FIELDS),
+    'recommendations': (Recommendation, 'timestamp', Recommendation.SERIALIZED_FIELDS),
+    'crops': (Crop, 'created_at', Crop.SERIALIZED_FIELDS)
+}
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+
+class ExportUnavailable(Exception):
+    """Raised when an export format needs an optional dependency that is missing."""
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are taken after each write batch."""
+    
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._position
+    
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ExportService:
+    """
+    Stream a user's rows as CSV, NDJSON or Parquet.
+    
+    Rows are selected as plain column tuples with ``yield_per`` (a
+    server-side cursor on PostgreSQL) and encoded one partition at a time,
+    so memory use depends on ``EXPORT_CHUNK_SIZE``, not on the row count.
+    Optional gzip compression is applied to the encoded stream as it is
+    produced.
+    """
+    
+    @staticmethod
+    def _partitions(dataset, user_id, start=None, end=None, chunk_size=None, raw_json=False, session=None):
+        """
+        Yield lists of column tuples for the user's rows, ordered by id.
+        
+        With raw_json, JSON columns are fetched as their stored text instead
+        of being decoded (and re-encoded by the CSV/Parquet writers). JSON
+        columns whose stored form differs from their value (compact NPK
+        analyses) are decoded and written back out as JSON text.
+        """
+        if chunk_size is None:
+            chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 1000)
+        model, time_column, columns = EXPORTS[dataset]
+        
+        selected = []
+        encoded = []
+        for index, name in enumerate(columns):
+            column = serialized_column(model, name)
+            if raw_json and isinstance(column.type, db.JSON):
+                column = cast(column, db.Text).label(name)
+            elif raw_json and isinstance(column.type, TypeDecorator) and isinstance(column.type.impl, db.JSON):
+                encoded.append(index)
+            selected.append(column)
+        
+        query = select(*selected).where(model.user_id == user_id)
+        if start is not None:
+            query = query.where(getattr(model, time_column) >= start)
+        if end is not None:
+            query = query.where(getattr(model, time_column) < end)
+        query = query.order_by(model.id).execution_options(yield_per=chunk_size)
+        
+        result = (session or db.session).execute(query)
+        try:
+            for partition in result.partitions():
+                if encoded:
+                    partition = [list(row) for row in partition]
+                    for row in partition:
+                        for index in encoded:
+                            if row[index] is not None:
+                                row[index] = json.dumps(row[index])
+                yield partition
+        finally:
+            result.close()
+    
+    @staticmethod
+    def _text_value(value):
+        """Format a column value for CSV."""
+        if value is None:
+            return ''
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
+    
+    @staticmethod
+    def _json_value(value):
+        """JSON fallback encoder for date/datetime values."""
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        raise TypeError(f"Cannot serialise {type(value).__name__}")
+    
+    @classmethod
+    def _csv_chunks(cls, columns, partitions):
+        """Yield a header row, then one encoded block of CSV rows per partition."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for partition in partitions:
+            writer.writerows([cls._text_value(value) for value in row] for row in partition)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    
+    @classmethod
+    def _ndjson_chunks(cls, columns, partitions):
+        """Yield one block of JSON lines per partition."""
+        encoder = json.JSONEncoder(default=cls._json_value, separators=(',', ':'))
+        for partition in partitions:
+            yield ''.join(
+                encoder.encode(dict(zip(columns, row))) + '\n' for row in partition
+            ).encode('utf-8')
+    
+    @staticmethod
+    def _parquet_schema(pa, model, columns):
+        """Arrow schema for the exported columns; JSON columns become strings."""
+        fields = []
+        for name in columns:
+            column_type = model.__table__.columns[name].type
+            if isinstance(column_type, db.Integer):
+                arrow_type = pa.int64()
+            elif isinstance(column_type, db.Float):
+                arrow_type = pa.float64()
+            elif isinstance(column_type, db.DateTime):
+                arrow_type = pa.timestamp('us')
+            elif isinstance(column_type, db.Date):
+                arrow_type = pa.date32()
+            elif isinstance(column_type, db.Boolean):
+                arrow_type = pa.bool_()
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(name, arrow_type))
+        return pa.schema(fields)
+    
+    @classmethod
+    def _parquet_chunks(cls, model, columns, partitions):
+        """Write one Parquet row group per partition and yield the bytes written."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ExportUnavailable('Parquet export requires pyarrow') from e
+        
+        schema = cls._parquet_schema(pa, model, columns)
+        
+        def generate():
+            sink = _ChunkSink()
+            writer = pq.ParquetWriter(sink, schema, compression='zstd')
+            try:
+                for partition in partitions:
+                    values = [list(column) for column in zip(*partition)]
+                    writer.write_table(pa.Table.from_arrays(values, schema=schema))
+                    yield sink.take()
+            finally:
+                writer.close()
+            yield sink.take()
+        
+        return generate()
+    
+    @staticmethod
+    def _gzip(chunks):
+        """Compress a byte stream incrementally into a single gzip member."""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    
+    @classmethod
+    def stream(cls, dataset, export_format, user_id, start=None, end=None, gzip=False, session=None):
+        """
+        Build the byte stream of an export.
+        
+        Args:
+            dataset: Key of EXPORTS
+            export_format: Key of EXPORT_FORMATS
+            user_id: Owner whose rows are exported
+            start, end: Optional window on the dataset's timestamp column
+            gzip: Compress the stream with gzip
+            session: Session to read from (default db.session)
+            
+        Returns:
+            generator of bytes
+        
+        Raises:
+            ExportUnavailable: If the format's optional dependency is missing
+        """
+        model, _, columns = EXPORTS[dataset]
+        partitions = cls._partitions(
+            dataset, user_id, start=start, end=end, raw_json=export_format != 'ndjson',
+            session=session
+        )
+        
+        if export_format == 'parquet':
+            chunks = cls._parquet_chunks(model, columns, partitions)
+        elif export_format == 'ndjson':
+            chunks = cls._ndjson_chunks(columns, partitions)
+        else:
+            chunks = cls._csv_chunks(columns, partitions)
+        
+        return cls._gzip(chunks) if gzip else chunks
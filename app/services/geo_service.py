@@ -0,0 +1,174 @@
+"""Spatial queries over NPK readings using the geohash index."""
+import math
+import numpy as np
+from flask import current_app
+from sqlalchemy import and_, bindparam, or_, select
+from app import db
+from app.models.npk_reading import NpkReading
+from app.utils import geohash
+
+
+class GeoService:
+    """
+    Bounding-box, radius and nearest-neighbour queries for readings.
+    
+    Each query is first narrowed to the geohash ranges covering the search
+    box, which the ``(geohash, timestamp)`` index serves as a few range
+    scans, and only the surviving candidates are checked against the exact
+    box or great-circle distance.
+    """
+    
+    @staticmethod
+    def _box_clause(min_lat, min_lon, max_lat, max_lon):
+        """Index-backed geohash ranges plus the exact box test."""
+        max_cells = current_app.config.get('GEO_MAX_CELLS', 32)
+        cells = geohash.cover_bbox(min_lat, min_lon, max_lat, max_lon, max_cells=max_cells)
+        ranges = [
+            and_(NpkReading.geohash >= low, NpkReading.geohash < high) if high is not None
+            else NpkReading.geohash >= low
+            for low, high in geohash.prefix_ranges(cells)
+        ]
+        return and_(
+            or_(*ranges),
+            NpkReading.latitude.between(min_lat, max_lat),
+            NpkReading.longitude.between(min_lon, max_lon)
+        )
+    
+    @classmethod
+    def boxes_clause(cls, boxes):
+        """
+        Filter for readings inside any of boxes, each a tuple of
+        (min_lat, min_lon, max_lat, max_lon) with min_lon <= max_lon.
+        """
+        return or_(*[cls._box_clause(*box) for box in boxes])
+    
+    @classmethod
+    def _filter(cls, query, boxes, user_id, start=None, end=None):
+        """Apply box, owner and time window filters to a query."""
+        query = query.where(cls.boxes_clause(boxes))
+        query = query.where(NpkReading.user_id == user_id)
+        if start is not None:
+            query = query.where(NpkReading.timestamp >= start)
+        if end is not None:
+            query = query.where(NpkReading.timestamp < end)
+        return query
+    
+    @classmethod
+    def within_bbox(cls, min_lat, min_lon, max_lat, max_lon, user_id, start=None, end=None, limit=1000):
+        """
+        Readings inside a bounding box, newest first.
+        
+        A box with min_lon > max_lon crosses the antimeridian.
+        
+        Returns:
+            tuple: (list of NpkReading, truncated flag)
+        """
+        boxes = geohash.split_bbox(min_lat, min_lon, max_lat, max_lon)
+        query = cls._filter(select(NpkReading), boxes, user_id, start, end)
+        query = query.order_by(NpkReading.timestamp.desc(), NpkReading.id.desc()).limit(limit + 1)
+        readings = db.session.execute(query).scalars().all()
+        return readings[:limit], len(readings) > limit
+    
+    @classmethod
+    def _distances(cls, latitude, longitude, radius_m, user_id, start=None, end=None):
+        """
+        Ids and distances of readings within radius_m, nearest first.
+        
+        Only (id, latitude, longitude) of the candidates is fetched; full
+        rows are loaded for the final page by _load.
+        """
+        boxes = geohash.radius_bbox(latitude, longitude, radius_m)
+        query = cls._filter(select(NpkReading.id, NpkReading.latitude, NpkReading.longitude),
+                            boxes, user_id, start, end)
+        rows = db.session.execute(query).all()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        
+        candidates = np.array(rows, dtype=np.float64)
+        distances = geohash.haversine_m(latitude, longitude, candidates[:, 1], candidates[:, 2])
+        inside = distances <= radius_m
+        ids, distances = candidates[inside, 0].astype(np.int64), distances[inside]
+        order = np.lexsort((ids, distances))
+        return ids[order], distances[order]
+    
+    @staticmethod
+    def _load(ids, distances):
+        """Load readings by id, keeping the given order, with distance_m added."""
+        readings = {
+            reading.id: reading
+            for reading in NpkReading.query.filter(NpkReading.id.in_(ids.tolist()))
+        }
+        return [
+            (readings[reading_id], round(float(distance), 2))
+            for reading_id, distance in zip(ids.tolist(), distances.tolist())
+            if reading_id in readings
+        ]
+    
+    @classmethod
+    def within_radius(cls, latitude, longitude, radius_m, user_id, start=None, end=None, limit=1000):
+        """
+        Readings within radius_m metres of a point, nearest first.
+        
+        Returns:
+            tuple: (list of (NpkReading, distance_m), truncated flag)
+        """
+        ids, distances = cls._distances(latitude, longitude, radius_m, user_id, start, end)
+        return cls._load(ids[:limit], distances[:limit]), len(ids) > limit
+    
+    @classmethod
+    def nearest(cls, latitude, longitude, count, user_id, start=None, end=None):
+        """
+        The count readings nearest to a point.
+        
+        Searches a growing radius (GEO_NEAREST_START_RADIUS_M, x4 per round)
+        until enough readings are found. Everything outside the radius is
+        farther than everything inside it, so the first count hits are exact.
+        
+        Returns:
+            tuple: (list of (NpkReading, distance_m), search radius in metres)
+        """
+        radius = current_app.config.get('GEO_NEAREST_START_RADIUS_M', 1000)
+        max_radius = math.pi * geohash.EARTH_RADIUS_M
+        while True:
+            ids, distances = cls._distances(latitude, longitude, radius, user_id, start, end)
+            if len(ids) >= count or radius >= max_radius:
+                return cls._load(ids[:count], distances[:count]), min(radius, max_radius)
+            radius *= 4
+    
+    @staticmethod
+    def backfill_geohash(batch_size=1000):
+        """
+        Compute geohash for existing readings that have coordinates.
+        
+        Walks the table by id in batches, committing each one, so it can be
+        interrupted and resumed.
+        
+        Returns:
+            int: Number of readings updated
+        """
+        table = NpkReading.__table__
+        statement = table.update().where(table.c.id == bindparam('_id')).values(
+            geohash=bindparam('_geohash')
+        )
+        updated = 0
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(NpkReading.id, NpkReading.latitude, NpkReading.longitude)
+                .where(NpkReading.id > last_id, NpkReading.geohash.is_(None),
+                       NpkReading.latitude.isnot(None), NpkReading.longitude.isnot(None))
+                .order_by(NpkReading.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return updated
+            
+            ids, latitudes, longitudes = zip(*rows)
+            hashes = geohash.encode_many(latitudes, longitudes)
+            db.session.execute(statement, [
+                {'_id': reading_id, '_geohash': value}
+                for reading_id, value in zip(ids, hashes)
+            ])
+            db.session.commit()
+            updated += len(rows)
+            last_id = ids[-1]
@@ -0,0 +1,301 @@
+"""Background job service with a local worker pool (no external broker)."""
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from app import db
+from app.models.job import Job
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity (maps to HTTP 429)."""
+
+
+class JobCancelled(Exception):
+    """Raised by a handler when cancellation was requested."""
+
+
+class JobContext:
+    """Handle passed to job handlers for progress and cancellation."""
+    
+    def __init__(self, job):
+        self.job = job
+    
+    def is_cancelled(self):
+        """Check the job table for a cancellation request."""
+        return bool(db.session.query(Job.cancel_requested).filter_by(id=self.job.id).scalar())
+    
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation was requested."""
+        if self.is_cancelled():
+            raise JobCancelled()
+    
+    def set_progress(self, progress, total=None):
+        """Persist batch progress."""
+        self.job.progress = progress
+        if total is not None:
+            self.job.total = total
+        db.session.commit()
+
+
+class JobService:
+    """
+    Runs long analyses on a bounded in-process queue.
+    
+    Jobs are recorded in the ``jobs`` table so any worker process can report
+    status; payloads (image bytes) stay in memory of the process that
+    accepted them. When the queue is full, ``submit`` raises JobQueueFull.
+    """
+    
+    _queue = None
+    _workers = []
+    _lock = threading.Lock()
+    _handlers = {}
+    _last_purge = 0.0
+    
+    PURGE_INTERVAL_SECONDS = 60
+    
+    @classmethod
+    def handler(cls, job_type):
+        """Decorator registering a handler ``fn(payload, context)`` for a job type."""
+        def decorator(fn):
+            cls._handlers[job_type] = fn
+            return fn
+        return decorator
+    
+    @classmethod
+    def job_types(cls):
+        """Return the registered job types."""
+        return sorted(cls._handlers)
+    
+    @classmethod
+    def _ensure_started(cls):
+        """Start the worker pool for this process on first use."""
+        with cls._lock:
+            if cls._queue is not None:
+                return
+            
+            app = current_app._get_current_object()
+            cls._queue = queue.Queue(maxsize=app.config.get('JOB_QUEUE_SIZE', 32))
+            for i in range(app.config.get('JOB_WORKERS', 2)):
+                worker = threading.Thread(
+                    target=cls._worker_loop,
+                    args=(app,),
+                    name=f"job-worker-{i}",
+                    daemon=True
+                )
+                worker.start()
+                cls._workers.append(worker)
+            app.logger.info(f"Job worker pool started with {len(cls._workers)} workers")
+    
+    @classmethod
+    def submit(cls, job_type, payload, user_id=None):
+        """
+        Create a job record and enqueue it.
+        
+        Args:
+            job_type: Registered job type
+            payload: Handler input (kept in memory, not persisted)
+            user_id: Owner of the job, if authenticated
+            
+        Returns:
+            Job: The queued job
+        
+        Raises:
+            ValueError: If the job type is unknown
+            JobQueueFull: If the queue is at capacity
+        """
+        if job_type not in cls._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        
+        cls._ensure_started()
+        cls.purge_expired()
+        
+        # expires_at is set when the job finishes (see _final_values)
+        job = Job(
+            user_id=user_id,
+            job_type=job_type,
+            status=Job.STATUS_QUEUED
+        )
+        db.session.add(job)
+        db.session.commit()
+        
+        try:
+            cls._queue.put_nowait((job.id, payload))
+        except queue.Full:
+            db.session.delete(job)
+            db.session.commit()
+            raise JobQueueFull()
+        
+        return job
+    
+    @classmethod
+    def get(cls, job_id):
+        """Return a job that has not expired, or None (queued and running jobs never expire)."""
+        cls.purge_expired()
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return None
+        if job.status in Job.FINAL_STATUSES and job.expires_at and job.expires_at < datetime.utcnow():
+            return None
+        return job
+    
+    @classmethod
+    def cancel(cls, job_id):
+        """
+        Cancel a job.
+        
+        Queued jobs are cancelled immediately; running jobs are flagged and
+        stop at the handler's next cancellation check. Both are conditional
+        updates on the current status, so a worker claiming the job at the
+        same moment either sees it cancelled or gets it flagged.
+        
+        Returns:
+            Job or None if not found
+        """
+        job = cls.get(job_id)
+        if job is None or job.status in Job.FINAL_STATUSES:
+            return job
+        
+        cancelled = db.session.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == Job.STATUS_QUEUED)
+            .values(cancel_requested=True, **cls._final_values(Job.STATUS_CANCELLED)),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        if not cancelled:
+            db.session.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status == Job.STATUS_RUNNING)
+                .values(cancel_requested=True),
+                execution_options={'synchronize_session': False}
+            )
+        db.session.commit()
+        db.session.refresh(job)
+        return job
+    
+    @classmethod
+    def queue_depth(cls):
+        """Return the number of jobs waiting in this process."""
+        return cls._queue.qsize() if cls._queue is not None else 0
+    
+    @classmethod
+    def purge_expired(cls, force=False):
+        """Delete finished jobs past their TTL, at most once per PURGE_INTERVAL_SECONDS."""
+        now = time.monotonic()
+        if not force and now - cls._last_purge < cls.PURGE_INTERVAL_SECONDS:
+            return 0
+        cls._last_purge = now
+        
+        deleted = Job.query.filter(
+            Job.status.in_(Job.FINAL_STATUSES),
+            Job.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+    
+    @staticmethod
+    def _final_values(status, result=None, error=None):
+        """Column values of a finished job (restarts the result TTL)."""
+        ttl = current_app.config.get('JOB_RESULT_TTL', 3600)
+        finished_at = datetime.utcnow()
+        return {
+            'status': status,
+            'result': result,
+            'error': error,
+            'finished_at': finished_at,
+            'expires_at': finished_at + timedelta(seconds=ttl)
+        }
+    
+    @classmethod
+    def _finish(cls, job, status, result=None, error=None):
+        """Set final status and restart the result TTL."""
+        for name, value in cls._final_values(status, result, error).items():
+            setattr(job, name, value)
+    
+    @classmethod
+    def _worker_loop(cls, app):
+        """Worker thread: pull jobs and run them inside an app context."""
+        while True:
+            job_id, payload = cls._queue.get()
+            try:
+                with app.app_context():
+                    cls._run(job_id, payload)
+            except Exception as e:
+                app.logger.error(f"Job worker error for {job_id}: {e}", exc_info=True)
+            finally:
+                cls._queue.task_done()
+    
+    @classmethod
+    def _run(cls, job_id, payload):
+        """Execute a single job and persist its outcome."""
+        # Claim the job only if it is still queued (not cancelled or purged meanwhile)
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == Job.STATUS_QUEUED)
+            .values(status=Job.STATUS_RUNNING, started_at=datetime.utcnow()),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+        job = db.session.get(Job, job_id)
+        
+        try:
+            result = cls._handlers[job.job_type](payload, JobContext(job))
+        except JobCancelled:
+            db.session.rollback()
+            cls._finish(job, Job.STATUS_CANCELLED)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Job {job_id} ({job.job_type}) failed: {e}", exc_info=True)
+            cls._finish(job, Job.STATUS_FAILED, error=str(e))
+        else:
+            cls._finish(job, Job.STATUS_SUCCEEDED, result=result)
+        
+        db.session.commit()
+
+
+@JobService.handler('leaf_batch')
+def _run_leaf_batch(payload, context):
+    """Analyze a batch of leaf images for BWD scores."""
+    from app.services.analysis_service import AnalysisService
+    
+    images = payload['images']
+    results = []
+    context.set_progress(0, len(images))
+    for index, image_data in enumerate(images):
+        context.check_cancelled()
+        analysis = AnalysisService.analyze_leaf_image(image_data)
+        if analysis is None:
+            results.append({'index': index, 'success': False, 'message': 'No leaf-like area detected'})
+        else:
+            results.append({
+                'index': index,
+                'success': True,
+                'bwd_score': analysis['bwd_score'],
+                'avg_hue_value': analysis['avg_hue'],
+                'confidence_percent': analysis['confidence']
+            })
+        context.set_progress(index + 1)
+    return {'results': results}
+
+
+@JobService.handler('disease_detection')
+def _run_disease_detection(payload, context):
+    """Run Roboflow disease detection on one image."""
+    from app.services.disease_service import DiseaseService
+    
+    context.check_cancelled()
+    return {'data': DiseaseService.detect_disease(payload['image'])}
+
+
+@JobService.handler('yield_explanation')
+def _run_yield_explanation(payload, context):
+    """Predict yield with SHAP explanation."""
+    from app.services.ml_service import MLService
+    
+    context.check_cancelled()
+    return MLService.predict_yield_advanced(payload['data'])
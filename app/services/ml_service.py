@@ -5,7 +5,6 @@ import numpy as np
 import threading  # <-- PERBAIKAN: Impor 'threading' ditambahkan di sini
 from werkzeug.utils import secure_filename
 import cv2
-from inference_sdk import InferenceHTTPClient
 import uuid
 
 # --- MANAJEMEN MODEL ---
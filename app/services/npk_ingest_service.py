@@ -0,0 +1,207 @@
+"""Bulk ingestion of NPK sensor readings."""
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models.npk_reading import NpkReading
+from app.services.analysis_service import AnalysisService
+from app.services.rollup_service import RollupService
+from app.services.tile_service import TileService
+from app.utils.geohash import encode_many as encode_geohashes
+
+
+class NpkIngestService:
+    """
+    Validate, analyze and insert batches of NPK readings.
+    
+    Validation runs column-wise over the whole batch, analysis labels are
+    computed with array comparisons, and rows are written with a Core
+    ``INSERT`` executed once per chunk (executemany), so the per-row cost
+    is only building the parameter dict.
+    """
+    
+    REQUIRED_FIELDS = ('n_value', 'p_value', 'k_value')
+    
+    # Highest N/P/K value accepted (mg/kg): far above what soil sensors
+    # report, and well inside the INTEGER columns
+    NPK_VALUE_MAX = 100000
+    
+    # field: (min, max) accepted range, None for unbounded
+    NUMERIC_RANGES = {
+        'n_value': (0, NPK_VALUE_MAX),
+        'p_value': (0, NPK_VALUE_MAX),
+        'k_value': (0, NPK_VALUE_MAX),
+        'ph_value': (0, 14),
+        'temperature': (-50, 80),
+        'humidity': (0, 100),
+        'latitude': (-90, 90),
+        'longitude': (-180, 180)
+    }
+    
+    LOCATION_MAX_LENGTH = 100
+    
+    @classmethod
+    def validate(cls, rows):
+        """
+        Validate a batch of readings.
+        
+        Args:
+            rows: List of reading dicts
+            
+        Returns:
+            tuple: (DataFrame of normalised columns, list of error lists per row)
+        """
+        count = len(rows)
+        is_record = np.fromiter((isinstance(row, dict) for row in rows), dtype=bool, count=count)
+        frame = pd.DataFrame.from_records(
+            [row if ok else {} for row, ok in zip(rows, is_record)],
+            columns=list(cls.NUMERIC_RANGES) + ['location', 'timestamp']
+        )
+        
+        problems = {}  # message -> boolean mask of failing rows
+        problems['reading must be a JSON object'] = ~is_record
+        
+        for field, (low, high) in cls.NUMERIC_RANGES.items():
+            raw = frame[field]
+            present = raw.notna().to_numpy()
+            is_bool = raw.map(lambda value: isinstance(value, bool)).to_numpy(dtype=bool)
+            values = pd.to_numeric(raw.where(~is_bool), errors='coerce').to_numpy(dtype=np.float64)
+            numeric = np.isfinite(values)
+            
+            if field in cls.REQUIRED_FIELDS:
+                problems[f'{field} is required'] = is_record & ~present
+                problems[f'{field} must be an integer'] = present & ~(numeric & (values == np.round(values)))
+            else:
+                problems[f'{field} must be a number'] = present & ~numeric
+            
+            in_range = np.ones(count, dtype=bool)
+            with np.errstate(invalid='ignore'):
+                if low is not None:
+                    in_range &= ~(values < low)
+                if high is not None:
+                    in_range &= ~(values > high)
+            bounds = f"[{low if low is not None else '-inf'}, {high if high is not None else 'inf'}]"
+            problems[f'{field} must be within {bounds}'] = numeric & ~in_range
+            frame[field] = values
+        
+        locations = frame['location']
+        location_present = locations.notna().to_numpy()
+        location_ok = locations.map(
+            lambda value: isinstance(value, str) and len(value) <= cls.LOCATION_MAX_LENGTH
+        ).to_numpy(dtype=bool)
+        problems[f'location must be a string of at most {cls.LOCATION_MAX_LENGTH} characters'] = \
+            location_present & ~location_ok
+        
+        raw_timestamps = frame['timestamp']
+        timestamps = pd.to_datetime(raw_timestamps, errors='coerce', utc=True, format='ISO8601')
+        problems['timestamp must be an ISO 8601 string'] = \
+            raw_timestamps.notna().to_numpy() & timestamps.isna().to_numpy()
+        frame['timestamp'] = timestamps.dt.tz_localize(None)
+        
+        errors = [[] for _ in range(count)]
+        for message, mask in problems.items():
+            for index in np.flatnonzero(mask):
+                errors[index].append(message)
+        return frame, errors
+    
+    @classmethod
+    def _build_rows(cls, frame, user_id, crop=None):
+        """Build INSERT parameter dicts for the (already valid) rows of frame."""
+        now = datetime.utcnow()
+        n_values = frame['n_value'].astype(np.int64)
+        p_values = frame['p_value'].astype(np.int64)
+        k_values = frame['k_value'].astype(np.int64)
+        analyses = AnalysisService.analyze_npk_bulk(
+            n_values, p_values, k_values, ph_values=frame['ph_value'], crop=crop
+        )
+        
+        def column(name):
+            # NaN/NaT -> None so optional columns are stored as NULL
+            series = frame[name]
+            return series.astype(object).where(series.notna(), None).tolist()
+        
+        timestamps = [ts.to_pydatetime() if ts is not None else now for ts in column('timestamp')]
+        geohashes = encode_geohashes(frame['latitude'], frame['longitude'])
+        
+        return [
+            {
+                'user_id': user_id,
+                'timestamp': timestamp,
+                'n_value': n,
+                'p_value': p,
+                'k_value': k,
+                'ph_value': ph,
+                'temperature': temperature,
+                'humidity': humidity,
+                'location': location,
+                'latitude': latitude,
+                'longitude': longitude,
+                'geohash': cell,
+                'analysis_result': analysis
+            }
+            for timestamp, n, p, k, ph, temperature, humidity, location, latitude, longitude, cell, analysis in zip(
+                timestamps, n_values.tolist(), p_values.tolist(), k_values.tolist(),
+                column('ph_value'), column('temperature'), column('humidity'),
+                column('location'), column('latitude'), column('longitude'), geohashes, analyses
+            )
+        ]
+    
+    @classmethod
+    def ingest(cls, rows, user_id=None, chunk_size=None, crop=None):
+        """
+        Validate and store a batch of readings.
+        
+        Each chunk is inserted and committed on its own, so a database error
+        only rejects the rows of that chunk.
+        
+        Args:
+            rows: List of reading dicts
+            user_id: Owner of the readings, if authenticated
+            chunk_size: Rows per INSERT executemany (default NPK_BULK_CHUNK_SIZE)
+            crop: Crop whose NPK rule set labels the readings (default rules if None)
+            
+        Returns:
+            dict: 'accepted' / 'rejected' counts and per-row 'results'
+        """
+        if chunk_size is None:
+            chunk_size = current_app.config.get('NPK_BULK_CHUNK_SIZE', 1000)
+        
+        frame, errors = cls.validate(rows)
+        valid = np.fromiter((not row_errors for row_errors in errors), dtype=bool, count=len(rows))
+        valid_index = np.flatnonzero(valid)
+        
+        params = cls._build_rows(frame.iloc[valid_index], user_id, crop=crop) if len(valid_index) else []
+        statement = NpkReading.__table__.insert()
+        inserted = []
+        
+        for start in range(0, len(params), chunk_size):
+            chunk = params[start:start + chunk_size]
+            try:
+                db.session.execute(statement, chunk)
+                db.session.commit()
+                inserted.extend(chunk)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                current_app.logger.error(f"NPK bulk insert chunk at {start} failed: {e}")
+                for index in valid_index[start:start + chunk_size]:
+                    errors[index].append('database error')
+        
+        RollupService.on_readings_inserted(inserted)
+        TileService.invalidate_readings(inserted)
+        
+        results = []
+        accepted = 0
+        for index, row_errors in enumerate(errors):
+            if row_errors:
+                results.append({'index': index, 'status': 'rejected', 'errors': row_errors})
+            else:
+                accepted += 1
+                results.append({'index': index, 'status': 'accepted'})
+        
+        return {
+            'accepted': accepted,
+            'rejected': len(rows) - accepted,
+            'results': results
+        }
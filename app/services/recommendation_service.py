@@ -1,12 +1,142 @@
 """Recommendation service for fertilizer and crop recommendations."""
+import json
+import threading
 import numpy as np
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app import db
 from app.ml_models.model_loader import ModelLoader
+from app.models.recommendation import Recommendation, RecommendationResult
 from app.utils.data_loader import DataLoader
+from app.utils.result_cache import ResultCache
+
+# Inputs of the fertilizer model, in feature order
+FERTILIZER_FEATURES = ('ph_tanah', 'skor_bwd', 'kelembaban_tanah', 'umur_tanaman_hari')
+# Part of the input hash; bump when the pH rules or texts below change
+FERTILIZER_RULES_VERSION = 1
 
 
 class RecommendationService:
     """Service for fertilizer and crop recommendations."""
     
+    _dedup_lock = threading.Lock()
+    _dedup_metrics = {
+        'memory_hits': 0,
+        'stored_hits': 0,
+        'misses': 0,
+        'store_failures': 0
+    }
+    
+    @staticmethod
+    def input_hash(data):
+        """
+        Hash of a fertilizer request's normalized model input and model version.
+        
+        Only the model features count, as floats, so ``"6.5"``, ``6.5`` and
+        ``6.50`` hash alike and extra fields (crop_type, location) are
+        ignored. A retrained model file changes the hash.
+        
+        Args:
+            data: Request data with the FERTILIZER_FEATURES fields
+            
+        Returns:
+            str: 40-character hex digest
+        """
+        normalized = json.dumps([float(data[field]) for field in FERTILIZER_FEATURES])
+        model_version = f"{ModelLoader.get_model_version('recommendation')}|rules={FERTILIZER_RULES_VERSION}"
+        return ResultCache.make_key(normalized.encode(), model_version)
+    
+    @classmethod
+    def _count(cls, metric):
+        with cls._dedup_lock:
+            cls._dedup_metrics[metric] += 1
+    
+    @classmethod
+    def get_shared_fertilizer_recommendation(cls, data):
+        """
+        Fertilizer recommendation, reusing the stored result of an identical input.
+        
+        Results are looked up by input_hash() in the ``recommendation``
+        result cache, then in ``recommendation_results``; only a miss runs
+        the model, and its result is stored there for later requests.
+        
+        Args:
+            data: Request data with the FERTILIZER_FEATURES fields
+            
+        Returns:
+            tuple: (recommendation dict, input hash to store on the
+            Recommendation row, or None when the result could not be
+            stored and the row should keep its own copy)
+        """
+        if not current_app.config.get('RECOMMENDATION_DEDUP_ENABLED', True):
+            return cls.get_fertilizer_recommendation(data), None
+        
+        key = cls.input_hash(data)
+        cache = ResultCache.get_cache('recommendation')
+        recommendation = cache.get(key) if cache is not None else None
+        if recommendation is not None:
+            cls._count('memory_hits')
+            return recommendation, key
+        
+        result = db.session.get(RecommendationResult, key)
+        if result is not None:
+            cls._count('stored_hits')
+            recommendation = result.recommendation_data
+        else:
+            cls._count('misses')
+            recommendation = cls.get_fertilizer_recommendation(data)
+            try:
+                db.session.add(RecommendationResult(
+                    input_hash=key,
+                    recommendation_type='fertilizer',
+                    model_version=ModelLoader.get_model_version('recommendation'),
+                    recommendation_data=recommendation
+                ))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()  # Stored meanwhile by a request with the same input
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                cls._count('store_failures')
+                current_app.logger.warning(f"Could not store shared recommendation result: {e}")
+                return recommendation, None
+        
+        if cache is not None:
+            cache.set(key, recommendation)
+        return recommendation, key
+    
+    @classmethod
+    def dedup_stats(cls):
+        """
+        Reuse counters of this process and stored totals.
+        
+        Returns:
+            dict: Process counters with hit_rate (share of requests that
+            did not run the model), plus the number of recommendations
+            referencing a shared result, the number of shared results and
+            the copies of recommendation_data that were not stored
+        """
+        with cls._dedup_lock:
+            metrics = dict(cls._dedup_metrics)
+        requests = metrics['memory_hits'] + metrics['stored_hits'] + metrics['misses']
+        hits = metrics['memory_hits'] + metrics['stored_hits']
+        metrics['requests'] = requests
+        metrics['hit_rate'] = round(hits / requests, 4) if requests else 0.0
+        metrics['enabled'] = current_app.config.get('RECOMMENDATION_DEDUP_ENABLED', True)
+        
+        references = db.session.execute(
+            select(func.count()).select_from(Recommendation).where(Recommendation.input_hash.isnot(None))
+        ).scalar()
+        results = db.session.execute(select(func.count()).select_from(RecommendationResult)).scalar()
+        metrics['stored'] = {
+            'references': references,
+            'results': results,
+            'copies_saved': max(references - results, 0),
+            'reuse_rate': round(1 - results / references, 4) if references else 0.0
+        }
+        return metrics
+    
     @staticmethod
     def get_fertilizer_recommendation(data):
         """Get fertilizer recommendation based on soil and crop data."""
@@ -28,12 +158,7 @@ class RecommendationService:
             peringatan = []
         
         # ML-based NPK recommendation
-        input_df = np.array([[
-            data['ph_tanah'],
-            data['skor_bwd'],
-            data['kelembaban_tanah'],
-            data['umur_tanaman_hari']
-        ]])
+        input_df = np.array([[data[field] for field in FERTILIZER_FEATURES]])
         
         prediksi_ml = model.predict(input_df)[0]
         
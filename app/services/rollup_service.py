@@ -0,0 +1,427 @@
+"""Hourly and daily rollups of NPK readings."""
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import and_, delete, or_, select, text
+from app import db
+from app.models.npk_reading import NpkReading
+from app.models.npk_rollup import NpkRollupHourly, NpkRollupDaily, ROLLUP_METRICS
+from app.utils.columnar import encode_columns
+from app.utils.npk_rules import MISSING, NPK_LABELS, rule_set_for
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+# PostgreSQL advisory lock keys: (namespace, user id), 0 for anonymous
+# readings and -1 for refreshes of all users
+ROLLUP_LOCK_NAMESPACE = 0x4e504b
+ALL_USERS_LOCK = -1
+
+# Aggregation of the per-metric rollup columns; applies equally to raw
+# readings (prepared by _raw_frame) and to finer rollup buckets.
+AGGREGATIONS = {'count': 'sum'}
+for _prefix, _ in ROLLUP_METRICS:
+    AGGREGATIONS.update({
+        f'{_prefix}_count': 'sum',
+        f'{_prefix}_min': 'min',
+        f'{_prefix}_max': 'max',
+        f'{_prefix}_sum': 'sum'
+    })
+
+ROLLUP_COLUMNS = ['user_id', 'location', 'bucket_start'] + list(AGGREGATIONS)
+
+
+def _floor(moment, step):
+    """Round a naive datetime down to a whole hour or day."""
+    if step == DAY:
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _ceil(moment, step):
+    """Round a naive datetime up to a whole hour or day."""
+    floored = _floor(moment, step)
+    return floored if floored == moment else floored + step
+
+
+def _ranges(moments, step):
+    """Merge the hour or day buckets of moments into sorted [start, end) ranges."""
+    ranges = []
+    for bucket in sorted({_floor(moment, step) for moment in moments}):
+        if ranges and ranges[-1][1] == bucket:
+            ranges[-1] = (ranges[-1][0], bucket + step)
+        else:
+            ranges.append((bucket, bucket + step))
+    return ranges
+
+
+class RollupService:
+    """
+    Maintain and query hourly/daily aggregates of NPK readings.
+    
+    A refresh recomputes whole buckets from the source rows (raw readings
+    for hourly buckets, hourly buckets for daily ones) and replaces them,
+    so running it twice over the same window never double counts.
+    Concurrent refreshes of the same user are serialized (see _lock), so
+    two of them cannot both insert a bucket or write back a stale one.
+    """
+    
+    @staticmethod
+    def _user_filter(column, user_ids):
+        """Restrict column to user_ids (None entries match anonymous rows)."""
+        if user_ids is None:
+            return None
+        ids = [user_id for user_id in user_ids if user_id is not None]
+        clauses = [column.in_(ids)] if ids else []
+        if None in user_ids:
+            clauses.append(column.is_(None))
+        return or_(*clauses)
+    
+    @staticmethod
+    def _raw_frame(rows):
+        """Turn raw reading rows into single-reading rollup columns."""
+        frame = pd.DataFrame(rows, columns=['user_id', 'location', 'timestamp'] + [
+            attribute for _, attribute in ROLLUP_METRICS
+        ])
+        frame['count'] = 1
+        for prefix, attribute in ROLLUP_METRICS:
+            values = pd.to_numeric(frame.pop(attribute), errors='coerce').astype(np.float64)
+            frame[f'{prefix}_count'] = values.notna().astype(np.int64)
+            frame[f'{prefix}_min'] = values
+            frame[f'{prefix}_max'] = values
+            frame[f'{prefix}_sum'] = values
+        return frame
+    
+    @staticmethod
+    def _aggregate(frame, buckets):
+        """
+        Merge rollup columns per (user, location, bucket).
+        
+        Args:
+            frame: DataFrame with ROLLUP_COLUMNS (bucket_start is replaced)
+            buckets: Series of bucket start datetimes aligned with frame
+            
+        Returns:
+            DataFrame with one row per bucket
+        """
+        frame = frame.assign(bucket_start=buckets)
+        # Anonymous readings and readings without a location are buckets too
+        grouped = frame.groupby(['user_id', 'location', 'bucket_start'], dropna=False, sort=True)
+        return grouped.agg(AGGREGATIONS).reset_index()
+    
+    @staticmethod
+    def _to_params(frame):
+        """Build INSERT parameter dicts, mapping NaN back to NULL."""
+        columns = {}
+        for name in ROLLUP_COLUMNS:
+            series = frame[name]
+            if name == 'bucket_start':
+                columns[name] = pd.to_datetime(series).dt.to_pydatetime().tolist()
+                continue
+            if name in ('user_id', 'count') or name.endswith('_count'):
+                series = series.astype('Int64')
+            columns[name] = series.astype(object).where(series.notna(), None).tolist()
+        return [dict(zip(ROLLUP_COLUMNS, values)) for values in zip(*columns.values())]
+    
+    @staticmethod
+    def _lock(user_ids):
+        """
+        Serialize refreshes of the same users until the transaction ends.
+        
+        On PostgreSQL this takes transaction-scoped advisory locks: one per
+        user under a shared all-users lock, or the exclusive all-users lock
+        when every user is refreshed. Other databases (SQLite) allow one
+        writer at a time, and refresh() deletes the old hourly buckets,
+        which takes that write lock, before it reads any readings.
+        """
+        if db.session.get_bind().dialect.name != 'postgresql':
+            return
+        
+        lock = text('SELECT pg_advisory_xact_lock(:namespace, :key)')
+        if user_ids is None:
+            db.session.execute(lock, {'namespace': ROLLUP_LOCK_NAMESPACE, 'key': ALL_USERS_LOCK})
+            return
+        db.session.execute(text('SELECT pg_advisory_xact_lock_shared(:namespace, :key)'),
+                           {'namespace': ROLLUP_LOCK_NAMESPACE, 'key': ALL_USERS_LOCK})
+        # Fixed order, so two multi-user refreshes cannot deadlock
+        for key in sorted({0 if user_id is None else int(user_id) for user_id in user_ids}):
+            db.session.execute(lock, {'namespace': ROLLUP_LOCK_NAMESPACE, 'key': key})
+    
+    @staticmethod
+    def _range_filter(column, ranges):
+        """Restrict column to any of the [start, end) ranges."""
+        return or_(*[and_(column >= start, column < end) for start, end in ranges])
+    
+    @classmethod
+    def _clear(cls, model, ranges, user_ids):
+        """Delete model buckets in ranges for user_ids."""
+        statement = delete(model).where(cls._range_filter(model.bucket_start, ranges))
+        user_filter = cls._user_filter(model.user_id, user_ids)
+        if user_filter is not None:
+            statement = statement.where(user_filter)
+        db.session.execute(statement)
+    
+    @classmethod
+    def _insert(cls, model, frame):
+        """Insert aggregated buckets."""
+        if len(frame):
+            db.session.execute(model.__table__.insert(), cls._to_params(frame))
+    
+    @classmethod
+    def refresh(cls, start, end, user_ids=None):
+        """
+        Recompute hourly and daily rollups for readings in [start, end).
+        
+        The window is widened to whole hours, and the daily recompute to
+        whole days.
+        
+        Args:
+            start: Naive UTC datetime
+            end: Naive UTC datetime (exclusive)
+            user_ids: Iterable of user ids to refresh (None for all users)
+            
+        Returns:
+            dict: Number of readings, hourly and daily buckets written
+        """
+        return cls._refresh(
+            [(_floor(start, HOUR), _ceil(end, HOUR))],
+            [(_floor(start, DAY), _ceil(end, DAY))],
+            user_ids
+        )
+    
+    @classmethod
+    def _refresh(cls, hour_ranges, day_ranges, user_ids):
+        """Recompute hourly buckets in hour_ranges, then daily buckets in day_ranges."""
+        user_ids = set(user_ids) if user_ids is not None else None
+        query = select(
+            NpkReading.user_id, NpkReading.location, NpkReading.timestamp,
+            *[getattr(NpkReading, attribute) for _, attribute in ROLLUP_METRICS]
+        ).where(cls._range_filter(NpkReading.timestamp, hour_ranges))
+        user_filter = cls._user_filter(NpkReading.user_id, user_ids)
+        if user_filter is not None:
+            query = query.where(user_filter)
+        
+        try:
+            # Lock and clear before reading, so the readings are read after
+            # any concurrent refresh of these users has committed
+            cls._lock(user_ids)
+            cls._clear(NpkRollupHourly, hour_ranges, user_ids)
+            raw = cls._raw_frame(db.session.execute(query).all())
+            hourly = cls._aggregate(raw, raw['timestamp'].dt.floor('h')) if len(raw) else raw
+            cls._insert(NpkRollupHourly, hourly)
+            db.session.flush()
+            
+            hourly_rows = cls._load(NpkRollupHourly, day_ranges, user_ids=user_ids)
+            daily = cls._aggregate(hourly_rows, hourly_rows['bucket_start'].dt.floor('D')) \
+                if len(hourly_rows) else hourly_rows
+            cls._clear(NpkRollupDaily, day_ranges, user_ids)
+            cls._insert(NpkRollupDaily, daily)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        return {
+            'readings': len(raw),
+            'hourly_buckets': len(hourly),
+            'daily_buckets': len(daily)
+        }
+    
+    @classmethod
+    def on_readings_inserted(cls, rows):
+        """
+        Refresh the buckets touched by newly inserted readings.
+        
+        Only the distinct hours of the readings (and their days) are
+        recomputed, not everything between the oldest and newest reading.
+        At most ``ROLLUP_INGEST_MAX_BUCKETS`` hours are refreshed, the most
+        recent ones; older hours are left to ``flask rollup-npk``.
+        
+        Failures are logged rather than raised: the readings are already
+        committed and the next periodic refresh repairs the rollups.
+        
+        Args:
+            rows: Inserted reading dicts (``user_id`` and ``timestamp`` keys)
+        """
+        if not rows or not current_app.config.get('ROLLUP_ON_INGEST', True):
+            return
+        
+        timestamps = [row['timestamp'] for row in rows if row.get('timestamp') is not None]
+        if not timestamps:
+            return
+        
+        hours = sorted({_floor(timestamp, HOUR) for timestamp in timestamps})
+        limit = current_app.config.get('ROLLUP_INGEST_MAX_BUCKETS', 168)
+        if len(hours) > limit:
+            current_app.logger.info(f"NPK rollups of {len(hours) - limit} older hours left to `flask rollup-npk`")
+            hours = hours[-limit:]
+        
+        try:
+            cls._refresh(_ranges(hours, HOUR), _ranges(hours, DAY),
+                         user_ids={row.get('user_id') for row in rows})
+        except Exception as e:
+            current_app.logger.error(f"NPK rollup refresh after ingest failed: {e}")
+    
+    @classmethod
+    def load(cls, model, start, end, user_ids=None, location=None, session=None):
+        """
+        Load rollup buckets in [start, end) as a DataFrame of ROLLUP_COLUMNS.
+        
+        Reads through session (default db.session).
+        """
+        return cls._load(model, [(start, end)], user_ids=user_ids, location=location, session=session)
+    
+    @classmethod
+    def _load(cls, model, ranges, user_ids=None, location=None, session=None):
+        """Load rollup buckets in any of the [start, end) ranges."""
+        query = select(*[getattr(model, column) for column in ROLLUP_COLUMNS]).where(
+            cls._range_filter(model.bucket_start, ranges)
+        )
+        user_filter = cls._user_filter(model.user_id, user_ids)
+        if user_filter is not None:
+            query = query.where(user_filter)
+        if location is not None:
+            query = query.where(model.location == location)
+        frame = pd.DataFrame((session or db.session).execute(query).all(), columns=ROLLUP_COLUMNS)
+        frame['bucket_start'] = pd.to_datetime(frame['bucket_start'])
+        # All-NULL columns arrive as object dtype, which groupby aggregates
+        # in pure Python; keep every aggregate column numeric.
+        frame[list(AGGREGATIONS)] = frame[list(AGGREGATIONS)].astype(np.float64)
+        return frame
+    
+    @staticmethod
+    def choose_resolution(start, end, max_points):
+        """
+        Pick the finest bucket size that keeps each series within max_points.
+        
+        Returns:
+            tuple: (model, bucket timedelta)
+        """
+        span = end - start
+        if span / HOUR <= max_points:
+            return NpkRollupHourly, HOUR
+        days = -(-span // DAY)
+        return NpkRollupDaily, DAY * max(1, -(-days // max_points))
+    
+    @classmethod
+    def query_series(cls, user_id, start, end, max_points, location=None, session=None, crop=None):
+        """
+        Return rollup series per location for a chart.
+        
+        The mean of each metric the NPK rules cover (N, P, K, pH) is
+        labelled with the crop's rule set, all buckets at once.
+        
+        Args:
+            user_id: Owner of the readings
+            start: Naive UTC datetime
+            end: Naive UTC datetime (exclusive)
+            max_points: Maximum buckets per location series
+            location: Optional location filter
+            session: Session to read from (default db.session)
+            crop: Crop whose rule set labels the means (default rules if None)
+            
+        Returns:
+            dict: 'resolution' (e.g. '1h', '1d', '7d') and 'series'
+        """
+        model, bucket = cls.choose_resolution(start, end, max_points)
+        origin = _floor(start, HOUR if model is NpkRollupHourly else DAY)
+        frame = cls.load(model, origin, end, user_ids={user_id}, location=location, session=session)
+        
+        if bucket > DAY and len(frame):
+            offsets = (frame['bucket_start'] - pd.Timestamp(origin)) // pd.Timedelta(bucket)
+            frame = cls._aggregate(frame, pd.Timestamp(origin) + offsets * pd.Timedelta(bucket))
+        
+        frame = frame.sort_values('bucket_start')
+        rule_set = rule_set_for(crop)
+        labelled = [(prefix, attribute) for prefix, attribute in ROLLUP_METRICS if attribute in rule_set.fields]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = {
+                attribute: frame[f'{prefix}_sum'].to_numpy(np.float64) / frame[f'{prefix}_count'].to_numpy(np.float64)
+                for prefix, attribute in labelled
+            }
+        bands = dict(zip(rule_set.fields, rule_set.bands(means).tolist())) if len(frame) else {}
+        
+        series = {}
+        for index, record in enumerate(cls._to_params(frame) if len(frame) else []):
+            point = {
+                'bucket_start': record['bucket_start'].isoformat(),
+                'count': record['count']
+            }
+            for prefix, _ in ROLLUP_METRICS:
+                count = record[f'{prefix}_count']
+                point[prefix] = {
+                    'count': count,
+                    'min': record[f'{prefix}_min'],
+                    'max': record[f'{prefix}_max'],
+                    'mean': round(record[f'{prefix}_sum'] / count, 3) if count else None
+                }
+            for prefix, attribute in labelled:
+                band = bands[attribute][index]
+                point[prefix]['label'] = NPK_LABELS[band] if band != MISSING else None
+            series.setdefault(record['location'], []).append(point)
+        
+        if bucket == HOUR:
+            resolution = '1h'
+        else:
+            resolution = f'{bucket.days}d'
+        return {
+            'resolution': resolution,
+            'bucket_seconds': int(bucket.total_seconds()),
+            'start': origin.isoformat(),
+            'end': end.isoformat(),
+            'series': [
+                {'location': location_name, 'points': points}
+                for location_name, points in series.items()
+            ]
+        }
+    
+    @staticmethod
+    def columnar_series(rollups):
+        """
+        Convert query_series output to one columnar payload per location.
+        
+        Point fields are flattened to 'bucket_start', 'count' and
+        '<metric>_count|min|max|mean' (plus '<metric>_label' for labelled
+        metrics).
+        """
+        series = []
+        for entry in rollups['series']:
+            points = entry['points']
+            fields = ['bucket_start', 'count']
+            columns = [[point['bucket_start'] for point in points], [point['count'] for point in points]]
+            for prefix, _ in ROLLUP_METRICS:
+                for stat in ('count', 'min', 'max', 'mean', 'label'):
+                    if stat in points[0][prefix]:
+                        fields.append(f'{prefix}_{stat}')
+                        columns.append([point[prefix][stat] for point in points])
+            series.append({'location': entry['location'], 'points': encode_columns(fields, columns)})
+        return {**rollups, 'series': series}
+    
+    @classmethod
+    def rebuild(cls, start=None, end=None, window=timedelta(days=7)):
+        """
+        Recompute all rollups between start and end in day-aligned windows.
+        
+        Defaults to the full range of stored readings.
+        
+        Returns:
+            dict: Totals over all windows
+        """
+        if start is None or end is None:
+            first, last = db.session.execute(
+                select(db.func.min(NpkReading.timestamp), db.func.max(NpkReading.timestamp))
+            ).one()
+            if first is None:
+                return {'readings': 0, 'hourly_buckets': 0, 'daily_buckets': 0}
+            start = start or first
+            end = end or last + HOUR
+        
+        totals = {'readings': 0, 'hourly_buckets': 0, 'daily_buckets': 0}
+        window_start = _floor(start, DAY)
+        while window_start < end:
+            window_end = min(window_start + window, _ceil(end, DAY))
+            for key, value in cls.refresh(window_start, window_end).items():
+                totals[key] += value
+            window_start = window_end
+        return totals
@@ -0,0 +1,265 @@
+"""Heatmap tiles of NPK readings (Web Mercator z/x/y)."""
+import math
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models.npk_reading import NpkReading
+from app.services.geo_service import GeoService
+
+MAX_MERCATOR_LAT = 85.0511287798
+
+# metric: (NpkReading column, default colour scale range)
+TILE_METRICS = {
+    'n': ('n_value', (0.0, 300.0)),
+    'p': ('p_value', (0.0, 60.0)),
+    'k': ('k_value', (0.0, 400.0)),
+    'ph': ('ph_value', (4.0, 9.0))
+}
+
+
+def tile_bounds(z, x, y):
+    """Return (south, west, north, east) of a tile in degrees."""
+    count = 1 << z
+    
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / count))))
+    
+    return latitude(y + 1), x / count * 360.0 - 180.0, latitude(y), (x + 1) / count * 360.0 - 180.0
+
+
+def tile_coords(latitudes, longitudes, z):
+    """
+    Fractional tile coordinates of points at zoom z (vectorized).
+    
+    Returns:
+        tuple: (x, y) float arrays; the integer part is the tile index
+    """
+    count = 1 << z
+    latitudes = np.radians(np.clip(np.asarray(latitudes, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (np.asarray(longitudes, dtype=np.float64) + 180.0) / 360.0 * count
+    y = (1.0 - np.log(np.tan(latitudes) + 1.0 / np.cos(latitudes)) / math.pi) / 2.0 * count
+    return x, y
+
+
+class TileService:
+    """
+    Aggregate readings into a fixed grid per map tile.
+    
+    A tile is built with one indexed query for the readings inside it and
+    ``np.bincount`` over the flattened cell index of every reading, giving
+    per-cell counts and sums for all metrics at once. The sparse grid is
+    cached per tile, scope and time window; inserting readings drops the
+    cached grids of every tile containing one of them. That only reaches
+    this process's cache, so cached grids also expire after
+    ``TILE_MAX_AGE`` seconds, which bounds how stale a tile built before
+    another worker's insert can get.
+    """
+    
+    _cache = OrderedDict()  # key -> (grid dict, monotonic build start)
+    _by_tile = {}  # (z, x, y) -> set of cache keys
+    _building = {}  # (z, x, y) -> number of builds in progress
+    _dirty = set()  # tiles that received readings while being built
+    _lock = threading.Lock()
+    _metrics = {'hits': 0, 'misses': 0, 'invalidations': 0, 'expired': 0}
+    
+    @classmethod
+    def build_grid(cls, z, x, y, user_id=None, start=None, end=None):
+        """
+        Compute the sparse per-cell aggregates of one tile.
+        
+        Args:
+            z, x, y: Tile coordinates
+            user_id: Restrict to one user's readings (None for all)
+            start, end: Optional timestamp window [start, end)
+            
+        Returns:
+            dict: 'grid' size, flat cell 'index', 'count' and distinct
+            'users' (anonymous readings count as one), and per metric
+            '<metric>_count' / '<metric>_sum' lists aligned with 'index'
+        """
+        size = current_app.config.get('TILE_GRID_SIZE', 32)
+        south, west, north, east = tile_bounds(z, x, y)
+        
+        columns = [getattr(NpkReading, column) for column, _ in TILE_METRICS.values()]
+        query = select(NpkReading.latitude, NpkReading.longitude, *columns, NpkReading.user_id).where(
+            GeoService.boxes_clause([(south, west, north, east)])
+        )
+        if user_id is not None:
+            query = query.where(NpkReading.user_id == user_id)
+        if start is not None:
+            query = query.where(NpkReading.timestamp >= start)
+        if end is not None:
+            query = query.where(NpkReading.timestamp < end)
+        
+        rows = db.session.execute(query).all()
+        values = np.array(rows, dtype=np.float64).reshape(len(rows), 3 + len(columns))
+        
+        tile_x, tile_y = tile_coords(values[:, 0], values[:, 1], z)
+        col = np.floor((tile_x - x) * size).astype(np.int64)
+        row = np.floor((tile_y - y) * size).astype(np.int64)
+        inside = (col >= 0) & (col < size) & (row >= 0) & (row < size)
+        cells = (row * size + col)[inside]
+        values = values[inside]
+        
+        counts = np.bincount(cells, minlength=size * size)
+        index = np.flatnonzero(counts)
+        owners = np.nan_to_num(values[:, -1], nan=-1).astype(np.int64)
+        user_cells = np.unique(np.stack([cells, owners]), axis=1)[0]
+        users = np.bincount(user_cells, minlength=size * size)
+        grid = {
+            'grid': size,
+            'index': index.tolist(),
+            'count': counts[index].tolist(),
+            'users': users[index].tolist()
+        }
+        for offset, metric in enumerate(TILE_METRICS, start=2):
+            metric_values = values[:, offset]
+            present = ~np.isnan(metric_values)
+            grid[f'{metric}_count'] = np.bincount(
+                cells[present], minlength=size * size
+            )[index].tolist()
+            grid[f'{metric}_sum'] = np.bincount(
+                cells[present], weights=metric_values[present], minlength=size * size
+            )[index].tolist()
+        return grid
+    
+    @classmethod
+    def get_grid(cls, z, x, y, user_id=None, start=None, end=None):
+        """Return the tile grid from cache, building and caching it on a miss."""
+        tile = (z, x, y)
+        key = (tile, user_id, start, end)
+        max_age = current_app.config.get('TILE_MAX_AGE', 60)
+        with cls._lock:
+            if key in cls._cache:
+                grid, built = cls._cache[key]
+                if time.monotonic() - built < max_age:
+                    cls._cache.move_to_end(key)
+                    cls._metrics['hits'] += 1
+                    return grid
+                del cls._cache[key]
+                cls._discard(key)
+                cls._metrics['expired'] += 1
+            cls._metrics['misses'] += 1
+            cls._building[tile] = cls._building.get(tile, 0) + 1
+        
+        built = time.monotonic()
+        try:
+            grid = cls.build_grid(z, x, y, user_id=user_id, start=start, end=end)
+        finally:
+            with cls._lock:
+                cls._building[tile] -= 1
+                if not cls._building[tile]:
+                    del cls._building[tile]
+                    # Readings landed while building: the grid may be stale
+                    stale = tile in cls._dirty
+                    cls._dirty.discard(tile)
+                else:
+                    stale = tile in cls._dirty
+        
+        if not stale:
+            with cls._lock:
+                cls._cache[key] = (grid, built)
+                cls._by_tile.setdefault(tile, set()).add(key)
+                max_entries = current_app.config.get('TILE_CACHE_MAX_ENTRIES', 2048)
+                while len(cls._cache) > max_entries:
+                    evicted, _ = cls._cache.popitem(last=False)
+                    cls._discard(evicted)
+        return grid
+    
+    @classmethod
+    def _discard(cls, key):
+        """Remove key from the per-tile index (caller holds the lock)."""
+        keys = cls._by_tile.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del cls._by_tile[key[0]]
+    
+    @classmethod
+    def invalidate_readings(cls, rows):
+        """
+        Drop cached grids of every tile containing one of the readings.
+        
+        Args:
+            rows: Reading dicts with ``latitude`` / ``longitude`` keys
+        """
+        points = [
+            (row['latitude'], row['longitude']) for row in rows
+            if row.get('latitude') is not None and row.get('longitude') is not None
+        ]
+        if not points:
+            return
+        latitudes, longitudes = np.array(points, dtype=np.float64).T
+        
+        with cls._lock:
+            for z in {tile[0] for tile in cls._by_tile} | {tile[0] for tile in cls._building}:
+                tile_x, tile_y = tile_coords(latitudes, longitudes, z)
+                limit = (1 << z) - 1
+                tiles = set(zip(
+                    np.clip(tile_x.astype(np.int64), 0, limit).tolist(),
+                    np.clip(tile_y.astype(np.int64), 0, limit).tolist()
+                ))
+                for x, y in tiles:
+                    tile = (z, x, y)
+                    if tile in cls._building:
+                        cls._dirty.add(tile)
+                    for key in cls._by_tile.pop(tile, ()):
+                        cls._cache.pop(key, None)
+                        cls._metrics['invalidations'] += 1
+    
+    @staticmethod
+    def cell_means(grid, metric, min_users=1):
+        """
+        Per-cell mean of metric, dropping cells with readings of fewer than min_users users.
+        
+        Returns:
+            tuple: (index array, count array, mean array)
+        """
+        index = np.asarray(grid['index'], dtype=np.int64)
+        counts = np.asarray(grid['count'], dtype=np.int64)
+        users = np.asarray(grid['users'], dtype=np.int64)
+        metric_counts = np.asarray(grid[f'{metric}_count'], dtype=np.int64)
+        sums = np.asarray(grid[f'{metric}_sum'], dtype=np.float64)
+        keep = (users >= min_users) & (metric_counts > 0)
+        return index[keep], counts[keep], sums[keep] / metric_counts[keep]
+    
+    @classmethod
+    def render_png(cls, grid, metric, min_users=1, value_range=None, tile_size=256):
+        """
+        Render a tile grid as a transparent colour-mapped PNG.
+        
+        Returns:
+            bytes: PNG image
+        """
+        size = grid['grid']
+        low, high = value_range or TILE_METRICS[metric][1]
+        index, _, means = cls.cell_means(grid, metric, min_users)
+        
+        levels = np.zeros(size * size, dtype=np.uint8)
+        alpha = np.zeros(size * size, dtype=np.uint8)
+        scaled = np.clip((means - low) / ((high - low) or 1.0), 0.0, 1.0)
+        levels[index] = np.round(scaled * 255).astype(np.uint8)
+        alpha[index] = 200
+        
+        colours = cv2.applyColorMap(levels.reshape(size, size), cv2.COLORMAP_JET)
+        image = np.dstack([colours, alpha.reshape(size, size)])
+        image = cv2.resize(image, (tile_size, tile_size), interpolation=cv2.INTER_NEAREST)
+        ok, encoded = cv2.imencode('.png', image)
+        if not ok:
+            raise ValueError('PNG encoding failed')
+        return encoded.tobytes()
+    
+    @classmethod
+    def stats(cls):
+        """Return cache counters and size."""
+        with cls._lock:
+            return {
+                **cls._metrics,
+                'entries': len(cls._cache),
+                'max_entries': current_app.config.get('TILE_CACHE_MAX_ENTRIES', 2048)
+            }
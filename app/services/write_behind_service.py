@@ -0,0 +1,344 @@
+"""Write-behind buffer for rows whose ids the client does not need."""
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, date
+from flask import current_app
+from app import db
+from app.models.npk_reading import NpkReading
+from app.services.rollup_service import RollupService
+from app.services.tile_service import TileService
+
+
+class WriteBehindBuffer:
+    """
+    Batches INSERTs of model rows off the request path.
+    
+    Rows are converted to plain column dicts and put on a bounded in-process
+    queue; a background thread inserts them with one executemany per table
+    when ``WRITE_BEHIND_BATCH_SIZE`` rows are pending or
+    ``WRITE_BEHIND_FLUSH_INTERVAL`` seconds have passed. A batch that cannot
+    be written, and anything still queued at interpreter exit, is spilled to
+    NDJSON files in ``WRITE_BEHIND_SPILL_DIR`` and replayed on next start.
+    
+    ``add`` returns False when write-behind is disabled or the queue is
+    full, and the caller then writes synchronously.
+    """
+    
+    _queue = None
+    _thread = None
+    _stop = None
+    _app = None
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    _metrics_lock = threading.Lock()  # every _metrics update and read
+    _tables = {}
+    _metrics = {
+        'enqueued': 0,
+        'rejected_full': 0,
+        'flushed_rows': 0,
+        'flushes': 0,
+        'failed_flushes': 0,
+        'spilled_rows': 0,
+        'replayed_rows': 0,
+        'last_flush_ms': None,
+        'max_flush_ms': 0.0,
+        'total_flush_ms': 0.0
+    }
+    
+    # Seconds shutdown() waits for the flusher to write its current batch
+    SHUTDOWN_WRITE_TIMEOUT = 30
+    
+    @classmethod
+    def enabled(cls):
+        """Return True if write-behind mode is configured on."""
+        return current_app.config.get('WRITE_BEHIND_ENABLED', False)
+    
+    @classmethod
+    def _ensure_started(cls):
+        """Start the flusher thread for this process on first use."""
+        with cls._lock:
+            if cls._queue is not None:
+                return
+            
+            app = current_app._get_current_object()
+            cls._app = app
+            cls._queue = queue.Queue(maxsize=app.config.get('WRITE_BEHIND_MAX_PENDING', 10000))
+            cls._stop = threading.Event()
+            cls.replay_spill()
+            
+            cls._thread = threading.Thread(target=cls._flush_loop, name='write-behind', daemon=True)
+            cls._thread.start()
+            atexit.register(cls.shutdown)
+            app.logger.info("Write-behind flusher started")
+    
+    @staticmethod
+    def _row_values(instance):
+        """Return the INSERT values of an ORM instance, applying column defaults now."""
+        values = {}
+        for column in instance.__table__.columns:
+            if column.primary_key:
+                continue
+            value = getattr(instance, column.key)
+            if value is None and column.default is not None:
+                if column.default.is_callable:
+                    value = column.default.arg(None)
+                elif column.default.is_scalar:
+                    value = column.default.arg
+            if value is not None:
+                values[column.key] = value
+        return values
+    
+    @classmethod
+    def _count(cls, name, amount=1):
+        """Add amount to a counter in _metrics."""
+        with cls._metrics_lock:
+            cls._metrics[name] += amount
+    
+    @classmethod
+    def add(cls, instance):
+        """
+        Queue an ORM instance for a deferred INSERT.
+        
+        Args:
+            instance: New model instance (not added to the session)
+            
+        Returns:
+            bool: True if queued, False if the caller must write it itself
+        """
+        if not cls.enabled():
+            return False
+        
+        cls._ensure_started()
+        table = instance.__table__
+        cls._tables[table.name] = table
+        try:
+            cls._queue.put_nowait((table.name, cls._row_values(instance)))
+        except queue.Full:
+            cls._count('rejected_full')
+            return False
+        
+        cls._count('enqueued')
+        return True
+    
+    @classmethod
+    def _drain(cls, limit=None):
+        """Take up to ``limit`` queued rows without blocking."""
+        batch = []
+        while limit is None or len(batch) < limit:
+            try:
+                batch.append(cls._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    @classmethod
+    def _flush_loop(cls):
+        """
+        Background thread: collect rows and flush on size or time thresholds.
+        
+        Stops once ``_stop`` is set, after writing the batch it holds, so
+        shutdown() never loses rows taken off the queue.
+        """
+        app = cls._app
+        batch_size = app.config.get('WRITE_BEHIND_BATCH_SIZE', 500)
+        interval = app.config.get('WRITE_BEHIND_FLUSH_INTERVAL', 1.0)
+        
+        while not cls._stop.is_set():
+            try:
+                first = cls._queue.get(timeout=interval)
+            except queue.Empty:
+                continue
+            
+            batch = [first]
+            deadline = time.monotonic() + interval
+            while len(batch) < batch_size and not cls._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(cls._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                with app.app_context():
+                    cls._write(batch)
+            except Exception as e:
+                app.logger.error(f"Write-behind flusher error on {len(batch)} rows: {e}", exc_info=True)
+    
+    @classmethod
+    def _insert(cls, batch):
+        """Execute one INSERT executemany per table and column set."""
+        grouped = {}
+        for table_name, values in batch:
+            # Rows may leave different optional columns unset
+            key = (table_name, tuple(sorted(values)))
+            grouped.setdefault(key, []).append(values)
+        for (table_name, _), rows in grouped.items():
+            db.session.execute(cls._tables[table_name].insert(), rows)
+    
+    @classmethod
+    def _write(cls, batch):
+        """Insert a batch grouped by table; spill it to disk on failure."""
+        if not batch:
+            return
+        
+        with cls._flush_lock:
+            start = time.perf_counter()
+            try:
+                cls._insert(batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                cls._count('failed_flushes')
+                current_app.logger.error(f"Write-behind flush of {len(batch)} rows failed: {e}")
+                cls._spill(batch)
+                return
+            
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with cls._metrics_lock:
+                metrics = cls._metrics
+                metrics['flushes'] += 1
+                metrics['flushed_rows'] += len(batch)
+                metrics['last_flush_ms'] = round(elapsed_ms, 2)
+                metrics['max_flush_ms'] = max(metrics['max_flush_ms'], round(elapsed_ms, 2))
+                metrics['total_flush_ms'] += elapsed_ms
+        
+        cls._after_insert(batch)
+    
+    @staticmethod
+    def _after_insert(batch):
+        """
+        Refresh NPK rollups and map tiles touched by the inserted rows.
+        
+        Failures are logged, not raised: the rows are committed already and
+        must not be spilled (and replayed twice) because a derived view
+        could not be updated.
+        """
+        readings = [values for table_name, values in batch if table_name == NpkReading.__tablename__]
+        if not readings:
+            return
+        try:
+            RollupService.on_readings_inserted(readings)
+            TileService.invalidate_readings(readings)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Write-behind post-insert refresh of {len(readings)} readings failed: {e}")
+    
+    @classmethod
+    def flush(cls):
+        """Synchronously write everything currently queued."""
+        if cls._queue is None:
+            return 0
+        batch = cls._drain()
+        cls._write(batch)
+        return len(batch)
+    
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        raise TypeError(f"Cannot serialise {type(value).__name__}")
+    
+    @classmethod
+    def _spill_dir(cls):
+        app = cls._app or current_app
+        return app.config.get('WRITE_BEHIND_SPILL_DIR', 'spill/write_behind')
+    
+    @classmethod
+    def _spill(cls, batch):
+        """Append rows to a per-process NDJSON spill file and fsync it."""
+        if not batch:
+            return
+        spill_dir = cls._spill_dir()
+        os.makedirs(spill_dir, exist_ok=True)
+        path = os.path.join(spill_dir, f"spill-{os.getpid()}-{int(time.time() * 1000)}.ndjson")
+        with open(path, 'a', encoding='utf-8') as f:
+            for table_name, values in batch:
+                f.write(json.dumps({'table': table_name, 'values': values}, default=cls._encode) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        cls._count('spilled_rows', len(batch))
+    
+    @classmethod
+    def replay_spill(cls):
+        """Insert rows from spill files left by earlier processes, then delete them."""
+        tables = db.metadata.tables
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(cls._spill_dir(), 'spill-*.ndjson'))):
+            # Claim the file so other worker processes skip it
+            claimed = f"{path}.{os.getpid()}.replaying"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            
+            batch = []
+            try:
+                with open(claimed, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        record = json.loads(line)
+                        table = tables[record['table']]
+                        values = record['values']
+                        for column in table.columns:
+                            value = values.get(column.key)
+                            if isinstance(value, str) and isinstance(column.type, db.DateTime):
+                                values[column.key] = datetime.fromisoformat(value)
+                            elif isinstance(value, str) and isinstance(column.type, db.Date):
+                                values[column.key] = date.fromisoformat(value)
+                        cls._tables[table.name] = table
+                        batch.append((table.name, values))
+                cls._insert(batch)
+                db.session.commit()
+                os.remove(claimed)
+                replayed += len(batch)
+            except Exception as e:
+                db.session.rollback()
+                os.rename(claimed, path)
+                current_app.logger.error(f"Write-behind replay of {path} failed: {e}")
+            else:
+                cls._after_insert(batch)
+        cls._count('replayed_rows', replayed)
+        return replayed
+    
+    @classmethod
+    def shutdown(cls):
+        """
+        Flush pending rows at exit, spilling them if the database is unreachable.
+        
+        The flusher is stopped and joined first, so the batch it is
+        collecting is written (or spilled) by the thread itself before the
+        rest of the queue is drained here.
+        """
+        if cls._queue is None:
+            return
+        cls._stop.set()
+        if cls._thread is not None and cls._thread is not threading.current_thread():
+            interval = cls._app.config.get('WRITE_BEHIND_FLUSH_INTERVAL', 1.0)
+            cls._thread.join(timeout=interval + cls.SHUTDOWN_WRITE_TIMEOUT)
+            if cls._thread.is_alive():
+                cls._app.logger.warning("Write-behind flusher did not stop in time; draining the queue anyway")
+        batch = cls._drain()
+        if not batch:
+            return
+        try:
+            with cls._app.app_context():
+                cls._write(batch)
+        except Exception:
+            cls._spill(batch)
+    
+    @classmethod
+    def stats(cls):
+        """Return queue depth and flush metrics."""
+        with cls._metrics_lock:
+            metrics = dict(cls._metrics)
+        flushes = metrics.pop('total_flush_ms')
+        metrics['avg_flush_ms'] = round(flushes / metrics['flushes'], 2) if metrics['flushes'] else None
+        metrics['queue_depth'] = cls._queue.qsize() if cls._queue is not None else 0
+        metrics['enabled'] = cls.enabled()
+        return metrics
@@ -1,4 +1,10 @@
 """Utility modules for AgriSensa API."""
 from app.utils.data_loader import DataLoader
+from app.utils.image_decoder import ImageDecoder
+from app.utils.upload_buffer import UploadBuffer
+from app.utils.result_cache import ResultCache
+from app.utils.frame_stream import FrameReader
+from app.utils.pagination import paginate
+from app.utils.row_encoder import RowEncoder
 
-__all__ = ['DataLoader']
+__all__ = ['DataLoader', 'ImageDecoder', 'UploadBuffer', 'ResultCache', 'FrameReader', 'paginate', 'RowEncoder']
@@ -0,0 +1,52 @@
+"""Columnar (one array per field) encoding of list responses."""
+from flask import request
+
+RESPONSE_FORMATS = ('rows', 'columnar')
+
+
+def response_format():
+    """
+    Read ``?format=rows|columnar`` from the request (default rows).
+    
+    Raises:
+        ValueError: On an unknown format
+    """
+    value = request.args.get('format', 'rows')
+    if value not in RESPONSE_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(RESPONSE_FORMATS)}")
+    return value
+
+
+def encode_columns(fields, columns):
+    """
+    Build a columnar payload from per-field value sequences.
+    
+    String fields with many repeats (at most half as many distinct values
+    as rows, e.g. location or status) are dictionary-encoded: the column
+    holds integer codes into ``dictionaries[field]`` (null stays null).
+    
+    Args:
+        fields: Field names
+        columns: One sequence of values per field, all the same length
+        
+    Returns:
+        dict: 'length', 'columns' and 'dictionaries'
+    """
+    payload = {'length': 0, 'columns': {}, 'dictionaries': {}}
+    for name, values in zip(fields, columns):
+        values = list(values)
+        payload['length'] = len(values)
+        
+        if values and all(value is None or isinstance(value, str) for value in values):
+            distinct = dict.fromkeys(value for value in values if value is not None)
+            if distinct and len(distinct) * 2 <= len(values):
+                codes = {value: code for code, value in enumerate(distinct)}
+                payload['dictionaries'][name] = list(distinct)
+                values = [codes[value] if value is not None else None for value in values]
+        payload['columns'][name] = values
+    return payload
+
+
+def encode_records(fields, records):
+    """Build a columnar payload from a list of dicts."""
+    return encode_columns(fields, ([record.get(name) for record in records] for name in fields))
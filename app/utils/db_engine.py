@@ -0,0 +1,77 @@
+"""Engine options and connection setup per database dialect."""
+from flask import has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def engine_options(config, uri=None):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+    
+    PostgreSQL gets a sized pool with pre-ping and recycling from the
+    ``DB_*`` settings of the config class; its statement timeout is set
+    per request transaction by ``configure_engine``. SQLite keeps
+    SQLAlchemy's default pool (in-memory databases need a static pool);
+    its tuning is done per connection by ``configure_engine``.
+    
+    Args:
+        config: Flask config (mapping)
+        uri: Database URL (default SQLALCHEMY_DATABASE_URI)
+        
+    Returns:
+        dict: Keyword arguments for ``create_engine``
+    """
+    uri = uri or config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri:
+        return {}
+    backend = make_url(uri).get_backend_name()
+    if backend == 'sqlite':
+        return {}
+    
+    return {
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True
+    }
+
+
+def configure_engine(engine, config):
+    """
+    Apply per-connection settings to an engine.
+    
+    SQLite connections run ``SQLITE_PRAGMAS`` (WAL journal, synchronous,
+    mmap size, busy timeout, ...) as soon as they are opened, before the
+    pool hands them out.
+    
+    PostgreSQL transactions begun while handling a request run
+    ``SET LOCAL statement_timeout`` (``DB_STATEMENT_TIMEOUT_MS``).
+    Migrations, CLI commands (rollup rebuilds, backfills) and background
+    workers have no request context and run without the timeout.
+    """
+    if engine.dialect.name == 'postgresql':
+        timeout_ms = config.get('DB_STATEMENT_TIMEOUT_MS')
+        if not timeout_ms:
+            return
+        
+        @event.listens_for(engine, 'begin')
+        def set_statement_timeout(connection):
+            if has_request_context():
+                connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout_ms)}')
+        return
+    
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = dict(config.get('SQLITE_PRAGMAS') or {})
+    if not pragmas:
+        return
+    
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
@@ -0,0 +1,105 @@
+"""Incremental JPEG frame extraction from MJPEG and multipart streams."""
+
+
+class FrameReader:
+    """
+    Iterate over JPEG frames in a byte stream as they arrive.
+    
+    Frames are found by scanning for the JPEG SOI/EOI markers, so the same
+    reader handles raw MJPEG, ``multipart/x-mixed-replace`` camera feeds and
+    ``multipart/form-data`` uploads (part headers and boundaries between
+    frames are skipped). The marker segments before the scan data are
+    skipped by their length fields, so an EXIF thumbnail in APP1 (a JPEG
+    with its own SOI/EOI) does not end the frame. At most
+    ``max_frame_bytes`` plus one read chunk is buffered; a frame that
+    grows past the limit is dropped.
+    """
+    
+    SOI = b'\xff\xd8\xff'
+    EOI = b'\xff\xd9'
+    
+    def __init__(self, stream, chunk_size=64 * 1024, max_frame_bytes=8 * 1024 * 1024):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.max_frame_bytes = max_frame_bytes
+        self.bytes_read = 0
+        self.oversized = 0
+    
+    @staticmethod
+    def _skip_headers(buffer, position):
+        """
+        Skip marker segments (APPn, DQT, DHT, SOF, ...) up to the scan data.
+        
+        Args:
+            buffer: Frame bytes starting at SOI
+            position: Offset of the next marker
+            
+        Returns:
+            tuple: (offset, in_headers) - the start of the scan data, or of
+            bytes that are not a marker segment; in_headers is True while
+            more bytes are needed to get there
+        """
+        length = len(buffer)
+        while True:
+            if position + 1 >= length:
+                return position, True
+            if buffer[position] != 0xFF:
+                return position, False  # Not a marker: search EOI from here
+            marker = buffer[position + 1]
+            if marker == 0xFF:  # Fill byte
+                position += 1
+                continue
+            if marker == 0xD9:  # EOI without a scan
+                return position, False
+            if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # No length field
+                position += 2
+                continue
+            if position + 3 >= length:
+                return position, True
+            position += 2 + ((buffer[position + 2] << 8) | buffer[position + 3])
+            if marker == 0xDA:  # SOS: entropy-coded data follows
+                return position, False
+    
+    def __iter__(self):
+        buffer = bytearray()
+        in_frame = False
+        in_headers = False
+        search_from = 0
+        
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                return
+            self.bytes_read += len(chunk)
+            buffer += chunk
+            
+            while True:
+                if not in_frame:
+                    start = buffer.find(self.SOI)
+                    if start < 0:
+                        # Keep a possible partial marker at the tail
+                        del buffer[:max(0, len(buffer) - len(self.SOI) + 1)]
+                        break
+                    del buffer[:start]
+                    in_frame = True
+                    in_headers = True
+                    search_from = 2  # First marker after SOI (FF D8)
+                
+                if in_headers:
+                    search_from, in_headers = self._skip_headers(buffer, search_from)
+                end = -1 if in_headers else buffer.find(self.EOI, search_from)
+                if end < 0:
+                    if len(buffer) > self.max_frame_bytes:
+                        # Give up on this frame and resync on the next SOI
+                        self.oversized += 1
+                        del buffer[:1]
+                        in_frame = False
+                        continue
+                    if not in_headers:
+                        search_from = max(search_from, len(buffer) - 1)
+                    break
+                
+                end += len(self.EOI)
+                yield bytes(buffer[:end])
+                del buffer[:end]
+                in_frame = False
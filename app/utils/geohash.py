@@ -0,0 +1,199 @@
+"""Geohash encoding and cell coverage for spatial index lookups."""
+import math
+import numpy as np
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DECODE = {char: index for index, char in enumerate(BASE32)}
+
+# Precision stored on rows (~3.7cm x 1.9cm cells); queries use prefixes
+PRECISION = 12
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def _interleave(lat_index, lon_index, precision):
+    """Interleave cell index bits (longitude first) into the geohash integer."""
+    lat_bits = (5 * precision) // 2
+    lon_bits = 5 * precision - lat_bits
+    code = lon_index & 0  # int or uint64 array zero
+    for step in range(lon_bits):
+        code = (code << 1) | ((lon_index >> (lon_bits - 1 - step)) & 1)
+        if step < lat_bits:
+            code = (code << 1) | ((lat_index >> (lat_bits - 1 - step)) & 1)
+    return code
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    """
+    Encode a coordinate as a geohash string.
+    
+    Returns:
+        str or None if either coordinate is missing
+    """
+    if latitude is None or longitude is None:
+        return None
+    lat_cells, lon_cells = _grid(precision)
+    code = _interleave(
+        _cell_index(latitude, -90.0, 180.0 / lat_cells, lat_cells),
+        _cell_index(longitude, -180.0, 360.0 / lon_cells, lon_cells),
+        precision
+    )
+    return ''.join(BASE32[(code >> shift) & 31] for shift in range(5 * (precision - 1), -1, -5))
+
+
+def encode_many(latitudes, longitudes, precision=PRECISION):
+    """
+    Vectorized encode for arrays of coordinates.
+    
+    Returns:
+        list of geohash strings (None where a coordinate is NaN)
+    """
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    valid = np.isfinite(latitudes) & np.isfinite(longitudes)
+    lat_cells, lon_cells = _grid(precision)
+    
+    def index(values, low, span, count):
+        scaled = np.floor((np.where(valid, values, low) - low) / (span / count))
+        return np.clip(scaled, 0, count - 1).astype(np.uint64)
+    
+    code = _interleave(
+        index(latitudes, -90.0, 180.0, lat_cells),
+        index(longitudes, -180.0, 360.0, lon_cells),
+        precision
+    )
+    alphabet = np.frombuffer(BASE32.encode(), dtype='S1')
+    chars = np.stack([
+        alphabet[((code >> np.uint64(shift)) & np.uint64(31)).astype(np.intp)]
+        for shift in range(5 * (precision - 1), -1, -5)
+    ], axis=-1)
+    hashes = chars.view(f'S{precision}').ravel().astype(str).tolist()
+    return [value if ok else None for value, ok in zip(hashes, valid.tolist())]
+
+
+def cell_size(precision):
+    """Return the (latitude, longitude) size in degrees of a cell at precision."""
+    lat_cells, lon_cells = _grid(precision)
+    return 180.0 / lat_cells, 360.0 / lon_cells
+
+
+def _grid(precision):
+    """Number of (latitude, longitude) cells at precision."""
+    total_bits = 5 * precision
+    return 1 << (total_bits // 2), 1 << ((total_bits + 1) // 2)
+
+
+def _cell_index(value, low, size, count):
+    """Index of the grid cell containing value, clamped to the grid."""
+    return max(0, min(int(math.floor((value - low) / size)), count - 1))
+
+
+def _prefix_after(prefix):
+    """
+    Return the smallest same-length geohash greater than every string
+    starting with prefix (None if prefix is all 'z').
+    """
+    chars = list(prefix)
+    for index in range(len(chars) - 1, -1, -1):
+        position = _DECODE[chars[index]]
+        if position < len(BASE32) - 1:
+            chars[index] = BASE32[position + 1]
+            return ''.join(chars[:index + 1])
+        chars.pop()
+    return None
+
+
+def _is_first_after(prefix, bound):
+    """True if prefix is the first cell at or after the range bound."""
+    if bound is None or not prefix.startswith(bound):
+        return False
+    return prefix[len(bound):].strip('0') == ''
+
+
+def cover_bbox(min_lat, min_lon, max_lat, max_lon, max_cells=32):
+    """
+    Geohash prefixes covering a bounding box (min_lon <= max_lon).
+    
+    Uses the longest precision whose covering needs at most max_cells cells.
+    
+    Returns:
+        list of geohash prefixes, sorted
+    """
+    for precision in range(PRECISION, 0, -1):
+        lat_cells, lon_cells = _grid(precision)
+        lat_size, lon_size = 180.0 / lat_cells, 360.0 / lon_cells
+        first_row = _cell_index(min_lat, -90.0, lat_size, lat_cells)
+        last_row = _cell_index(max_lat, -90.0, lat_size, lat_cells)
+        first_col = _cell_index(min_lon, -180.0, lon_size, lon_cells)
+        last_col = _cell_index(max_lon, -180.0, lon_size, lon_cells)
+        if (last_row - first_row + 1) * (last_col - first_col + 1) <= max_cells:
+            break
+    
+    cells = set()
+    for row in range(first_row, last_row + 1):
+        latitude = (row + 0.5) * lat_size - 90.0
+        for col in range(first_col, last_col + 1):
+            cells.add(encode(latitude, (col + 0.5) * lon_size - 180.0, precision))
+    return sorted(cells)
+
+
+def prefix_ranges(prefixes):
+    """
+    Merge sorted geohash prefixes into half-open string ranges.
+    
+    Consecutive cells become one range, so a row of cells is a single index
+    range scan. The upper bound is None when the range runs to the end.
+    
+    Returns:
+        list of (low, high) tuples
+    """
+    ranges = []
+    for prefix in prefixes:
+        high = _prefix_after(prefix)
+        if ranges and _is_first_after(prefix, ranges[-1][1]):
+            ranges[-1] = (ranges[-1][0], high)
+        else:
+            ranges.append((prefix, high))
+    return ranges
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres (works on scalars and numpy arrays)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def radius_bbox(latitude, longitude, radius_m):
+    """
+    Bounding boxes enclosing a circle, split at the antimeridian.
+    
+    Returns:
+        list of (min_lat, min_lon, max_lat, max_lon)
+    """
+    angle = radius_m / EARTH_RADIUS_M
+    lat_delta = math.degrees(angle)
+    min_lat, max_lat = latitude - lat_delta, latitude + lat_delta
+    if min_lat <= -90 or max_lat >= 90:
+        # Circle contains a pole: every longitude is in range
+        return [(max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0)]
+    
+    ratio = math.sin(angle) / math.cos(math.radians(latitude))
+    if ratio >= 1:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    lon_delta = math.degrees(math.asin(ratio))
+    return split_bbox(min_lat, longitude - lon_delta, max_lat, longitude + lon_delta)
+
+
+def split_bbox(min_lat, min_lon, max_lat, max_lon):
+    """
+    Normalise longitudes to [-180, 180] and split a box that crosses the
+    antimeridian (min_lon > max_lon after wrapping) into two.
+    """
+    def wrap(longitude):
+        return ((longitude + 180.0) % 360.0) - 180.0 if not -180.0 <= longitude <= 180.0 else longitude
+    
+    min_lon, max_lon = wrap(min_lon), wrap(max_lon)
+    if min_lon <= max_lon:
+        return [(min_lat, min_lon, max_lat, max_lon)]
+    return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
@@ -0,0 +1,130 @@
+"""Image decoding helpers with a reduced-resolution fast path."""
+import struct
+import cv2
+import numpy as np
+
+
+class ImageDecoder:
+    """Utility class for decoding uploaded leaf images."""
+    
+    # OpenCV reduced-resolution decode flags keyed by scale factor. For JPEG
+    # the reduction happens inside libjpeg (DCT scaling), so the full-size
+    # frame is never materialised; other formats are decoded then shrunk.
+    REDUCED_FLAGS = {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8
+    }
+    
+    _JPEG_SOF_MARKERS = {
+        0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+        0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF
+    }
+    
+    @staticmethod
+    def probe_size(image_data):
+        """
+        Read image dimensions from the file header without decoding pixels.
+        
+        Supports PNG, JPEG and WebP headers.
+        
+        Args:
+            image_data: Binary image data (bytes, bytearray or memoryview)
+            
+        Returns:
+            tuple: (width, height) or None if the header is not recognised
+        """
+        data = memoryview(image_data)
+        try:
+            # PNG: signature + IHDR chunk with big-endian width/height
+            if data[:8] == b'\x89PNG\r\n\x1a\n' and data[12:16] == b'IHDR':
+                width, height = struct.unpack('>II', data[16:24])
+                return width, height
+            
+            # WebP: RIFF container with VP8 / VP8L / VP8X chunk
+            if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+                chunk = bytes(data[12:16])
+                if chunk == b'VP8 ':
+                    width, height = struct.unpack('<HH', data[26:30])
+                    return width & 0x3FFF, height & 0x3FFF
+                if chunk == b'VP8L':
+                    b0, b1, b2, b3 = data[21:25]
+                    width = 1 + (((b1 & 0x3F) << 8) | b0)
+                    height = 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+                    return width, height
+                if chunk == b'VP8X':
+                    width = 1 + int.from_bytes(data[24:27], 'little')
+                    height = 1 + int.from_bytes(data[27:30], 'little')
+                    return width, height
+                return None
+            
+            # JPEG: walk the marker segments until a Start Of Frame
+            if data[:2] == b'\xff\xd8':
+                offset = 2
+                length = len(data)
+                while offset + 4 <= length:
+                    if data[offset] != 0xFF:
+                        return None
+                    marker = data[offset + 1]
+                    if marker == 0xFF:
+                        offset += 1
+                        continue
+                    if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                        offset += 2
+                        continue
+                    segment_length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+                    if marker in ImageDecoder._JPEG_SOF_MARKERS:
+                        height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+                        return width, height
+                    offset += 2 + segment_length
+        except (struct.error, ValueError, IndexError):
+            return None
+        
+        return None
+    
+    @staticmethod
+    def choose_scale(size, target_side=640):
+        """
+        Pick the largest reduced-decode factor that keeps the long side
+        at or above ``target_side`` pixels.
+        
+        Args:
+            size: (width, height) tuple from ``probe_size`` or None
+            target_side: Minimum long side after reduction
+            
+        Returns:
+            int: Scale factor (1, 2, 4 or 8)
+        """
+        if not size:
+            return 1
+        
+        long_side = max(size)
+        for factor in (8, 4, 2):
+            if long_side // factor >= target_side:
+                return factor
+        return 1
+    
+    @staticmethod
+    def decode(image_data, scale='auto', target_side=640):
+        """
+        Decode image data to a BGR array, optionally at reduced resolution.
+        
+        Args:
+            image_data: Binary image data (bytes, bytearray or memoryview)
+            scale: 'auto' to pick a factor from the header, or 1/2/4/8
+            target_side: Minimum long side used by 'auto'
+            
+        Returns:
+            tuple: (image, scale) where image is None if decoding failed
+        """
+        if scale == 'auto':
+            scale = ImageDecoder.choose_scale(ImageDecoder.probe_size(image_data), target_side)
+        else:
+            scale = int(scale)
+            if scale not in ImageDecoder.REDUCED_FLAGS:
+                raise ValueError(f"Unsupported decode scale: {scale}")
+        
+        nparr = np.frombuffer(image_data, np.uint8)
+        image = cv2.imdecode(nparr, ImageDecoder.REDUCED_FLAGS[scale])
+        return image, scale
@@ -0,0 +1,222 @@
+"""Versioned, per-crop NPK rule sets and the vectorized classifier built on them."""
+import numpy as np
+
+NPK_LABELS = ('Rendah', 'Optimal', 'Berlebih')
+MISSING = len(NPK_LABELS)  # Band of an optional nutrient that was not measured
+OPTIONAL_FIELDS = ('ph_value',)
+
+# (name, reading field, optimal low, optimal high, recommendation per label)
+NUTRIENT_RULES = (
+    ('Nitrogen (N)', 'n_value', 100, 200, {
+        'Optimal': "Nitrogen level is optimal. Maintain current fertilization.",
+        'Rendah': "Nitrogen is low. Increase Urea or organic nitrogen sources.",
+        'Berlebih': "Nitrogen is excessive. Reduce nitrogen fertilizers to prevent lodging."
+    }),
+    ('Fosfor (P)', 'p_value', 20, 40, {
+        'Optimal': "Phosphorus level is optimal. Important for root and flower development.",
+        'Rendah': "Phosphorus is low. Apply SP-36 or rock phosphate.",
+        'Berlebih': "Phosphorus is excessive. May interfere with micronutrient uptake."
+    }),
+    ('Kalium (K)', 'k_value', 150, 250, {
+        'Optimal': "Potassium level is optimal. Important for fruit quality.",
+        'Rendah': "Potassium is low. Apply KCL or organic potassium sources.",
+        'Berlebih': "Potassium is excessive. May cause salt stress."
+    })
+)
+PH_RECOMMENDATIONS = {
+    'Optimal': "Soil pH is optimal for nutrient availability.",
+    'Rendah': "Soil is acidic and phosphorus is poorly available. Apply dolomite or calcite to raise pH.",
+    'Berlebih': "Soil is alkaline and micronutrients (Fe, Mn, Zn) are poorly available. Apply sulfur or organic matter."
+}
+
+
+class NpkRuleSet:
+    """
+    One version of the thresholds and recommendation texts for a crop.
+    
+    Each nutrient's optimal range [low, high] is compiled to the bin edges
+    ``[low, nextafter(high)]``, so band 0 is below the range, 1 inside it
+    and 2 above it. Bands are looked up for any number of readings at
+    once as ``np.digitize`` would, by counting the edges each value
+    reaches (branch-free, much faster than a binary search for two
+    edges). The bands of all nutrients pack into one integer
+    code (mixed radix, first nutrient lowest; optional nutrients have an
+    extra MISSING band), and the labels and texts of every code are
+    built up front.
+    """
+    
+    def __init__(self, version, crop, rules):
+        self.version = version
+        self.crop = crop
+        self.rules = rules
+        self.fields = tuple(rule[1] for rule in rules)
+        self.edges = [np.array([low, np.nextafter(high, np.inf)], dtype=np.float64) for _, _, low, high, _ in rules]
+        radices = [len(NPK_LABELS) + (field in OPTIONAL_FIELDS) for field in self.fields]
+        self.place_values = np.cumprod([1] + radices[:-1], dtype=np.int32)
+        
+        # (nutrient index, name, label, recommendation) of the measured nutrients, per code
+        self.expansions = []
+        for code in range(int(np.prod(radices))):
+            entries = []
+            for index, ((name, _, _, _, recommendations), radix) in enumerate(zip(rules, radices)):
+                band = code % radix
+                code //= radix
+                if band != MISSING:
+                    entries.append((index, name, NPK_LABELS[band], recommendations[NPK_LABELS[band]]))
+            self.expansions.append(tuple(entries))
+    
+    def bands(self, readings):
+        """
+        Band index per nutrient for arrays of readings.
+        
+        Args:
+            readings: Mapping of reading field (n_value, p_value, k_value,
+                ph_value) to equal-length array-likes; for optional fields
+                NaN or None (or an absent field) means not measured
+                
+        Returns:
+            numpy.ndarray: int8 array (nutrients, readings); MISSING where
+            an optional value was not measured
+        
+        Raises:
+            ValueError: A required value (N, P or K) is missing or not finite
+        """
+        count = len(readings[self.fields[0]])
+        bands = np.zeros((len(self.fields), count), dtype=np.int8)
+        for band, field, edges in zip(bands, self.fields, self.edges):
+            values = readings.get(field)
+            values = np.full(count, np.nan) if values is None else np.asarray(values, dtype=np.float64)
+            # MISSING only fits the radix of optional nutrients; in a
+            # required slot it would carry into the next nutrient's band
+            if field not in OPTIONAL_FIELDS and not np.isfinite(values).all():
+                raise ValueError(f"{field} must be a finite number for every reading")
+            for edge in edges:
+                band += values >= edge
+            if field in OPTIONAL_FIELDS:
+                band[np.isnan(values)] = MISSING
+        return bands
+    
+    def pack(self, bands):
+        """Packed code per reading from bands() output."""
+        codes = np.zeros(bands.shape[1], dtype=np.int32)
+        for band, place in zip(bands, self.place_values):
+            codes += band.astype(np.int32) * place
+        return codes
+    
+    def codes(self, readings):
+        """Packed band code per reading (N, P and K must be measured, see bands())."""
+        return self.pack(self.bands(readings))
+    
+    def expand(self, code, values):
+        """Analysis dict of one reading from its code and its value per nutrient."""
+        return {
+            name: {'value': values[index], 'label': label, 'rekomendasi': recommendation}
+            for index, name, label, recommendation in self.expansions[code]
+        }
+    
+    def analyze(self, readings):
+        """
+        Analysis dicts (as analyze_npk_values returns them) for arrays of readings.
+        
+        Args:
+            readings: As for bands()
+            
+        Returns:
+            list: One dict per reading
+        """
+        codes = self.codes(readings).tolist()
+        columns = []
+        for field in self.fields:
+            values = readings.get(field)
+            columns.append([None] * len(codes) if values is None else np.asarray(values).tolist())
+        expand = self.expand
+        return [expand(code, values) for code, values in zip(codes, zip(*columns))]
+    
+    def compact(self, analysis):
+        """
+        [version, code, value per nutrient] for an analysis this rule set produces, else None.
+        
+        Besides the texts, each label must be the band this rule set gives
+        the value, so an analysis is never attributed to a version with
+        other thresholds (v2 and v3 share their texts but not their pH range).
+        """
+        if not isinstance(analysis, dict):
+            return None
+        code = 0
+        values = []
+        measured = 0
+        rules = zip(self.rules, self.place_values.tolist(), self.edges)
+        for (name, field, _, _, recommendations), place, edges in rules:
+            entry = analysis.get(name)
+            if entry is None and field in OPTIONAL_FIELDS:
+                code += MISSING * place
+                values.append(None)
+                continue
+            if not isinstance(entry, dict) or len(entry) != 3:
+                return None
+            label, value = entry.get('label'), entry.get('value')
+            if label not in recommendations or entry.get('rekomendasi') != recommendations[label]:
+                return None
+            if type(value) not in (int, float) or value != value:
+                return None
+            band = NPK_LABELS.index(label)
+            if sum(value >= edge for edge in edges.tolist()) != band:
+                return None
+            code += band * place
+            values.append(value)
+            measured += 1
+        if measured != len(analysis):
+            return None
+        return [self.version, code, *values]
+
+
+# Rule sets by version. Stored analyses refer to the version that produced
+# them, so a released version must never change; add a new one instead.
+NPK_RULE_SETS = {
+    rule_set.version: rule_set for rule_set in (
+        NpkRuleSet(1, None, NUTRIENT_RULES),
+        NpkRuleSet(2, None, NUTRIENT_RULES + (('pH', 'ph_value', 6.0, 7.2, PH_RECOMMENDATIONS),)),
+        NpkRuleSet(3, 'jagung', NUTRIENT_RULES + (('pH', 'ph_value', 5.5, 7.0, PH_RECOMMENDATIONS),))
+    )
+}
+
+# Version used for new analyses, per crop (None: crops without their own rules)
+CURRENT_VERSIONS = {None: 2, 'jagung': 3}
+
+
+def rule_set_for(crop=None):
+    """Current rule set for a crop (the default rules for unknown crops)."""
+    key = crop.strip().lower() if isinstance(crop, str) else None
+    return NPK_RULE_SETS[CURRENT_VERSIONS.get(key, CURRENT_VERSIONS[None])]
+
+
+def compact(analysis, version=None):
+    """
+    Compact form of an analyze_npk_values() result.
+    
+    Args:
+        analysis: Analysis dict
+        version: Rule set version that produced it; by default the current
+            versions are tried, then older ones
+            
+    Returns:
+        list: [version, band code, value per nutrient], or None if the dict
+        is not exactly what a rule set produces (other shapes, edited text,
+        non-numeric values, labels its thresholds do not give the values)
+    """
+    if version is not None:
+        return NPK_RULE_SETS[version].compact(analysis)
+    
+    current = list(dict.fromkeys(CURRENT_VERSIONS.values()))
+    older = sorted(set(NPK_RULE_SETS) - set(current), reverse=True)
+    for candidate in current + older:
+        stored = NPK_RULE_SETS[candidate].compact(analysis)
+        if stored is not None:
+            return stored
+    return None
+
+
+def expand(stored):
+    """Rebuild the analyze_npk_values() dict from its compact form."""
+    version, code, *values = stored
+    return NPK_RULE_SETS[version].expand(code, values)
@@ -0,0 +1,125 @@
+"""Offset and keyset (cursor) pagination for history endpoints."""
+import base64
+import binascii
+import math
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import and_, func, or_, text
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+
+def encode_cursor(timestamp, row_id):
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    raw = f"{timestamp.isoformat() if timestamp else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Returns:
+        tuple: (timestamp, row_id)
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def estimate_count(query):
+    """
+    Estimate the number of rows a query returns without a full COUNT(*).
+    
+    PostgreSQL uses the planner's row estimate. Other databases count at
+    most ``COUNT_ESTIMATE_CAP`` rows.
+    
+    Returns:
+        tuple: (count, is_estimate)
+    """
+    query = query.order_by(None)
+    session = query.session  # db.session or a replica session
+    dialect = session.get_bind().dialect
+    
+    if dialect.name == 'postgresql':
+        statement = query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+        plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {statement}")).scalar()
+        return int(plan[0]['Plan']['Plan Rows']), True
+    
+    cap = current_app.config.get('COUNT_ESTIMATE_CAP', 10000)
+    count = session.query(func.count()).select_from(query.limit(cap + 1).subquery()).scalar()
+    return min(count, cap), count > cap
+
+
+def paginate(query, model, order_column=None):
+    """
+    Paginate a query newest-first using request arguments.
+    
+    ``?page=N`` uses OFFSET (and by default an exact total, as before);
+    ``?after=<cursor>`` continues from the ``next_cursor`` of a previous
+    page with an index range scan on (timestamp, id), and skips the count
+    unless ``?count=exact|estimate`` is given.
+    
+    Args:
+        query: Filtered, unordered query
+        model: Model class (must have an ``id`` column)
+        order_column: Timestamp column to sort on (default model.timestamp)
+        
+    Returns:
+        dict: 'items', 'per_page', 'has_more', 'next_cursor', 'page' and,
+        when counted, 'total', 'total_is_estimate' and 'pages'
+    
+    Raises:
+        ValueError: On an invalid cursor or count mode
+    """
+    order_column = order_column if order_column is not None else model.timestamp
+    config = current_app.config
+    args = request.args
+    
+    per_page = args.get('per_page', config.get('ITEMS_PER_PAGE', 20), type=int)
+    per_page = max(1, min(per_page, config.get('MAX_ITEMS_PER_PAGE', 100)))
+    after = args.get('after')
+    count_mode = args.get('count', 'none' if after else 'exact')
+    if count_mode not in COUNT_MODES:
+        raise ValueError(f"count must be one of {', '.join(COUNT_MODES)}")
+    
+    ordered = query.order_by(order_column.desc(), model.id.desc())
+    if after:
+        timestamp, row_id = decode_cursor(after)
+        page = None
+        page_query = ordered.filter(or_(
+            order_column < timestamp,
+            and_(order_column == timestamp, model.id < row_id)
+        ))
+    else:
+        page = max(args.get('page', 1, type=int), 1)
+        page_query = ordered.offset((page - 1) * per_page)
+    
+    # One extra row tells whether another page exists
+    rows = page_query.limit(per_page + 1).all()
+    items = rows[:per_page]
+    has_more = len(rows) > per_page
+    
+    result = {
+        'items': items,
+        'page': page,
+        'per_page': per_page,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(getattr(items[-1], order_column.key), items[-1].id) if has_more else None
+    }
+    
+    if count_mode == 'exact':
+        result['total'] = query.order_by(None).count()
+        result['total_is_estimate'] = False
+    elif count_mode == 'estimate':
+        result['total'], result['total_is_estimate'] = estimate_count(query)
+    if 'total' in result:
+        result['pages'] = math.ceil(result['total'] / per_page)
+    
+    return result
@@ -0,0 +1,192 @@
+"""Password hashing on a bounded per-process thread pool."""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Cost used when PASSWORD_HASH_COST is not set (werkzeug's scrypt default,
+# OWASP's PBKDF2-SHA256 iteration count)
+DEFAULT_COSTS = {'scrypt': 32768, 'pbkdf2': 600000}
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when no hashing slot frees up within the acquire timeout."""
+
+
+def hash_method(method='scrypt', cost=None):
+    """
+    Build the werkzeug method string for a hash method and cost.
+    
+    Args:
+        method: ``scrypt`` or ``pbkdf2[:<digest>]`` (digest defaults to sha256)
+        cost: scrypt N (a power of two) or PBKDF2 iterations; None for
+            DEFAULT_COSTS
+            
+    Returns:
+        str: e.g. ``scrypt:32768:8:1`` or ``pbkdf2:sha256:600000``, the
+        prefix werkzeug stores in front of the salt
+    
+    Raises:
+        ValueError: Unknown method or invalid cost
+    """
+    name, _, digest = method.partition(':')
+    cost = int(cost) if cost else DEFAULT_COSTS.get(name)
+    if name == 'scrypt':
+        if cost < 2 or cost & (cost - 1):
+            raise ValueError("PASSWORD_HASH_COST must be a power of two for scrypt")
+        return f"scrypt:{cost}:8:1"
+    if name == 'pbkdf2':
+        if cost < 1:
+            raise ValueError("PASSWORD_HASH_COST must be positive for pbkdf2")
+        return f"pbkdf2:{digest or 'sha256'}:{cost}"
+    raise ValueError(f"Unsupported PASSWORD_HASH_METHOD: {method}")
+
+
+class PasswordHasher:
+    """
+    Hash and verify passwords on a small dedicated thread pool.
+    
+    scrypt and PBKDF2 release the GIL but keep a core busy for tens to
+    hundreds of milliseconds each. Running them on ``PASSWORD_HASH_WORKERS``
+    threads caps how many cores a login spike can take from the rest of
+    the process. At most ``PASSWORD_HASH_MAX_PENDING`` further requests
+    wait for a worker; beyond that, callers wait up to
+    ``PASSWORD_HASH_ACQUIRE_TIMEOUT`` seconds for a slot and then get
+    PasswordHasherBusy.
+    
+    New hashes use the configured method and cost. ``needs_rehash`` tells
+    whether a stored hash was made with other parameters, so it can be
+    replaced while the plain password is at hand (on login).
+    """
+    
+    _instance = None
+    _instance_pid = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, method, workers=2, max_pending=32, acquire_timeout=2):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.acquire_timeout = acquire_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._metrics = {
+            'hashes': 0,
+            'verifications': 0,
+            'rehashes': 0,
+            'rejected_busy': 0,
+            'max_in_flight': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'total_run_ms': 0.0,
+            'max_run_ms': 0.0
+        }
+    
+    @classmethod
+    def from_config(cls, config):
+        """Build a hasher from Flask config values."""
+        return cls(
+            method=hash_method(config.get('PASSWORD_HASH_METHOD', 'scrypt'), config.get('PASSWORD_HASH_COST')),
+            workers=config.get('PASSWORD_HASH_WORKERS', 2),
+            max_pending=config.get('PASSWORD_HASH_MAX_PENDING', 32),
+            acquire_timeout=config.get('PASSWORD_HASH_ACQUIRE_TIMEOUT', 2)
+        )
+    
+    @classmethod
+    def get_hasher(cls):
+        """Return this process's hasher, creating it on first use (and after fork)."""
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance_pid != os.getpid():
+                try:
+                    config = current_app.config
+                except RuntimeError:
+                    config = {}
+                cls._instance = cls.from_config(config)
+                cls._instance_pid = os.getpid()
+            return cls._instance
+    
+    @classmethod
+    def reset(cls):
+        """Drop the process hasher (e.g. after config changes)."""
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance._executor.shutdown(wait=False)
+            cls._instance = None
+    
+    def _run(self, metric, function, *args):
+        """Run function on the pool and return its result, counting it under metric."""
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self._metrics['rejected_busy'] += 1
+            raise PasswordHasherBusy("Too many password hashes in progress")
+        
+        try:
+            with self._lock:
+                self._in_flight += 1
+                self._metrics['max_in_flight'] = max(self._metrics['max_in_flight'], self._in_flight)
+            return self._executor.submit(self._timed, metric, time.perf_counter(), function, *args).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+    
+    def _timed(self, metric, submitted, function, *args):
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            finished = time.perf_counter()
+            wait_ms = (started - submitted) * 1000
+            run_ms = (finished - started) * 1000
+            with self._lock:
+                metrics = self._metrics
+                metrics[metric] += 1
+                metrics['total_wait_ms'] += wait_ms
+                metrics['max_wait_ms'] = max(metrics['max_wait_ms'], wait_ms)
+                metrics['total_run_ms'] += run_ms
+                metrics['max_run_ms'] = max(metrics['max_run_ms'], run_ms)
+    
+    def hash(self, password, rehash=False):
+        """
+        Hash a password with the configured method and cost.
+        
+        Args:
+            password: Plain password
+            rehash: Count it as replacing an outdated hash
+        
+        Raises:
+            PasswordHasherBusy: No slot within the acquire timeout
+        """
+        return self._run('rehashes' if rehash else 'hashes', generate_password_hash, password, self.method)
+    
+    def verify(self, password_hash, password):
+        """
+        Check a password against a stored hash (of any supported method).
+        
+        Raises:
+            PasswordHasherBusy: No slot within the acquire timeout
+        """
+        return self._run('verifications', check_password_hash, password_hash, password)
+    
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with another method or cost."""
+        return password_hash.split('$', 1)[0] != self.method
+    
+    def stats(self):
+        """Return pool settings, counters and wait/run times."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['in_flight'] = self._in_flight
+        operations = metrics['hashes'] + metrics['verifications'] + metrics['rehashes']
+        total_wait = metrics.pop('total_wait_ms')
+        total_run = metrics.pop('total_run_ms')
+        metrics['avg_wait_ms'] = round(total_wait / operations, 2) if operations else None
+        metrics['avg_run_ms'] = round(total_run / operations, 2) if operations else None
+        metrics['max_wait_ms'] = round(metrics['max_wait_ms'], 2)
+        metrics['max_run_ms'] = round(metrics['max_run_ms'], 2)
+        metrics.update(method=self.method, workers=self.workers, max_pending=self.max_pending)
+        return metrics
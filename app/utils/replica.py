@@ -0,0 +1,164 @@
+"""Routing of read-only queries to an optional read replica."""
+import threading
+import time
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from app import db
+
+REPLICA_BIND = 'replica'
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+# Seconds the standby is behind; 0 when it has replayed everything it received
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaRouter:
+    """
+    Send history, export and rollup reads to the ``replica`` bind.
+    
+    The replica is configured with ``REPLICA_DATABASE_URL`` and used only
+    by code that asks for ``read_session()``; everything else (writes,
+    jobs, endpoints that read back what they just wrote) stays on
+    ``db.session`` and the primary.
+    
+    Reads fall back to the primary when:
+    
+    - the replica lags more than ``REPLICA_MAX_LAG_SECONDS``, or the lag
+      check fails. The check runs at most every
+      ``REPLICA_LAG_CHECK_SECONDS``. PostgreSQL standbys report their
+      replay delay. Other databases (e.g. two SQLite files) compare the
+      newest reading timestamp on both sides.
+    - the user made a successful POST/PUT/PATCH/DELETE within the lag
+      window, so they read their own writes. This is tracked per worker
+      process.
+    """
+    
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._lag = None
+        self._last_writes = {}
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        self.enabled = bool(app.config.get('REPLICA_DATABASE_URL'))
+        self.max_lag = float(app.config.get('REPLICA_MAX_LAG_SECONDS', 5))
+        self.check_interval = float(app.config.get('REPLICA_LAG_CHECK_SECONDS', 5))
+        app.extensions['replica_router'] = self
+        if self.enabled:
+            app.after_request(self._record_write)
+            app.teardown_appcontext(self._close_session)
+    
+    @property
+    def sticky_seconds(self):
+        """How long a user's reads stay on the primary after a write."""
+        return self.max_lag + self.check_interval
+    
+    def _record_write(self, response):
+        """Remember when the current user last changed data."""
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            try:
+                user_id = get_jwt_identity()
+            except RuntimeError:  # No JWT verified for this request
+                user_id = None
+            if user_id is not None:
+                now = time.monotonic()
+                self._last_writes[str(user_id)] = now
+                if len(self._last_writes) > 10000:
+                    self._last_writes = {
+                        key: moment for key, moment in self._last_writes.items()
+                        if now - moment < self.sticky_seconds
+                    }
+        return response
+    
+    def _close_session(self, exc):
+        session = g.pop('_replica_session', None)
+        if session is not None:
+            session.close()
+    
+    def _measure_lag(self):
+        """Seconds the replica is behind the primary."""
+        replica = db.engines[REPLICA_BIND]
+        if replica.dialect.name == 'postgresql':
+            with replica.connect() as connection:
+                return float(connection.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+        
+        from app.models.npk_reading import NpkReading
+        watermark = select(func.max(NpkReading.timestamp))
+        with db.engine.connect() as connection:
+            primary = connection.execute(watermark).scalar()
+        with replica.connect() as connection:
+            copy = connection.execute(watermark).scalar()
+        if primary is None:
+            return 0.0
+        if copy is None:
+            return float('inf')
+        return max((primary - copy).total_seconds(), 0.0)
+    
+    def lag(self):
+        """
+        Replica lag in seconds, re-measured at most every check interval.
+        
+        Returns:
+            float or None: None if the last check failed
+        """
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._lag
+        # One thread measures; the others keep using the previous value
+        if not self._lock.acquire(blocking=False):
+            return self._lag
+        try:
+            try:
+                self._lag = self._measure_lag()
+            except Exception as e:
+                current_app.logger.warning(f"Replica lag check failed, reading from primary: {e}")
+                self._lag = None
+            self._checked_at = time.monotonic()
+            return self._lag
+        finally:
+            self._lock.release()
+    
+    def use_replica(self, user_id=None):
+        """Whether reads for user_id may go to the replica now."""
+        if not self.enabled:
+            return False
+        if user_id is not None:
+            last_write = self._last_writes.get(str(user_id))
+            if last_write is not None and time.monotonic() - last_write < self.sticky_seconds:
+                return False
+        lag = self.lag()
+        return lag is not None and lag <= self.max_lag
+    
+    def session(self, user_id=None):
+        """Session for read-only queries: the replica's when usable, else db.session."""
+        if not self.use_replica(user_id):
+            return db.session
+        session = g.get('_replica_session')
+        if session is None:
+            session = g._replica_session = Session(bind=db.engines[REPLICA_BIND])
+        return session
+
+
+def read_session(user_id=None):
+    """
+    Session to run a read-only query on.
+    
+    Args:
+        user_id: User the data is read for; keeps their reads on the
+            primary right after they wrote
+            
+    Returns:
+        Session: A replica session, or db.session
+    """
+    router = current_app.extensions.get('replica_router')
+    if router is None:
+        return db.session
+    return router.session(user_id)
@@ -0,0 +1,145 @@
+"""JSON provider with a fast encoder and MessagePack/CBOR content negotiation."""
+import decimal
+import json
+from datetime import date, datetime, time, timezone
+import numpy as np
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: stdlib json is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: MessagePack responses disabled
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # Optional: CBOR responses disabled
+    cbor2 = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+CBOR_MIMETYPE = 'application/cbor'
+JSON_ENCODERS = ('auto', 'orjson', 'stdlib')
+
+
+def encode_default(value):
+    """
+    Convert values JSON cannot represent directly.
+    
+    numpy scalars and arrays become Python numbers and lists, dates and
+    datetimes ISO 8601 strings (as orjson writes them) and Decimals floats;
+    anything else is handled by Flask's default (UUIDs, dataclasses, ...).
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return DefaultJSONProvider.default(value)
+
+
+class NegotiatingJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider with a fast encoder that can also answer in MessagePack or CBOR.
+    
+    JSON is written by orjson when it is installed (``JSON_ENCODER`` set to
+    'auto' or 'orjson'), with numpy, datetime and Decimal values handled
+    natively or by ``encode_default``; otherwise by the stdlib with the
+    same ``default``, so both encoders produce the same data.
+    
+    ``jsonify`` and views returning a dict or list all build their response
+    through ``app.json.response``, so overriding it here covers every
+    blueprint and the handlers in ``register_error_handlers``. When the
+    request's Accept header prefers a binary type whose library is
+    installed, the same object is encoded with it (CBOR encodes dates and
+    datetimes with its own tags). JSON stays the default, including for
+    ``Accept: */*``.
+    """
+    
+    default = staticmethod(encode_default)
+    
+    def __init__(self, app):
+        super().__init__(app)
+        setting = app.config.get('JSON_ENCODER', 'auto')
+        if setting not in JSON_ENCODERS:
+            raise ValueError(f"JSON_ENCODER must be one of {', '.join(JSON_ENCODERS)}")
+        if setting == 'orjson' and orjson is None:
+            app.logger.warning("JSON_ENCODER=orjson but orjson is not installed; using stdlib json")
+        self.use_orjson = orjson is not None and setting != 'stdlib'
+    
+    def _orjson_options(self, indent=False):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps(self, obj, **kwargs):
+        """Serialize obj to a JSON string (orjson unless stdlib-only options are passed)."""
+        if self.use_orjson and set(kwargs) <= {'indent', 'separators'}:
+            option = self._orjson_options(indent=bool(kwargs.get('indent')))
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        """Deserialize JSON (request bodies included)."""
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+    
+    def _pretty(self):
+        return (self.compact is None and self._app.debug) or self.compact is False
+    
+    def offered_mimetypes(self):
+        """Response mimetypes available with the installed libraries, JSON first."""
+        offered = [JSON_MIMETYPE]
+        if msgpack is not None:
+            offered.extend(MSGPACK_MIMETYPES)
+        if cbor2 is not None:
+            offered.append(CBOR_MIMETYPE)
+        return offered
+    
+    def negotiate(self):
+        """Return the response mimetype preferred by the current request."""
+        if not has_request_context() or not request.accept_mimetypes:
+            return JSON_MIMETYPE
+        return request.accept_mimetypes.best_match(self.offered_mimetypes(), default=JSON_MIMETYPE)
+    
+    def encode(self, obj, mimetype):
+        """Serialize obj as mimetype (one returned by offered_mimetypes) to bytes."""
+        if mimetype in MSGPACK_MIMETYPES:
+            return msgpack.packb(obj, default=self.default, use_bin_type=True)
+        if mimetype == CBOR_MIMETYPE:
+            # CBOR has native date/time tags; naive datetimes are UTC in this API
+            return cbor2.dumps(
+                obj, timezone=timezone.utc,
+                default=lambda encoder, value: encoder.encode(self.default(value))
+            )
+        if self.use_orjson:
+            # Bytes straight from orjson, without a str round trip
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options(self._pretty())) + b'\n'
+        if self._pretty():
+            return f"{self.dumps(obj, indent=2)}\n".encode('utf-8')
+        return f"{self.dumps(obj, separators=(',', ':'))}\n".encode('utf-8')
+    
+    def response(self, *args, **kwargs):
+        """Build the response in the negotiated format."""
+        mimetype = self.negotiate()
+        obj = self._prepare_response_obj(args, kwargs)
+        response = self._app.response_class(
+            self.encode(obj, mimetype),
+            mimetype=self.mimetype if mimetype == JSON_MIMETYPE else mimetype
+        )
+        
+        if len(self.offered_mimetypes()) > 1:
+            response.vary.add('Accept')
+        return response
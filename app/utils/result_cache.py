@@ -0,0 +1,223 @@
+"""Content-addressed LRU cache for image analysis results."""
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from flask import current_app
+
+
+class ResultCache:
+    """
+    Bounded in-memory LRU cache with an optional on-disk tier.
+    
+    Keys are derived from a BLAKE2b hash of the image bytes plus a model
+    version string, so a resubmitted photo maps to the same entry while a
+    retrained model (or changed decode settings) never serves stale results.
+    Values must be JSON-serialisable; callers get and store copies, so
+    mutating a result never changes later hits.
+    
+    The disk tier is kept under ``disk_max_bytes``: once the files written
+    since the last check may exceed it, the directory is scanned and the
+    least recently used files (by mtime, refreshed on disk hits) are
+    removed down to 90% of the budget.
+    """
+    
+    _registry = {}
+    _registry_lock = threading.Lock()
+    
+    def __init__(self, name, max_entries=512, disk_dir=None, disk_max_bytes=256 * 1024 * 1024):
+        self.name = name
+        self.max_entries = max_entries
+        self.disk_dir = os.path.join(disk_dir, name) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # estimate since the last scan; None until the first one
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+    
+    @classmethod
+    def get_cache(cls, name):
+        """
+        Get (or create) the named cache configured from the app config.
+        
+        Args:
+            name: Cache name, e.g. 'leaf' or 'disease'
+            
+        Returns:
+            ResultCache or None if result caching is disabled
+        """
+        try:
+            config = current_app.config
+        except RuntimeError:
+            config = {}
+        
+        if not config.get('RESULT_CACHE_ENABLED', True):
+            return None
+        
+        with cls._registry_lock:
+            if name not in cls._registry:
+                cls._registry[name] = cls(
+                    name,
+                    max_entries=config.get('RESULT_CACHE_MAX_ENTRIES', 512),
+                    disk_dir=config.get('RESULT_CACHE_DIR'),
+                    disk_max_bytes=config.get('RESULT_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024)
+                )
+            return cls._registry[name]
+    
+    @classmethod
+    def all_stats(cls):
+        """Return stats for every cache created in this process."""
+        with cls._registry_lock:
+            return {name: cache.stats() for name, cache in cls._registry.items()}
+    
+    @staticmethod
+    def make_key(image_data, model_version):
+        """
+        Build a cache key from image bytes and model version.
+        
+        Args:
+            image_data: Binary image data (bytes, bytearray or memoryview)
+            model_version: String identifying the model and its settings
+            
+        Returns:
+            str: Hex digest key
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(str(model_version).encode())
+        digest.update(b'\0')
+        digest.update(image_data)
+        return digest.hexdigest()
+    
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+    
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self._entries[key])
+        
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    value = json.load(f)
+                os.utime(path)  # recently used: evicted last
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._store(key, value)
+                return copy.deepcopy(value)
+        
+        with self._lock:
+            self.misses += 1
+        return None
+    
+    def set(self, key, value):
+        """Store a copy of value under key in memory and, if enabled, on disk."""
+        with self._lock:
+            self._store(key, copy.deepcopy(value))
+        
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(value, f)
+                size = os.path.getsize(tmp_path)
+                os.replace(tmp_path, path)
+            except (OSError, TypeError, ValueError):
+                return  # Disk tier is best-effort
+            
+            with self._lock:
+                prune = self._disk_bytes is None or self._disk_bytes + size > self.disk_max_bytes
+                if not prune:
+                    self._disk_bytes += size
+            if prune:
+                self._prune_disk()
+    
+    def _prune_disk(self):
+        """Measure the disk tier and remove least recently used files over the budget."""
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for file_name in names:
+                if not file_name.endswith('.json'):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    status = os.stat(path)
+                except OSError:
+                    continue
+                files.append((status.st_mtime, status.st_size, path))
+        
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        if total > self.disk_max_bytes:
+            target = self.disk_max_bytes * 0.9
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+        
+        with self._lock:
+            self._disk_bytes = total
+            self.disk_evictions += removed
+    
+    def _store(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def delete(self, key):
+        """Remove key from memory and disk."""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk_dir:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+    
+    def clear(self):
+        """Drop all in-memory entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+    
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_evictions': self.disk_evictions,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                'disk_tier': bool(self.disk_dir)
+            }
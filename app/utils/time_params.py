@@ -0,0 +1,24 @@
+"""Parsing of ISO 8601 time window query parameters."""
+from datetime import datetime, timezone
+
+
+def parse_utc(value, default=None):
+    """
+    Parse an ISO 8601 query parameter into a naive UTC datetime.
+    
+    Args:
+        value: Parameter value (offsets are converted to UTC)
+        default: Returned when value is empty or missing
+    
+    Raises:
+        ValueError: If value is not ISO 8601
+    """
+    if not value:
+        return default
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f'Invalid datetime: {value}') from e
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
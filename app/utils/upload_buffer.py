@@ -0,0 +1,205 @@
+"""Reusable per-thread upload buffer for image endpoints."""
+import base64
+import binascii
+import io
+import threading
+from flask import Request
+
+# Characters that may separate base64 lines (b64decode skips them)
+BASE64_WHITESPACE = ('\n', '\r', ' ', '\t')
+
+
+class ReusableBufferStream(io.RawIOBase):
+    """Writable/readable stream backed by the thread's upload buffer."""
+    
+    def __init__(self, buffer):
+        super().__init__()
+        self._buffer = buffer
+        self._size = 0
+        self._pos = 0
+    
+    def readable(self):
+        return True
+    
+    def writable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def write(self, data):
+        n = len(data)
+        end = self._pos + n
+        if end > len(self._buffer):
+            self._buffer = UploadBuffer._grow(self._buffer, end)
+        self._buffer[self._pos:end] = data
+        self._pos = end
+        self._size = max(self._size, end)
+        return n
+    
+    def readinto(self, target):
+        view = memoryview(target).cast('B')
+        n = min(len(view), self._size - self._pos)
+        if n <= 0:
+            return 0
+        view[:n] = self._buffer[self._pos:self._pos + n]
+        self._pos += n
+        return n
+    
+    def read(self, size=-1):
+        end = self._size if size is None or size < 0 else min(self._size, self._pos + size)
+        data = bytes(self._buffer[self._pos:end])
+        self._pos = max(self._pos, end)
+        return data
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        self._pos = max(self._pos, 0)
+        return self._pos
+    
+    def tell(self):
+        return self._pos
+    
+    def getbuffer(self):
+        """Return a zero-copy view of the written bytes."""
+        return memoryview(self._buffer)[:self._size]
+    
+    def close(self):
+        if not self.closed:
+            UploadBuffer.release()
+        super().close()
+
+
+class UploadBuffer:
+    """
+    One reusable bytearray per worker thread for image uploads.
+    
+    The first uploaded file of a request is written straight into the
+    buffer by the multipart parser, and base64 payloads are decoded into
+    it in chunks, so the image bytes exist exactly once in memory and are
+    handed to OpenCV as a memoryview. Views are only valid until the end
+    of the request that produced them.
+    """
+    
+    BASE64_CHUNK_CHARS = 64 * 1024  # multiple of 4
+    DEFAULT_CAPACITY = 1024 * 1024
+    
+    _local = threading.local()
+    
+    @staticmethod
+    def _grow(buffer, min_size):
+        """Return a larger buffer holding the contents of ``buffer``."""
+        new_buffer = bytearray(max(min_size, len(buffer) * 2))
+        new_buffer[:len(buffer)] = buffer
+        UploadBuffer._local.buffer = new_buffer
+        return new_buffer
+    
+    @classmethod
+    def claim(cls, size_hint=None):
+        """
+        Claim the thread's buffer, sized for at least ``size_hint`` bytes.
+        
+        Returns:
+            bytearray: The buffer, or None if it is already in use
+        """
+        state = cls._local
+        if getattr(state, 'in_use', False):
+            return None
+        
+        capacity = size_hint or cls.DEFAULT_CAPACITY
+        buffer = getattr(state, 'buffer', None)
+        if buffer is None or len(buffer) < capacity:
+            # Allocate a fresh array instead of resizing, so views handed
+            # out by an earlier request never block the resize.
+            buffer = bytearray(capacity)
+            state.buffer = buffer
+        
+        state.in_use = True
+        return buffer
+    
+    @classmethod
+    def release(cls):
+        """Mark the thread's buffer as free for the next upload."""
+        cls._local.in_use = False
+    
+    @classmethod
+    def open_stream(cls, size_hint=None):
+        """Return a stream over the thread's buffer, or None if busy."""
+        buffer = cls.claim(size_hint)
+        if buffer is None:
+            return None
+        return ReusableBufferStream(buffer)
+    
+    @staticmethod
+    def file_view(file_storage):
+        """
+        Get the contents of an uploaded file without copying.
+        
+        Args:
+            file_storage: werkzeug FileStorage from ``request.files``
+            
+        Returns:
+            memoryview: File contents
+        """
+        stream = file_storage.stream
+        if isinstance(stream, ReusableBufferStream):
+            return stream.getbuffer()
+        return memoryview(file_storage.read())
+    
+    @classmethod
+    def decode_base64(cls, b64_string):
+        """
+        Decode a base64 string (optionally a data URL) into the buffer.
+        
+        Decoding is done in fixed-size chunks so no intermediate copy of
+        the whole payload is created. Unpadded or line-wrapped input (e.g.
+        MIME base64) goes to ``base64.b64decode`` instead, since fixed
+        slices of it would not end on 4-character boundaries.
+        
+        Args:
+            b64_string: Base64 string, with or without ``data:...;base64,``
+            
+        Returns:
+            memoryview: Decoded bytes
+        
+        Raises:
+            binascii.Error: If the payload is not valid base64
+        """
+        start = b64_string.find(',') + 1
+        length = len(b64_string) - start
+        
+        if length % 4 or any(char in b64_string for char in BASE64_WHITESPACE):
+            # Unpadded or whitespace-separated input: use the tolerant decoder
+            return memoryview(base64.b64decode(b64_string[start:]))
+        
+        buffer = cls.claim(length // 4 * 3)
+        if buffer is None:
+            return memoryview(base64.b64decode(b64_string[start:]))
+        
+        pos = 0
+        chunk_chars = cls.BASE64_CHUNK_CHARS
+        for offset in range(start, len(b64_string), chunk_chars):
+            decoded = binascii.a2b_base64(b64_string[offset:offset + chunk_chars])
+            end = pos + len(decoded)
+            buffer[pos:end] = decoded
+            pos = end
+        return memoryview(buffer)[:pos]
+
+
+class UploadRequest(Request):
+    """Request class that streams the first uploaded file into UploadBuffer."""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        stream = UploadBuffer.open_stream(content_length or total_content_length)
+        if stream is not None:
+            return stream
+        return super()._get_file_stream(
+            total_content_length, content_type, filename=filename, content_length=content_length
+        )
@@ -0,0 +1 @@
+"""Benchmark scripts for AgriSensa API."""
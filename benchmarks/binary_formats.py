@@ -0,0 +1,99 @@
+"""
+Benchmark of JSON against MessagePack and CBOR response encoding.
+
+Captures typical responses through the test client (ML, history and
+knowledge endpoints) and reports, per payload and format, the encoded
+size (raw and gzip) and the mean encode and decode time. Decode time on a
+server CPU is a lower bound for a low-end phone, but the ratios carry over.
+
+ML endpoints that need model files are skipped when the models are not
+available (set ML_MODELS_PATH to include them).
+
+Usage:
+    python -m benchmarks.binary_formats [--rows 100] [--repeat 200]
+"""
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+import cbor2
+import msgpack
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.npk_reading import NpkReading
+from app.models.recommendation import Recommendation
+from benchmarks.serialization import USER_ID, make_rows
+
+ENDPOINTS = [
+    ('ml recommend-crop', 'POST', '/api/ml/recommend-crop', {
+        'n_value': 90, 'p_value': 42, 'k_value': 43, 'temperature': 21,
+        'humidity': 82, 'ph': 6.5, 'rainfall': 203
+    }),
+    ('ml fertilizer-bags', 'POST', '/api/ml/calculate-fertilizer-bags', {
+        'nutrient_needed': 'N', 'nutrient_amount_kg': 120, 'fertilizer_type': 'urea'
+    }),
+    ('npk history', 'GET', '/api/analysis/npk/history?per_page=100', None),
+    ('recommendation history', 'GET', '/api/recommendation/history?per_page=100', None),
+    ('knowledge guide', 'GET', '/api/knowledge/guide/cabai', None),
+    ('knowledge diagnostic-tree', 'GET', '/api/knowledge/diagnostic-tree', None),
+    ('knowledge fertilizer-data', 'GET', '/api/knowledge/fertilizer-data', None)
+]
+
+
+def mean_seconds(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'binary_formats.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    app = create_app('development')
+    app.config['RATELIMIT_ENABLED'] = False
+    app.json.compact = True  # as in production; debug mode pretty-prints
+    client = app.test_client()
+
+    with app.app_context():
+        db.engine.echo = False
+        db.create_all()
+        for model in (NpkReading, Recommendation):
+            db.session.execute(model.__table__.insert(), make_rows(model, args.rows))
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(USER_ID))}'}
+
+    formats = {
+        'json': (lambda obj: app.json.dumps(obj).encode('utf-8'), json.loads),
+        'msgpack': (lambda obj: msgpack.packb(obj, use_bin_type=True), msgpack.unpackb),
+        'cbor': (cbor2.dumps, cbor2.loads)
+    }
+
+    print(f"{'payload':<26} {'format':<8} {'bytes':>8} {'gzip':>7} {'encode us':>10} {'decode us':>10}")
+    for name, method, url, body in ENDPOINTS:
+        response = client.open(url, method=method, json=body, headers=headers)
+        if response.status_code != 200:
+            print(f"{name:<26} skipped (HTTP {response.status_code})")
+            continue
+        payload = response.get_json()
+
+        for format_name, (encode, decode) in formats.items():
+            data = encode(payload)
+            if decode(data) != payload:
+                raise SystemExit(f"{name}: {format_name} round trip differs")
+            encode_time = mean_seconds(lambda: encode(payload), args.repeat)
+            decode_time = mean_seconds(lambda: decode(data), args.repeat)
+            print(f"{name:<26} {format_name:<8} {len(data):>8} {len(gzip.compress(data)):>7} "
+                  f"{encode_time * 1e6:>10.1f} {decode_time * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
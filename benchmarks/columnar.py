@@ -0,0 +1,79 @@
+"""
+Benchmark of ?format=columnar against the default row format.
+
+Fills a temporary database with synthetic readings and recommendations for
+one user, builds rollups, then requests each time-series endpoint in both
+formats through the test client and reports the response size (raw and
+gzip, as sent to mobile clients) and the mean request time.
+
+Usage:
+    python -m benchmarks.columnar [--rows 2000] [--repeat 50]
+"""
+import argparse
+import gzip
+import os
+import tempfile
+import time
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.npk_reading import NpkReading
+from app.models.recommendation import Recommendation
+from app.services.rollup_service import RollupService
+from benchmarks.serialization import USER_ID, make_rows
+
+ENDPOINTS = [
+    ('npk history', 'GET', '/api/analysis/npk/history?per_page=100', None),
+    ('recommendation history', 'GET', '/api/recommendation/history?per_page=100', None),
+    ('npk rollups', 'GET', '/api/analysis/npk/rollups?start=2026-01-01T00:00:00Z&end=2026-01-15T00:00:00Z', None),
+    ('market history', 'POST', '/api/market/historical', {'commodity': 'beras_medium', 'range': 365})
+]
+
+
+def request(client, method, url, body, headers):
+    response = client.open(url, method=method, json=body, headers=headers)
+    if response.status_code != 200:
+        raise SystemExit(f"{url}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+    return response.get_data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'columnar.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    app = create_app('development')
+    app.config['RATELIMIT_ENABLED'] = False
+    app.json.compact = True  # as in production; debug mode pretty-prints
+    client = app.test_client()
+
+    with app.app_context():
+        db.engine.echo = False
+        db.create_all()
+        for model in (NpkReading, Recommendation):
+            db.session.execute(model.__table__.insert(), make_rows(model, args.rows))
+        db.session.commit()
+        RollupService.rebuild()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(USER_ID))}'}
+
+    print(f"{'endpoint':<24} {'format':<9} {'bytes':>9} {'gzip':>8} {'ms':>7}")
+    for name, method, url, body in ENDPOINTS:
+        for output_format in ('rows', 'columnar'):
+            separator = '&' if '?' in url else '?'
+            target = url if output_format == 'rows' else f'{url}{separator}format=columnar'
+            payload = request(client, method, target, body, headers)
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                request(client, method, target, body, headers)
+            elapsed = (time.perf_counter() - start) / args.repeat
+
+            print(f"{name:<24} {output_format:<9} {len(payload):>9} "
+                  f"{len(gzip.compress(payload)):>8} {elapsed * 1000:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Reproducible synthetic leaf-image corpus for analysis benchmarks.
+
+Every image is generated from a fixed seed, so runs on different machines
+see identical bytes. The corpus spans resolutions, encodings and green
+coverage ratios (fraction of the frame covered by leaves).
+
+Usage:
+    python -m benchmarks.corpus --out corpus/   # write images + manifest.json
+"""
+import argparse
+import json
+import os
+import cv2
+import numpy as np
+
+RESOLUTIONS = [(4000, 3000), (1920, 1080), (640, 480)]
+FORMATS = ['jpg', 'png', 'webp']
+COVERAGES = [0.05, 0.25, 0.6]
+LEAF_HUES = [38, 52, 66]
+
+ENCODE_PARAMS = {
+    'jpg': [cv2.IMWRITE_JPEG_QUALITY, 90],
+    'png': [cv2.IMWRITE_PNG_COMPRESSION, 3],
+    'webp': [cv2.IMWRITE_WEBP_QUALITY, 90]
+}
+
+
+def make_leaf_photo(width, height, leaf_hue, seed=0, coverage=None, fmt='jpg'):
+    """
+    Create a synthetic photo of leaves on a soil background.
+
+    Args:
+        width, height: Image size in pixels
+        leaf_hue: Mean leaf hue (OpenCV units, 30-90 is green)
+        seed: Random seed
+        coverage: Target leaf fraction of the frame; None draws six leaves
+        fmt: 'jpg', 'png' or 'webp'
+
+    Returns:
+        bytes: Encoded image
+    """
+    rng = np.random.default_rng(seed)
+    hsv = np.empty((height, width, 3), dtype=np.uint8)
+    hsv[..., 0] = 15
+    hsv[..., 1] = 120
+    hsv[..., 2] = 90
+
+    leaves = 0
+    while True:
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        axes = (int(width * rng.uniform(0.08, 0.2)), int(height * rng.uniform(0.03, 0.08)))
+        angle = float(rng.uniform(0, 180))
+        hue = int(np.clip(leaf_hue + rng.integers(-4, 5), 30, 90))
+        cv2.ellipse(hsv, center, axes, angle, 0, 360, (hue, 180, 160), -1)
+        leaves += 1
+
+        if coverage is None:
+            if leaves >= 6:
+                break
+        elif np.count_nonzero(hsv[..., 1] == 180) >= coverage * width * height or leaves >= 500:
+            break
+
+    noise = rng.integers(-12, 13, size=(height, width), dtype=np.int16)
+    hsv[..., 2] = np.clip(hsv[..., 2].astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    bgr = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+    ok, encoded = cv2.imencode(f'.{fmt}', bgr, ENCODE_PARAMS[fmt])
+    if not ok:
+        raise RuntimeError(f"{fmt} encoding failed")
+    return encoded.tobytes()
+
+
+def iter_corpus(resolutions=None, formats=None, coverages=None, hues=None):
+    """
+    Yield corpus cases as dicts with 'name', 'width', 'height', 'format',
+    'coverage', 'hue' and 'data'.
+    """
+    seed = 0
+    for width, height in resolutions or RESOLUTIONS:
+        for coverage in coverages or COVERAGES:
+            for hue in hues or LEAF_HUES:
+                seed += 1
+                for fmt in formats or FORMATS:
+                    yield {
+                        'name': f"{width}x{height}_c{int(coverage * 100):02d}_h{hue}.{fmt}",
+                        'width': width,
+                        'height': height,
+                        'format': fmt,
+                        'coverage': coverage,
+                        'hue': hue,
+                        'data': make_leaf_photo(width, height, hue, seed=seed, coverage=coverage, fmt=fmt)
+                    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--out', required=True, help='Directory to write the corpus to')
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    manifest = []
+    for case in iter_corpus():
+        with open(os.path.join(args.out, case['name']), 'wb') as f:
+            f.write(case['data'])
+        manifest.append({key: value for key, value in case.items() if key != 'data'})
+
+    with open(os.path.join(args.out, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Wrote {len(manifest)} images to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Offline load test for /api/legacy/analyze-disease-advanced.
+
+Starts the Roboflow stub in-process, points the app at it and fires
+concurrent uploads of distinct images (so the result cache never hits).
+Reports throughput, latency percentiles and status codes.
+
+Usage:
+    python -m benchmarks.disease_load [--requests 200] [--concurrency 16]
+"""
+import argparse
+import io
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.roboflow_stub import serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=9001)
+    args = parser.parse_args()
+    
+    server = serve(args.port, args.latency_ms, args.fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    os.environ['ROBOFLOW_API_URL'] = f'http://127.0.0.1:{args.port}'
+    from app import create_app
+    app = create_app('testing')
+    app.config['ROBOFLOW_API_URL'] = os.environ['ROBOFLOW_API_URL']
+    app.config['ROBOFLOW_API_KEY'] = 'stub'  # Any key; the stub does not check it
+    
+    def one(i):
+        client = app.test_client()
+        image = b'\xff\xd8' + i.to_bytes(4, 'big') * 2048
+        start = time.perf_counter()
+        response = client.post('/api/legacy/analyze-disease-advanced',
+                               data={'file': (io.BytesIO(image), 'leaf.jpg')},
+                               content_type='multipart/form-data')
+        return response.status_code, time.perf_counter() - start
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    
+    latencies = sorted(t for _, t in results)
+    codes = {}
+    for code, _ in results:
+        codes[code] = codes.get(code, 0) + 1
+    
+    print(f"requests={args.requests} concurrency={args.concurrency} stub_latency={args.latency_ms}ms")
+    print(f"throughput: {args.requests / elapsed:.1f} req/s")
+    print(f"latency p50={statistics.median(latencies) * 1000:.1f}ms "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms")
+    print(f"status codes: {codes}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark of the JSON provider: orjson against the stdlib fallback.
+
+Captures typical large responses through the test client (knowledge,
+history and rollup endpoints) plus a numpy-heavy tile payload, then encodes
+each with the app's provider in both modes (JSON_ENCODER=orjson and
+JSON_ENCODER=stdlib, compact and key-sorted as in production) and reports
+the mean encode time and the speedup. The two outputs are checked to
+decode to the same data.
+
+Usage:
+    python -m benchmarks.json_provider [--rows 2000] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models.npk_reading import NpkReading
+from app.models.recommendation import Recommendation
+from app.services.rollup_service import RollupService
+from app.utils.response_encoding import JSON_MIMETYPE, NegotiatingJSONProvider, orjson
+from benchmarks.serialization import USER_ID, make_rows
+
+ENDPOINTS = [
+    ('knowledge guide', '/api/knowledge/guide/cabai'),
+    ('knowledge diagnostic-tree', '/api/knowledge/diagnostic-tree'),
+    ('npk history', '/api/analysis/npk/history?per_page=100'),
+    ('recommendation history', '/api/recommendation/history?per_page=100'),
+    ('npk rollups', '/api/analysis/npk/rollups?start=2026-01-01T00:00:00Z&end=2026-01-15T00:00:00Z')
+]
+
+
+def tile_payload(cells=1024, seed=0):
+    """A tile JSON body built from numpy arrays, as the tile route returns it."""
+    rng = np.random.default_rng(seed)
+    return {
+        'success': True,
+        'grid': 32,
+        'cells': {
+            'index': np.arange(cells, dtype=np.int64),
+            'count': rng.integers(1, 50, cells),
+            'mean': np.round(rng.uniform(0, 300, cells), 3)
+        }
+    }
+
+
+def mean_seconds(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    if orjson is None:
+        raise SystemExit('orjson is not installed; only the stdlib encoder is available')
+
+    path = os.path.join(tempfile.mkdtemp(), 'json_provider.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    app = create_app('development')
+    app.config['RATELIMIT_ENABLED'] = False
+    client = app.test_client()
+
+    with app.app_context():
+        db.engine.echo = False
+        db.create_all()
+        for model in (NpkReading, Recommendation):
+            db.session.execute(model.__table__.insert(), make_rows(model, args.rows))
+        db.session.commit()
+        RollupService.rebuild()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(USER_ID))}'}
+
+    payloads = [(name, client.get(url, headers=headers).get_json()) for name, url in ENDPOINTS]
+    payloads.append(('tile cells (numpy)', tile_payload()))
+
+    providers = {}
+    for setting in ('stdlib', 'orjson'):
+        app.config['JSON_ENCODER'] = setting
+        providers[setting] = NegotiatingJSONProvider(app)
+        providers[setting].compact = True  # as in production; debug mode pretty-prints
+
+    print(f"{'payload':<26} {'bytes':>8} {'stdlib us':>10} {'orjson us':>10} {'speedup':>8}")
+    for name, payload in payloads:
+        outputs = {setting: provider.encode(payload, JSON_MIMETYPE) for setting, provider in providers.items()}
+        if json.loads(outputs['stdlib']) != json.loads(outputs['orjson']):
+            raise SystemExit(f"{name}: encoders disagree")
+
+        stdlib = mean_seconds(lambda: providers['stdlib'].encode(payload, JSON_MIMETYPE), args.repeat)
+        fast = mean_seconds(lambda: providers['orjson'].encode(payload, JSON_MIMETYPE), args.repeat)
+        print(f"{name:<26} {len(outputs['orjson']):>8} {stdlib * 1e6:>10.1f} {fast * 1e6:>10.1f} {stdlib / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
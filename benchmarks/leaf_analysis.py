@@ -0,0 +1,151 @@
+"""
+Accuracy/latency harness for the leaf analysis pipeline.
+
+Runs AnalysisService over the synthetic corpus (benchmarks/corpus.py) with
+per-stage timings (decode, hsv, mask, mean, predict) and compares each
+optional fast path against the full-resolution SVC reference:
+
+    reference    full decode, SVC model
+    reduced      reduced-resolution decode (BWD_FAST_DECODE)
+    lookup       lookup-table model (BWD_LOOKUP_MODEL)
+    reduced+lut  both
+
+It also times per-image prediction against one batched call.
+
+Usage:
+    python -m benchmarks.leaf_analysis --models-path /path/to/models [--repeat 3] [--quick]
+"""
+import argparse
+import statistics
+import sys
+import time
+import numpy as np
+from app import create_app
+from app.config.config import Config
+from app.ml_models.model_loader import ModelLoader
+from app.services.analysis_service import AnalysisService
+from benchmarks.corpus import iter_corpus
+
+STAGES = ['decode', 'hsv', 'mask', 'mean', 'predict']
+PATHS = {
+    'reference': {'scale': 1, 'lookup': False},
+    'reduced': {'scale': 'auto', 'lookup': False},
+    'lookup': {'scale': 1, 'lookup': True},
+    'reduced+lut': {'scale': 'auto', 'lookup': True}
+}
+
+
+def run_path(app, case, path, repeat):
+    """Return (result, {stage: median seconds}) for one corpus case."""
+    app.config['BWD_LOOKUP_MODEL'] = PATHS[path]['lookup']
+    samples = []
+    result = None
+    for _ in range(repeat):
+        timings = {}
+        result = AnalysisService.analyze_leaf_image(
+            case['data'], scale=PATHS[path]['scale'], use_cache=False, timings=timings
+        )
+        samples.append(timings)
+    return result, {stage: statistics.median(t.get(stage, 0.0) for t in samples) for stage in STAGES}
+
+
+def time_batching(app, hues, repeat):
+    """Return microseconds per image for looped vs batched prediction."""
+    report = {}
+    for lookup in (False, True):
+        app.config['BWD_LOOKUP_MODEL'] = lookup
+        model = AnalysisService._bwd_model()
+        label = 'lookup' if lookup else 'svc'
+        inputs = np.asarray(hues, dtype=np.float64).reshape(-1, 1)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for row in inputs:
+                model.predict(row.reshape(1, 1))
+                model.predict_proba(row.reshape(1, 1))
+        report[f'{label} looped'] = (time.perf_counter() - start) / (repeat * len(inputs)) * 1e6
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model.predict(inputs)
+            model.predict_proba(inputs)
+        report[f'{label} batched'] = (time.perf_counter() - start) / (repeat * len(inputs)) * 1e6
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--models-path', help='Directory containing bwd_model.pkl')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--quick', action='store_true', help='Skip the 4000x3000 resolution')
+    parser.add_argument('--tolerance', type=float, default=Config.BWD_DECODE_HUE_TOLERANCE,
+                        help='Maximum allowed |avg hue| drift vs reference')
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    if args.models_path:
+        app.config['ML_MODELS_PATH'] = args.models_path
+
+    resolutions = [(1920, 1080), (640, 480)] if args.quick else None
+
+    with app.app_context():
+        if ModelLoader.get_model('bwd') is None:
+            print("bwd model not found; pass --models-path")
+            return 1
+
+        totals = {path: {stage: [] for stage in STAGES} for path in PATHS}
+        drift = {path: [] for path in PATHS}
+        mismatches = {path: 0 for path in PATHS}
+        reference_hues = []
+        cases = 0
+
+        print(f"{'image':>24} " + ' '.join(f"{path:>12}" for path in PATHS) + "   (total ms)")
+        for case in iter_corpus(resolutions=resolutions):
+            results = {}
+            row = []
+            for path in PATHS:
+                result, stage_times = run_path(app, case, path, args.repeat)
+                results[path] = result
+                for stage, seconds in stage_times.items():
+                    totals[path][stage].append(seconds)
+                row.append(f"{sum(stage_times.values()) * 1000:>12.2f}")
+            print(f"{case['name']:>24} " + ' '.join(row))
+
+            reference = results['reference']
+            if reference is None:
+                continue
+            cases += 1
+            reference_hues.append(reference['avg_hue'])
+            for path, result in results.items():
+                if result is None:
+                    mismatches[path] += 1
+                    continue
+                drift[path].append(abs(result['avg_hue'] - reference['avg_hue']))
+                if result['bwd_score'] != reference['bwd_score']:
+                    mismatches[path] += 1
+
+        print(f"\nMedian stage time (ms) over {cases} images")
+        print(f"{'path':>12} " + ' '.join(f"{stage:>8}" for stage in STAGES) + f" {'total':>8}"
+              f" {'max_drift':>10} {'score_diff':>10}")
+        failures = 0
+        for path in PATHS:
+            medians = [statistics.median(totals[path][stage]) * 1000 for stage in STAGES]
+            max_drift = max(drift[path]) if drift[path] else 0.0
+            if max_drift > args.tolerance:
+                failures += 1
+            print(f"{path:>12} " + ' '.join(f"{m:>8.3f}" for m in medians) + f" {sum(medians):>8.3f}"
+                  f" {max_drift:>10.3f} {mismatches[path]:>10}")
+
+        print("\nPrediction cost (us per image)")
+        for label, micros in time_batching(app, reference_hues, args.repeat).items():
+            print(f"{label:>16} {micros:>10.1f}")
+
+    if failures:
+        print(f"FAIL: {failures} path(s) exceeded hue tolerance {args.tolerance}")
+        return 1
+    print(f"OK: all fast paths within hue tolerance {args.tolerance}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
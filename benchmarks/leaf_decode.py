@@ -0,0 +1,79 @@
+"""
+Benchmark and validate the reduced-resolution leaf decode path.
+
+Generates a synthetic corpus of phone-sized leaf photos, then compares the
+full-resolution decode against the reduced decode chosen from the header
+probe. Reports average-hue drift, decode+HSV time and peak allocation.
+
+Usage:
+    python -m benchmarks.leaf_decode [--repeat 5] [--tolerance 1.0]
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from app.config.config import Config
+from app.services.analysis_service import AnalysisService
+from app.utils.image_decoder import ImageDecoder
+from benchmarks.corpus import make_leaf_photo
+
+RESOLUTIONS = [(4000, 3000), (3264, 2448), (1920, 1080), (800, 600)]
+LEAF_HUES = [38, 48, 58, 68]
+
+
+def measure(image_data, scale, repeat):
+    """Return (avg_hue, median_seconds, peak_bytes) for one decode scale."""
+    timings = []
+    avg_hue = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        image, _ = ImageDecoder.decode(image_data, scale=scale)
+        avg_hue = AnalysisService.compute_leaf_hue(image)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    image, _ = ImageDecoder.decode(image_data, scale=scale)
+    AnalysisService.compute_leaf_hue(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return avg_hue, statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=Config.BWD_DECODE_HUE_TOLERANCE,
+                        help='Maximum allowed |avg hue| drift (OpenCV hue units)')
+    parser.add_argument('--target-side', type=int, default=640)
+    args = parser.parse_args()
+
+    print(f"{'size':>11} {'hue':>4} {'scale':>5} {'full_hue':>9} {'fast_hue':>9} {'drift':>6} "
+          f"{'full_ms':>8} {'fast_ms':>8} {'full_MB':>8} {'fast_MB':>8}")
+
+    failures = 0
+    for seed, (width, height) in enumerate(RESOLUTIONS):
+        for leaf_hue in LEAF_HUES:
+            image_data = make_leaf_photo(width, height, leaf_hue, seed=seed)
+            scale = ImageDecoder.choose_scale(ImageDecoder.probe_size(image_data), args.target_side)
+
+            full_hue, full_time, full_peak = measure(image_data, 1, args.repeat)
+            fast_hue, fast_time, fast_peak = measure(image_data, scale, args.repeat)
+            drift = abs(full_hue - fast_hue)
+            if drift > args.tolerance:
+                failures += 1
+
+            print(f"{width:>5}x{height:<5} {leaf_hue:>4} {scale:>5} {full_hue:>9.3f} {fast_hue:>9.3f} "
+                  f"{drift:>6.3f} {full_time * 1000:>8.1f} {fast_time * 1000:>8.1f} "
+                  f"{full_peak / 1e6:>8.1f} {fast_peak / 1e6:>8.1f}")
+
+    if failures:
+        print(f"FAIL: {failures} image(s) exceeded hue tolerance {args.tolerance}")
+        return 1
+    print(f"OK: all images within hue tolerance {args.tolerance}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
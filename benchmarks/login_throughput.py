@@ -0,0 +1,128 @@
+"""
+Login throughput benchmark for the password hashing pool.
+
+Client threads log in through /api/auth/login as fast as they can while a
+probe thread requests /health every 20 ms (testing config, in-memory
+SQLite). Two pool sizes are compared:
+
+- unbounded: one hashing worker per client, as when every request thread
+  hashed inline
+- bounded: PASSWORD_HASH_WORKERS hashing workers (--workers)
+
+Reports logins/s, login and /health latency percentiles, and 503s from
+the pool's acquire timeout for each profile, at the chosen method and cost.
+
+Usage:
+    python -m benchmarks.login_throughput [--method scrypt] [--cost 32768]
+        [--clients 8] [--workers 2] [--seconds 5]
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+import numpy as np
+from werkzeug.security import generate_password_hash
+from app import create_app, db
+from app.models.user import User
+from app.utils.passwords import PasswordHasher, hash_method
+
+PASSWORD = 'benchmark-password'
+
+
+def percentiles(samples):
+    """(p50, p95) of samples in ms, or (nan, nan) without samples."""
+    if not samples:
+        return float('nan'), float('nan')
+    return tuple(np.percentile(samples, [50, 95]))
+
+
+def create_benchmark_app(method, cost, clients):
+    """Testing app with one user per client, hashed with the chosen parameters."""
+    app = create_app('testing')
+    app.config.update(PASSWORD_HASH_METHOD=method, PASSWORD_HASH_COST=cost)
+    with app.app_context():
+        db.create_all()
+        # Stored with the current parameters, so logins do not rehash
+        password_hash = generate_password_hash(PASSWORD, hash_method(method, cost))
+        db.session.add_all([
+            User(username=f'user{index}', email=f'user{index}@example.com', password_hash=password_hash)
+            for index in range(clients)
+        ])
+        db.session.commit()
+    return app
+
+
+def run_profile(app, clients, workers, seconds):
+    """Return logins, 503s, login latencies and /health latencies (ms)."""
+    app.config.update(
+        PASSWORD_HASH_WORKERS=workers,
+        PASSWORD_HASH_MAX_PENDING=clients,
+        PASSWORD_HASH_ACQUIRE_TIMEOUT=2
+    )
+    PasswordHasher.reset()
+
+    results = {'logins': 0, 'busy': 0, 'login_ms': [], 'health_ms': []}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def client(index):
+        http = app.test_client()
+        body = {'username': f'user{index}', 'password': PASSWORD}
+        while not stop.is_set():
+            start = time.perf_counter()
+            status = http.post('/api/auth/login', json=body).status_code
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if status == 200:
+                    results['logins'] += 1
+                    results['login_ms'].append(elapsed)
+                elif status == 503:
+                    results['busy'] += 1
+
+    def probe():
+        http = app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            http.get('/health')
+            results['health_ms'].append((time.perf_counter() - start) * 1000)
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    threads.append(threading.Thread(target=probe))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    PasswordHasher.reset()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--method', default='scrypt')
+    parser.add_argument('--cost', type=int, default=None)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    app = create_benchmark_app(args.method, args.cost, args.clients)
+    profiles = {'unbounded': args.clients, 'bounded': args.workers}
+    print(f"{hash_method(args.method, args.cost)}, {args.clients} clients, "
+          f"{os.cpu_count()} CPUs, {args.seconds:g}s per profile")
+    print(f"{'profile':<10} {'workers':>7} {'logins/s':>9} {'login p50':>10} {'login p95':>10} "
+          f"{'health p50':>11} {'health p95':>11} {'503s':>5}")
+    for name, workers in profiles.items():
+        results = run_profile(app, args.clients, workers, args.seconds)
+        login_p50, login_p95 = percentiles(results['login_ms'])
+        health_p50, health_p95 = percentiles(results['health_ms'])
+        print(f"{name:<10} {workers:>7} {results['logins'] / args.seconds:>9.1f} {login_p50:>10.1f} "
+              f"{login_p95:>10.1f} {health_p50:>11.1f} {health_p95:>11.1f} {results['busy']:>5}")
+
+
+if __name__ == '__main__':
+    main()
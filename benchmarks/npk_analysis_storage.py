@@ -0,0 +1,92 @@
+"""
+Storage report for compact NPK analysis results.
+
+Classifies random N/P/K readings covering every band and stores the
+analysis both ways, in two temporary SQLite files holding the same readings:
+
+- full: the analyze_npk_values() dict as JSON (before compaction)
+- compact: ``[rules version, band code, n, p, k, ph]`` via CompactNpkAnalysis
+
+Reports the mean analysis_result size, the database file size (after
+VACUUM) scaled to one million readings, and the read cost of rebuilding the
+full dicts against decoding the stored JSON.
+
+Usage:
+    python -m benchmarks.npk_analysis_storage [--rows 100000]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import sqlalchemy as sa
+from app import db
+from app.models.npk_reading import NpkReading
+from app.services.analysis_service import AnalysisService
+from app.utils import npk_rules
+
+# The same table without the compacting column type
+FULL_TABLE = sa.table(
+    'npk_readings',
+    sa.column('n_value', sa.Integer),
+    sa.column('p_value', sa.Integer),
+    sa.column('k_value', sa.Integer),
+    sa.column('analysis_result', sa.JSON)
+)
+
+
+def store(table, params):
+    """Insert params into a fresh database file; return (engine, file size after VACUUM)."""
+    path = os.path.join(tempfile.mkdtemp(), 'storage.db')
+    engine = sa.create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine, tables=[NpkReading.__table__])
+    with engine.begin() as connection:
+        connection.execute(table.insert(), params)
+    with engine.connect() as connection:
+        connection.exec_driver_sql('VACUUM')
+    return engine, os.path.getsize(path)
+
+
+def read_seconds(engine, column):
+    """Time to fetch and decode every analysis_result."""
+    with engine.connect() as connection:
+        start = time.perf_counter()
+        connection.execute(sa.select(column)).scalars().all()
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n_values = rng.integers(0, 300, args.rows)
+    p_values = rng.integers(0, 60, args.rows)
+    k_values = rng.integers(0, 400, args.rows)
+    analyses = AnalysisService.analyze_npk_bulk(n_values, p_values, k_values)
+    params = [
+        {'n_value': n, 'p_value': p, 'k_value': k, 'analysis_result': analysis}
+        for n, p, k, analysis in zip(n_values.tolist(), p_values.tolist(), k_values.tolist(), analyses)
+    ]
+
+    full_bytes = sum(len(json.dumps(analysis)) for analysis in analyses) / args.rows
+    compact_bytes = sum(len(json.dumps(npk_rules.compact(analysis))) for analysis in analyses) / args.rows
+
+    full_engine, full_size = store(FULL_TABLE, params)
+    compact_engine, compact_size = store(NpkReading.__table__, params)
+    full_read = read_seconds(full_engine, FULL_TABLE.c.analysis_result)
+    compact_read = read_seconds(compact_engine, NpkReading.analysis_result)
+
+    scale = 1e6 / args.rows
+    print(f"{args.rows} readings; sizes scaled to 1M readings")
+    print(f"{'storage':<9} {'bytes/row':>10} {'db MB/1M':>10} {'read us/row':>12}")
+    print(f"{'full':<9} {full_bytes:>10.1f} {full_size * scale / 1e6:>10.1f} {full_read / args.rows * 1e6:>12.2f}")
+    print(f"{'compact':<9} {compact_bytes:>10.1f} {compact_size * scale / 1e6:>10.1f} {compact_read / args.rows * 1e6:>12.2f}")
+    print(f"saved per 1M readings: {(full_bytes - compact_bytes):.0f} MB of JSON, "
+          f"{(full_size - compact_size) * scale / 1e6:.0f} MB of database file")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark of NPK classification: per-reading if/elif against the rule table.
+
+Labels random N/P/K/pH readings three ways and checks that they agree:
+
+- scalar: the previous per-reading if/elif comparison on each nutrient
+- codes: ``NpkRuleSet.codes`` band lookup over whole arrays
+- analyze: ``NpkRuleSet.analyze``, i.e. codes plus building the analysis
+  dicts (the bulk ingestion path)
+
+Usage:
+    python -m benchmarks.npk_classify [--rows 1000000] [--crop jagung]
+"""
+import argparse
+import time
+import numpy as np
+from app.utils.npk_rules import MISSING, NPK_LABELS, rule_set_for
+
+
+def scalar_bands(rule_set, readings):
+    """Bands per reading with one if/elif chain per nutrient, as before the rule table."""
+    columns = [readings[field].tolist() for field in rule_set.fields]
+    bands = []
+    for values in zip(*columns):
+        row = []
+        for (_, _, low, high, _), value in zip(rule_set.rules, values):
+            if value != value:  # NaN: not measured
+                row.append(MISSING)
+            elif low <= value <= high:
+                row.append(NPK_LABELS.index('Optimal'))
+            elif value < low:
+                row.append(NPK_LABELS.index('Rendah'))
+            else:
+                row.append(NPK_LABELS.index('Berlebih'))
+        bands.append(row)
+    return np.array(bands, dtype=np.int8).T
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--crop', default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    readings = {
+        'n_value': rng.integers(0, 300, args.rows),
+        'p_value': rng.integers(0, 60, args.rows),
+        'k_value': rng.integers(0, 400, args.rows),
+        # Every fifth reading without pH
+        'ph_value': np.where(rng.random(args.rows) < 0.2, np.nan, np.round(rng.uniform(4.0, 9.0, args.rows), 1))
+    }
+    rule_set = rule_set_for(args.crop)
+
+    start = time.perf_counter()
+    expected = scalar_bands(rule_set, readings)
+    scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    codes = rule_set.codes(readings)
+    vectorized = time.perf_counter() - start
+    if not np.array_equal(codes, rule_set.pack(expected)):
+        raise SystemExit('band codes differ from the scalar classification')
+
+    start = time.perf_counter()
+    rule_set.analyze(readings)
+    analyze = time.perf_counter() - start
+
+    print(f"rule set v{rule_set.version} ({rule_set.crop or 'default'}), {args.rows} readings")
+    print(f"{'method':<9} {'ms':>9} {'readings/s':>14}")
+    for name, seconds in (('scalar', scalar), ('codes', vectorized), ('analyze', analyze)):
+        print(f"{name:<9} {seconds * 1e3:>9.1f} {args.rows / seconds:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
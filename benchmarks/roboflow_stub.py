@@ -0,0 +1,75 @@
+"""
+Local stub of the Roboflow workflow endpoint for offline load tests.
+
+Accepts ``POST /<workspace>/workflows/<workflow_id>`` with the same JSON
+body the disease service sends and answers with a canned ``outputs``
+payload after a configurable latency. A failure rate can be set to watch
+the circuit breaker open and recover.
+
+Usage:
+    python -m benchmarks.roboflow_stub [--port 9001] [--latency-ms 150] [--fail-rate 0]
+    ROBOFLOW_API_URL=http://127.0.0.1:9001 flask run
+"""
+import argparse
+import base64
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(latency, fail_rate):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, so pooled connections are reused
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            time.sleep(latency)
+
+            if '/workflows/' not in self.path or random.random() < fail_rate:
+                return self._send(503, {'message': 'stub failure'})
+
+            image = body.get('inputs', {}).get('image', {})
+            size = len(base64.b64decode(image.get('value', '')))
+            return self._send(200, {'outputs': [{
+                'predictions': {
+                    'predictions': [{'class': 'leaf_blight', 'confidence': 0.91}],
+                    'image': {'bytes': size}
+                }
+            }]})
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def serve(port=9001, latency_ms=150, fail_rate=0.0):
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(latency_ms / 1000, fail_rate))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--port', type=int, default=9001)
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency_ms, args.fail_rate)
+    print(f"Roboflow stub listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
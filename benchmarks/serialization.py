@@ -0,0 +1,147 @@
+"""
+Benchmark of list-page serialization: ORM to_dict() versus column tuples.
+
+Fills NpkReading, Recommendation and Crop with synthetic rows for one user,
+then fetches and serializes 100-row newest-first pages both ways:
+
+- orm: ``Model.query ... .all()`` and ``to_dict()`` per instance
+- tuples: ``RowEncoder`` column query and ``encode_many``
+
+Both outputs are compared before timing. Point DATABASE_URL at a local
+PostgreSQL to measure the production path (default: temporary SQLite file).
+
+Usage:
+    python -m benchmarks.serialization [--rows 5000] [--page 100] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from app import create_app, db
+from app.models.npk_reading import NpkReading
+from app.models.recommendation import Recommendation
+from app.models.crop import Crop
+from app.utils.row_encoder import RowEncoder
+
+USER_ID = 1
+
+
+def make_rows(model, count, seed=0):
+    """Return synthetic insert parameters for model."""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    if model is NpkReading:
+        return [{
+            'user_id': USER_ID,
+            'timestamp': start + timedelta(minutes=10 * i),
+            'n_value': rng.randint(40, 260),
+            'p_value': rng.randint(5, 60),
+            'k_value': rng.randint(100, 300),
+            'ph_value': round(rng.uniform(4.5, 8.0), 2),
+            'temperature': round(rng.uniform(20, 35), 1),
+            'humidity': round(rng.uniform(40, 95), 1),
+            'location': f"plot-{i % 300:03d}",
+            'latitude': rng.uniform(-8.0, -6.0),
+            'longitude': rng.uniform(106.0, 108.0),
+            'analysis_result': {
+                'Nitrogen (N)': {'value': 120, 'label': 'Sedang', 'rekomendasi': 'Maintain nitrogen.'},
+                'Fosfor (P)': {'value': 30, 'label': 'Optimal', 'rekomendasi': 'Phosphorus is optimal.'},
+                'Kalium (K)': {'value': 200, 'label': 'Optimal', 'rekomendasi': 'Potassium is optimal.'}
+            }
+        } for i in range(count)]
+    if model is Recommendation:
+        return [{
+            'user_id': USER_ID,
+            'timestamp': start + timedelta(minutes=10 * i),
+            'recommendation_type': 'fertilizer',
+            'input_data': {'n': rng.randint(40, 260), 'p': rng.randint(5, 60), 'k': rng.randint(100, 300)},
+            'recommendation_data': {'urea_kg': round(rng.uniform(50, 250), 1), 'sp36_kg': 100, 'kcl_kg': 75},
+            'crop_type': 'padi',
+            'crop_stage': 'vegetative',
+            'location': f"plot-{i % 300:03d}",
+            'status': 'active'
+        } for i in range(count)]
+    return [{
+        'user_id': USER_ID,
+        'crop_name': 'Padi',
+        'crop_variety': 'IR64',
+        'crop_type': 'grain',
+        'planting_date': date(2026, 1, 1) + timedelta(days=i % 365),
+        'expected_harvest_date': date(2026, 4, 1) + timedelta(days=i % 365),
+        'area_size': round(rng.uniform(0.1, 5.0), 2),
+        'location': f"plot-{i % 300:03d}",
+        'expected_yield': round(rng.uniform(1000, 8000), 1),
+        'yield_unit': 'kg',
+        'status': 'growing',
+        'notes': 'Synthetic benchmark row',
+        'extra_data': {'irrigation': 'drip', 'seed_source': 'local'},
+        'created_at': start + timedelta(minutes=10 * i),
+        'updated_at': start + timedelta(minutes=10 * i)
+    } for i in range(count)]
+
+
+def order_column(model):
+    return model.created_at if model is Crop else model.timestamp
+
+
+def orm_page(model, page_size):
+    rows = model.query.filter(model.user_id == USER_ID).order_by(
+        order_column(model).desc(), model.id.desc()
+    ).limit(page_size).all()
+    return [row.to_dict() for row in rows]
+
+
+def tuple_page(model, page_size):
+    encoder = RowEncoder.for_model(model)
+    rows = encoder.query().filter(model.user_id == USER_ID).order_by(
+        order_column(model).desc(), model.id.desc()
+    ).limit(page_size).all()
+    return encoder.encode_many(rows)
+
+
+def measure(function, model, page_size, repeat):
+    """Seconds per page, with a fresh session each time as in a request."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(model, page_size)
+        db.session.remove()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    if not os.getenv('DATABASE_URL'):
+        path = os.path.join(tempfile.mkdtemp(), 'serialization.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    app = create_app('development')
+
+    with app.app_context():
+        db.engine.echo = False
+        db.create_all()
+        for model in (NpkReading, Recommendation, Crop):
+            db.session.execute(model.__table__.delete().where(model.user_id == USER_ID))
+            db.session.execute(model.__table__.insert(), make_rows(model, args.rows))
+        db.session.commit()
+
+        print(f"database: {app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1]}")
+        print(f"{'model':<16} {'orm ms':>8} {'tuples ms':>10} {'speedup':>8}")
+        for model in (NpkReading, Recommendation, Crop):
+            if orm_page(model, args.page) != tuple_page(model, args.page):
+                raise SystemExit(f"{model.__name__}: column tuple output differs from to_dict()")
+            db.session.remove()
+
+            orm = measure(orm_page, model, args.page, args.repeat)
+            tuples = measure(tuple_page, model, args.page, args.repeat)
+            print(f"{model.__name__:<16} {orm * 1000:>8.2f} {tuples * 1000:>10.2f} {orm / tuples:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
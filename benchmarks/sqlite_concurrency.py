@@ -0,0 +1,112 @@
+"""
+Concurrent write benchmark for SQLite engine profiles.
+
+Runs writer threads that each commit single-reading transactions (as the
+/npk endpoint does) while reader threads page through history, against a
+fresh database file per profile:
+
+- default: SQLite's rollback journal, synchronous=FULL
+- tuned: the Config.SQLITE_PRAGMAS profile (WAL, synchronous=NORMAL, mmap,
+  busy timeout)
+
+Reports committed writes/s, completed reads/s and "database is locked"
+failures for each profile.
+
+Usage:
+    python -m benchmarks.sqlite_concurrency [--writers 4] [--readers 4] [--seconds 5]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.config.config import Config
+from app.models.npk_reading import NpkReading
+from app.utils.db_engine import configure_engine
+
+PROFILES = {
+    'default': {},
+    'tuned': Config.SQLITE_PRAGMAS
+}
+
+
+def run_profile(pragmas, writers, readers, seconds):
+    """Return (writes, reads, lock errors) achieved in seconds."""
+    path = os.path.join(tempfile.mkdtemp(), 'concurrency.db')
+    # Same 5s lock wait as pysqlite's default for both profiles
+    engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': 5})
+    configure_engine(engine, {'SQLITE_PRAGMAS': pragmas})
+    db.metadata.create_all(engine, tables=[NpkReading.__table__])
+
+    table = NpkReading.__table__
+    counters = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def count(key):
+        with lock:
+            counters[key] += 1
+
+    def writer(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            try:
+                with engine.begin() as connection:
+                    connection.execute(table.insert(), {
+                        'user_id': seed % 2 + 1,
+                        'timestamp': datetime.utcnow(),
+                        'n_value': rng.randint(40, 260),
+                        'p_value': rng.randint(5, 60),
+                        'k_value': rng.randint(100, 300),
+                        'ph_value': round(rng.uniform(4.5, 8.0), 2),
+                        'location': f'plot-{rng.randint(0, 99):02d}'
+                    })
+                count('writes')
+            except OperationalError:
+                count('locked')
+
+    def reader(seed):
+        query = select(table).where(table.c.user_id == seed % 2 + 1).order_by(
+            table.c.timestamp.desc(), table.c.id.desc()
+        ).limit(20)
+        while not stop.is_set():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(query).all()
+                count('reads')
+            except OperationalError:
+                count('locked')
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return counters['writes'], counters['reads'], counters['locked']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:g}s per profile")
+    print(f"{'profile':<9} {'writes/s':>9} {'reads/s':>9} {'locked':>7}")
+    for name, pragmas in PROFILES.items():
+        writes, reads, locked = run_profile(pragmas, args.writers, args.readers, args.seconds)
+        print(f"{name:<9} {writes / args.seconds:>9.0f} {reads / args.seconds:>9.0f} {locked:>7}")
+
+
+if __name__ == '__main__':
+    main()
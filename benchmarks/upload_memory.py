@@ -0,0 +1,110 @@
+"""
+Compare peak allocation of the old and new BWD upload handling.
+
+"before" reproduces the previous route code: ``file.read()`` for multipart
+uploads, or ``b64decode(b64.split(',')[-1])`` for JSON, followed by
+``np.frombuffer``. "after" uses UploadBuffer, which writes the multipart
+part (or decoded base64) into one reusable per-thread buffer and hands a
+memoryview to OpenCV. Only the upload handling and decode are measured.
+
+Usage:
+    python -m benchmarks.upload_memory [--megabytes 12]
+"""
+import argparse
+import base64
+import io
+import tracemalloc
+import cv2
+import numpy as np
+from flask import Flask, Request, request, jsonify
+from werkzeug.test import EnvironBuilder
+from app.utils.upload_buffer import UploadBuffer, UploadRequest
+
+
+def decode(image_bytes):
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    image = cv2.imdecode(nparr, cv2.IMREAD_REDUCED_COLOR_8)
+    return image is not None
+
+
+def before_view():
+    if 'file' in request.files:
+        image_bytes = request.files['file'].read()
+    else:
+        b64 = request.get_json()['image_base64']
+        image_bytes = base64.b64decode(b64.split(',')[-1])
+    return jsonify({'ok': decode(image_bytes)})
+
+
+def after_view():
+    if 'file' in request.files:
+        image_bytes = UploadBuffer.file_view(request.files['file'])
+    else:
+        image_bytes = UploadBuffer.decode_base64(request.get_json()['image_base64'])
+    return jsonify({'ok': decode(image_bytes)})
+
+
+def make_app(request_class, view):
+    app = Flask(__name__)
+    app.request_class = request_class
+    app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024
+    app.teardown_request(lambda exc: UploadBuffer.release())
+    app.add_url_rule('/bwd', 'bwd', view, methods=['POST'])
+    return app
+
+
+def make_payload(megabytes):
+    """Create a noisy JPEG of roughly the requested size."""
+    side = int((megabytes * 1e6 / 1.5) ** 0.5)
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=(side, side, 3), dtype=np.uint8)
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes()
+
+
+def make_environ(kind, payload):
+    """Build the WSGI environ up front so the request body is not measured."""
+    if kind == 'multipart':
+        builder = EnvironBuilder(path='/bwd', method='POST',
+                                 data={'file': (io.BytesIO(payload), 'leaf.jpg')},
+                                 content_type='multipart/form-data')
+    else:
+        b64 = 'data:image/jpeg;base64,' + base64.b64encode(payload).decode()
+        builder = EnvironBuilder(path='/bwd', method='POST', json={'image_base64': b64})
+    return builder.get_environ()
+
+
+def peak_for(app, view, kind, payload):
+    def send():
+        with app.request_context(make_environ(kind, payload)):
+            return view()
+
+    send()  # warm up (allocates the reusable buffer once)
+    environ = make_environ(kind, payload)
+    tracemalloc.start()
+    with app.request_context(environ):
+        response = view()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response.get_json()['ok']
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--megabytes', type=float, default=12)
+    args = parser.parse_args()
+
+    payload = make_payload(args.megabytes)
+    before = make_app(Request, before_view)
+    after = make_app(UploadRequest, after_view)
+    runs = ((before, before_view), (after, after_view))
+
+    print(f"payload: {len(payload) / 1e6:.1f} MB")
+    print(f"{'input':>10} {'before_MB':>10} {'after_MB':>10}")
+    for kind in ('multipart', 'base64'):
+        b, a = (peak_for(app, view, kind, payload) for app, view in runs)
+        print(f"{kind:>10} {b / 1e6:>10.1f} {a / 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Compact NPK analysis results
+
+Revision ID: 704f124efb3e
+Revises: 55709a002346
+Create Date: 2026-10-19 02:40:12.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.utils import npk_rules
+
+
+# revision identifiers, used by Alembic.
+revision = '704f124efb3e'
+down_revision = '55709a002346'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# Plain JSON view of the column (the model's type would compact/expand itself)
+npk_readings = sa.table(
+    'npk_readings',
+    sa.column('id', sa.Integer),
+    sa.column('analysis_result', sa.JSON)
+)
+
+
+def _rewrite(convert):
+    """Rewrite analysis_result of every row where convert returns a new value, by id batches."""
+    connection = op.get_bind()
+    statement = npk_readings.update().where(npk_readings.c.id == sa.bindparam('_id')).values(
+        analysis_result=sa.bindparam('_analysis_result')
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(npk_readings.c.id, npk_readings.c.analysis_result)
+            .where(npk_readings.c.id > last_id, npk_readings.c.analysis_result.isnot(None))
+            .order_by(npk_readings.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+
+        params = []
+        for reading_id, analysis in rows:
+            converted = convert(analysis)
+            if converted is not None:
+                params.append({'_id': reading_id, '_analysis_result': converted})
+        if params:
+            connection.execute(statement, params)
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    # Analyses made by rule set 1 become [1, band code, n, p, k]; others stay as they are
+    _rewrite(lambda analysis: npk_rules.compact(analysis, version=1))
+
+
+def downgrade():
+    _rewrite(lambda analysis: npk_rules.expand(analysis) if isinstance(analysis, list) else None)